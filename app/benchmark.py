@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the simulation from the command line. Every benchmark runs
+the shipped configurations with a fixed seed and reports its results as a table.
+
+@file   benchmark.py
+"""
+
+# dependencies
+from lib.Environment import Environment
+from lib.Statistics import Statistics
+from lib.Balancers import BALANCERS
+from lib.Streams import Streams
+from command_line_simulation import build, main, summarize
+
+# 3rd party dependencies
+import os
+import json
+import time
+import tempfile
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+# Find directory of this file
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEASONALITY = os.path.join(FILE_DIR, 'seasonality', 'week.csv')
+CONFIGS = ['config.json', 'one_low.json', 'one_high.json', 'one_error.json']
+
+
+def parse_args():
+    "Parses inputs from commandline and returns them as a Namespace object."
+
+    parser = ArgumentParser(prog='benchmark.py',
+                            formatter_class=RawTextHelpFormatter,
+                            description=' Runs benchmarks of the simulation from command line.')
+    parser.add_argument('benchmark', choices=['balancers', 'logging'],
+                        help='benchmark to run:\n'
+                             '- balancers:  selection cost and transaction latency per\n'
+                             '              load balancing strategy\n'
+                             '- logging:    runtime of a simulation that logs every message,\n'
+                             '              and of one that only collects statistics')
+    parser.add_argument('-c', '--config', nargs='+', default=CONFIGS,
+                        help='configuration files to run (default: the shipped configurations)')
+    parser.add_argument('-t', '--runtime', type=int,
+                        help='override the runtime of the configurations')
+    parser.add_argument('-s', '--seed', type=int, default=1,
+                        help='seed of every run (default: 1)')
+
+    return parser.parse_args()
+
+
+def load(name, runtime=None):
+    """
+    Function to load a configuration file, relative to this script.
+
+    Parameters
+    ----------
+    name: string
+        Name of, or path to, the configuration file.
+    runtime: int
+        Optional runtime that overrides the configured one.
+
+    Returns
+    -------
+    dict
+    """
+    with open(os.path.join(FILE_DIR, name)) as f:
+        config = json.load(f)
+
+    if runtime is not None:
+        config['runtime'] = runtime
+
+    return config
+
+
+def balancers(args):
+    """
+    Function to benchmark all load balancing strategies. For every configuration
+    and strategy, it reports the cost of selecting a server and the resulting
+    transaction latency.
+
+    Parameters
+    ----------
+    args: Namespace
+        Parsed commandline arguments.
+    """
+    print(f"{'config':<20} {'balancer':<28} {'selections':>10} {'us/call':>8} "
+          f"{'p50 (s)':>9} {'p99 (s)':>9} {'timeouts':>9}")
+
+    for name in args.config:
+        for strategy in BALANCERS:
+
+            # use the same strategy for every pool
+            config = load(name, args.runtime)
+            for server in config['servers']:
+                server['balancer'] = strategy
+
+            # every strategy gets the same streams
+            environment = Environment()
+            statistics = Statistics()
+            servers = build(environment, config, SEASONALITY, statistics=statistics, streams=Streams(args.seed))
+
+            # time every selection of a server
+            cost = {'calls': 0, 'seconds': 0.0}
+            for pool in servers.pools():
+                pool.server = timed(pool.server, cost)
+
+            environment.run(until=int(config['runtime']))
+
+            summary = statistics.summary(int(config['runtime']))
+            print(f"{name:<20} {strategy:<28} {cost['calls']:>10} "
+                  f"{1e6 * cost['seconds'] / max(cost['calls'], 1):>8.2f} "
+                  f"{summary['transaction']['p50']:>9.4f} {summary['transaction']['p99']:>9.4f} "
+                  f"{summary['timeout_fraction']:>9.4f}")
+
+
+def benchmark_logging(args):
+    """
+    Function to benchmark the cost of logging. For every configuration, it
+    reports the runtime of a simulation that logs every message to csv, and
+    of the same simulation that only collects statistics.
+
+    Parameters
+    ----------
+    args: Namespace
+        Parsed commandline arguments.
+    """
+    print(f"{'config':<20} {'logged (s)':>11} {'log (MiB)':>10} {'stats-only (s)':>15} {'speedup':>8}")
+
+    for index, name in enumerate(args.config):
+        config = load(name, args.runtime)
+
+        # every run writes to a directory of its own, which is removed after
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            main(index, config, SEASONALITY, directory, f"benchmark-{index}", "logged", seed=args.seed)
+            logged = time.perf_counter() - start
+
+            size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+            start = time.perf_counter()
+            summarize(index, config, SEASONALITY, directory, f"benchmark-{index}", "stats-only", seed=args.seed)
+            stats = time.perf_counter() - start
+
+        print(f"{name:<20} {logged:>11.2f} {size / 2 ** 20:>10.1f} {stats:>15.2f} {logged / stats:>7.1f}x")
+
+
+def timed(method, cost):
+    """
+    Function to wrap a method, so the number of calls and the time spent in
+    them is added to a cost dictionary.
+
+    Parameters
+    ----------
+    method: callable
+        Method to wrap.
+    cost: dict
+        Dictionary with a 'calls' and a 'seconds' key.
+
+    Returns
+    -------
+    callable
+    """
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        cost['seconds'] += time.perf_counter() - start
+        cost['calls'] += 1
+        return result
+
+    return wrapper
+
+
+# run this as main
+if __name__ == "__main__":
+
+    args = parse_args()
+
+    if args.benchmark == 'balancers':
+        balancers(args)
+
+    elif args.benchmark == 'logging':
+        benchmark_logging(args)
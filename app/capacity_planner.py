@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Script to plan the capacity of a simulation from the command line. It searches
+for the smallest size or capacity per kind of server that meets a service
+level objective, and writes the cheapest feasible configuration.
+
+@file   capacity_planner.py
+"""
+
+# dependencies
+from lib.Planner import Planner
+from command_line_simulation import simulate
+
+# 3rd party dependencies
+import os
+import json
+from datetime import datetime
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+# Find directory of this file
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEASONALITY = os.path.join(FILE_DIR, 'seasonality', 'week.csv')
+
+
+def parse_args():
+    "Parses inputs from commandline and returns them as a Namespace object."
+
+    parser = ArgumentParser(prog='capacity_planner.py',
+                            formatter_class=RawTextHelpFormatter,
+                            description=' Plans the capacity of a simulation from command line.')
+    parser.add_argument('-c', '--config', default=os.path.join(FILE_DIR, 'config.json'),
+                        help='path to a json formatted configuration file (default: config.json)')
+    parser.add_argument('--timeout-fraction', type=float, default=0.001,
+                        help='maximum fraction of timed out transactions (default: 0.001)')
+    parser.add_argument('--p99', type=float,
+                        help='maximum 99th percentile of the transaction duration in seconds')
+    parser.add_argument('--slo', nargs='*', default=[], metavar='METRIC=LIMIT',
+                        help='additional limits on metrics of the summary, by their dotted\n'
+                             'path (e.g. kinds.payment.p95=0.5)')
+    parser.add_argument('-d', '--dimension', choices=['size', 'capacity'], default='size',
+                        help='property of the server pools to plan (default: size)')
+    parser.add_argument('-n', '--replications', type=int, default=10,
+                        help='number of replications per candidate (default: 10)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the intervals (default: 0.95)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of parallel worker processes (default: number of cpus)')
+    parser.add_argument('-s', '--seed', type=int,
+                        help='root seed of the common random numbers')
+    parser.add_argument('-t', '--runtime', type=int,
+                        help='override the runtime of the configuration')
+
+    return parser.parse_args()
+
+
+def run(config, seed):
+    """
+    Function to run a single replication of a candidate configuration.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration of the candidate.
+    seed: numpy.random.SeedSequence
+        Seed of this replication.
+
+    Returns
+    -------
+    dict
+    """
+    return simulate(config, SEASONALITY, seed)
+
+
+# run this as main
+if __name__ == "__main__":
+    # For timing get current time
+    starttime = datetime.now()
+
+    args = parse_args()
+
+    # configuration for the simulation to plan
+    with open(args.config) as f:
+        config = json.load(f)
+
+    if args.runtime is not None:
+        config['runtime'] = args.runtime
+
+    # we need the service level objective to plan for
+    slo = {"timeout_fraction": args.timeout_fraction}
+    if args.p99 is not None:
+        slo["transaction.p99"] = args.p99
+    for limit in args.slo:
+        metric, value = limit.split('=')
+        slo[metric] = float(value)
+
+    planner = Planner(run, config, slo, dimension=args.dimension, replications=args.replications,
+                      workers=args.workers, seed=args.seed, confidence=args.confidence)
+    result = planner.plan()
+
+    # show the planned pools
+    print(f"{'kind':<20} {'configured':>10} {'planned':>10}")
+    for kind, value in result['values'].items():
+        print(f"{kind:<20} {result['baseline'][kind]:>10} {value:>10}")
+    for metric, i in result['metrics'].items():
+        print(f"{metric:<40} {i['mean']:12.6g} <= {i['upper']:.6g} (limit {slo[metric]:g})")
+    print(f"feasible: {result['feasible']}, cost {result['cost']} (configured {result['baseline_cost']}), "
+          f"{result['evaluations']} candidates of {result['replications']} replications (seed {result['seed']})")
+
+    # write the planned configuration next to the logs
+    log_dir = os.path.join(FILE_DIR, "Logs")
+    os.makedirs(log_dir, exist_ok=True)
+    name = "plan_{0}_{1}.json".format(datetime.now().strftime("%Y-%m-%d_%H-%M"),
+                                      config['description'].replace(" ", "-"))
+    with open(os.path.join(log_dir, name), 'w') as f:
+        json.dump(result, f, indent=4)
+
+    print(f"Plan can be found at {os.path.join(log_dir, name)}.")
+    print(f"Total time {datetime.now() - starttime}")
@@ -12,12 +12,21 @@ from lib.Servers import Servers
 from lib.Logger import Logger
 from lib.MessageGenerator import MessageGenerator
 from lib.ErrorGenerator import ErrorGenerator
+from lib.AutoScaler import AutoScaler
+from lib.Failures import Failures
+from lib.Scenario import Scenario
 from lib.Seasonality import TransactionInterval as Seasonality
+from lib.TraceArrivals import TraceArrivals
+from lib.Statistics import Statistics
+from lib.Spans import Spans
+from lib.Replications import Replications
+from lib.Streams import Streams
 
 # 3rd party dependencies
 import os
 import glob
 from datetime import datetime
+from functools import partial
 import json
 from argparse import ArgumentParser, RawTextHelpFormatter
 
@@ -36,11 +45,122 @@ def parse_args():
                             description=' Runs Simpy simulation from command line.')
     parser.add_argument('-c', '--config',
                         help='path to a json formatted configuration file')
+    parser.add_argument('-r', '--replications', type=int,
+                        help='run independent replications without logging, up to this\n'
+                             'maximum number, instead of a single logged simulation')
+    parser.add_argument('--min-replications', type=int, default=5,
+                        help='minimum number of replications (default: 5)')
+    parser.add_argument('--precision', type=float, default=0.05,
+                        help='target half-width of the confidence intervals, relative\n'
+                             'to the mean (default: 0.05)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the intervals (default: 0.95)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of parallel worker processes (default: number of cpus)')
+    parser.add_argument('-s', '--seed', type=int,
+                        help='root seed of the random number streams of the simulation,\n'
+                             'or of the replications')
+    parser.add_argument('--trace-rate', type=float, default=0.0,
+                        help='fraction of the transactions of which every hop is traced\n'
+                             '(default: 0, no tracing)')
+    parser.add_argument('--log-sampling', type=int, default=1,
+                        help='only log the INFO messages of 1 in every N transactions, all\n'
+                             'ERROR messages are logged (default: 1, every transaction)')
+    parser.add_argument('--stats-only', action='store_true',
+                        help='do not log any message, only write a summary of the\n'
+                             'statistics of the simulation')
 
     return parser.parse_args()
 
 
-def main(n, config, seasonality, log_dir, log_prefix, description):
+def build(environment, config, seasonality, statistics=None, spans=None, streams=None, sampling=1):
+    """
+    Function to construct the server pools and generators of a simulation
+    on an environment.
+
+    Parameters
+    ----------
+    environment: Environment
+        The environment to construct the simulation on.
+    config: dict
+        Configuration for the simulation, see main.
+    seasonality: string
+        Path to the seasonality file that defines the intervals between events.
+    statistics: Statistics
+        Optional collector of summary statistics.
+    spans: Spans
+        Optional tracer of the hops of sampled transactions.
+    streams: Streams
+        Random number streams of the components. Default: fresh entropy.
+    sampling: int
+        Only the INFO messages of 1 in every N transactions are logged.
+
+    Returns
+    -------
+    MultiServers
+    """
+    # every component draws from its own stream
+    if streams is None:
+        streams = Streams()
+
+    # we need a server pool
+    servers = MultiServers()
+
+    # iterate over all of the servers that need to be configured that
+    # we received from the client
+    for server in config['servers']:
+
+        # append a new server pool to the multiserver system
+        pool = Servers(environment, size=server['size'], capacity=server['capacity'], kind=server['kind'],
+                       circuit=server.get('circuit'), balancer=server.get('balancer', 'least-queue'),
+                       random=streams.generator(f"balancing.{server['kind']}"),
+                       service=streams.generator(f"service.{server['kind']}"))
+        servers.append(pool)
+
+        # scale the pool at runtime if specified
+        if 'autoscale' in server:
+            AutoScaler(environment, pool, statistics=statistics, **server['autoscale'])
+
+        # fail the servers of the pool at random if specified
+        if 'failures' in server:
+            Failures(environment, pool, statistics=statistics,
+                     random=streams.generator(f"failures.{server['kind']}"), **server['failures'])
+
+    # replay recorded arrivals if specified, otherwise we need a new form of seasonality
+    if 'trace' in config:
+        trace = dict(config['trace'])
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), trace.pop('file'))
+    else:
+        seasonality = Seasonality(seasonality, enviroment=environment, max_volume=config["max_volume"],
+                                  random=streams.generator("arrivals"))
+
+    # now, we can attach the MessageGenerator to the simulation envoirment
+    for index, proc in enumerate(config['process']):
+
+        # a replay keeps its position in the trace, so every process
+        # replays the trace on its own
+        if 'trace' in config:
+            seasonality = TraceArrivals(path, enviroment=environment, random=streams.generator("arrivals"),
+                                        **trace)
+
+        MessageGenerator(environment, servers, seasonality, kinds=proc, timeout=config['timeout'],
+                         statistics=statistics, spans=spans, random=streams.generator(f"transactions.{index}"),
+                         sampling=sampling)
+
+    # Add error generator if specified
+    if 'error' in config:
+        ErrorGenerator(environment, servers, config['error']['errorwait'],
+                       config['error']['error_duration'], random=streams.generator("failures"))
+
+    # inject the faults of a scripted scenario if specified
+    if 'scenario' in config:
+        Scenario(environment, servers, config['scenario']['faults'],
+                 name=config['scenario'].get('name', 'scenario'))
+
+    return servers
+
+
+def main(n, config, seasonality, log_dir, log_prefix, description, trace_rate=0.0, seed=None, sampling=1):
     """
     Main loop that runs a simulation. This simulation can be configured by passing
     a configuration dictionary, and specifying where all logs will be written to.
@@ -56,6 +176,14 @@ def main(n, config, seasonality, log_dir, log_prefix, description):
                         the simulation runs.
         - runtime:      Until when the simulation should run.
         - max_volumne:  Maximum number of events.
+        Every server pool may contain an "autoscale" dictionary with the
+        keyworded parameters of an AutoScaler, and a "failures" dictionary
+        with the "mttf", "mttr" and keyworded parameters of Failures. A
+        "trace" dictionary with a "file" and the keyworded parameters of
+        TraceArrivals replays recorded arrivals instead of the seasonality.
+        A "scenario" dictionary with a "name" and a list of "faults" (see
+        lib/Scenario.py) injects faults at fixed times, and its name is
+        added to the names of the logs.
     seasonality: Seasonality
         Seasonality object to use for the simulation. This defines the intervals
         between events.
@@ -63,6 +191,14 @@ def main(n, config, seasonality, log_dir, log_prefix, description):
         Path pointing to where all logs should be written.
     log_prefix: string
         Prefix of every log file.
+    trace_rate: float
+        Fraction of the transactions of which every hop is traced.
+    seed: int
+        Root seed of the random number streams. Default: fresh entropy.
+    sampling: int
+        Only the INFO messages of 1 in every N transactions are logged, which
+        is stored with the seeds, so counts can be scaled back when the logs
+        are processed. Default: 1, every transaction.
 
     Returns
     -------
@@ -71,21 +207,15 @@ def main(n, config, seasonality, log_dir, log_prefix, description):
     # we need a new environment which we can run.
     environment = Environment()
 
-    # we need a server pool
-    servers = MultiServers()
-
-    # iterate over all of the servers that need to be configured that
-    # we received from the client
-    for server in config['servers']:
-
-        # append a new server pool to the multiserver system
-        servers.append(
-            Servers(environment, size=server['size'], capacity=server['capacity'], kind=server['kind']))
-
     # we need a logger that will log all events that happen in the simulation
     name = "{0}_{1:04d}_{2}_{3}".format(log_prefix, n,
                                         datetime.now().strftime("%Y-%m-%d_%H-%M"),
                                         description.replace(" ", "-"))
+
+    # tag the logs with the scenario of faults, if any
+    if 'scenario' in config:
+        name = "{0}_{1}".format(name, config['scenario'].get('name', 'scenario').replace(" ", "-"))
+
     logger = Logger(name, directory=log_dir, show_stdout=False, usequeue=False)
 
     # we also need a logger for all error events that happen in the simulation
@@ -104,18 +234,21 @@ def main(n, config, seasonality, log_dir, log_prefix, description):
     environment.logger(logger)
     environment.logger(error_logger, type="error")
 
-    # we need a new form of seasonality
-    seasonality = Seasonality(seasonality, enviroment=environment, max_volume=config["max_volume"])
-
-    # now, we can attach the MessageGenerator to the simulation envoirment
-    for proc in config['process']:
-        MessageGenerator(environment, servers, seasonality, kinds=proc, timeout=config['timeout'])
+    # we need a logger for the size of the pools, when they are scaled
+    if any('autoscale' in server for server in config['servers']):
+        scaling_logger = Logger(f"scaling-{name}", directory=log_dir, show_stdout=False)
+        scaling_logger.log('Time;Pool;Servers;Provisioning;Draining;CPU Usage;Queue;Server-seconds')
+        environment.logger(scaling_logger, type="scaling")
 
-    # Add error generator if specified
+    # construct the servers and generators of the simulation, and collect
+    # the latency histograms while it runs
     if 'error' in config:
         print("With error function")
-        ErrorGenerator(environment, servers, config['error']['errorwait'],
-                       config['error']['error_duration'])
+    statistics = Statistics()
+    spans = Spans(rate=trace_rate) if trace_rate > 0 else None
+    streams = Streams(seed)
+    build(environment, config, seasonality, statistics=statistics, spans=spans, streams=streams,
+          sampling=sampling)
 
     # run the simulation with a certain runtime (runtime). this runtime is not equivalent
     # to the current time (measurements). this should be the seasonality of the system.
@@ -126,6 +259,152 @@ def main(n, config, seasonality, log_dir, log_prefix, description):
     if hasattr(logger, "listener"):
         logger.listener.stop()
 
+    # write the summary with the histograms next to the logs
+    summary = statistics.summary(int(config['runtime']))
+
+    # the scenario of faults the simulation ran under
+    if 'scenario' in config:
+        summary['scenario'] = config['scenario']
+
+    # write the traced spans, and break them down in the summary
+    if spans is not None:
+        spans.save(os.path.join(log_dir, f"spans-{name}.npz"))
+        summary['spans'] = spans.breakdown()
+
+    with open(os.path.join(log_dir, f"summary-{name}.json"), 'w') as f:
+        json.dump(summary, f, indent=4)
+
+    # write the seeds of the random number streams, to reproduce the run, and
+    # the sampling of the logged transactions
+    with open(os.path.join(log_dir, f"meta-{name}.json"), 'w') as f:
+        json.dump({"seed": seed, "streams": streams.metadata(), "sampling": sampling}, f, indent=4)
+
+    return name
+
+
+def summarize(n, config, seasonality, log_dir, log_prefix, description, seed=None):
+    """
+    Function to run a simulation without any logging. Only the statistics of
+    the transactions and of every kind of server are collected in memory, and
+    written as a single summary, together with the seeds of the random number
+    streams.
+
+    Parameters
+    ----------
+    n: int
+        The Nth simulation.
+    config: dict
+        Configuration for the simulation, see main.
+    seasonality: string
+        Path to the seasonality file.
+    log_dir: string
+        Path pointing to where the summary should be written.
+    log_prefix: string
+        Prefix of the summary file.
+    description: string
+        Description of the simulation, which is part of the file name.
+    seed: int
+        Root seed of the random number streams. Default: fresh entropy.
+
+    Returns
+    -------
+    string
+    """
+    # we need a new environment without any loggers
+    environment = Environment()
+    statistics = Statistics()
+    streams = Streams(seed)
+    build(environment, config, seasonality, statistics=statistics, streams=streams)
+
+    environment.run(until=int(config['runtime']))
+
+    summary = statistics.summary(int(config['runtime']))
+
+    # the scenario of faults the simulation ran under
+    if 'scenario' in config:
+        summary['scenario'] = config['scenario']
+
+    summary['meta'] = {"seed": seed, "streams": streams.metadata()}
+
+    name = "summary-{0}_{1:04d}_{2}_{3}.json".format(log_prefix, n, datetime.now().strftime("%Y-%m-%d_%H-%M"),
+                                                    description.replace(" ", "-"))
+    with open(os.path.join(log_dir, name), 'w') as f:
+        json.dump(summary, f, indent=4)
+
+    return name
+
+
+def simulate(config, seasonality, seed):
+    """
+    Function to run a single replication of a simulation. Nothing is logged,
+    only summary statistics are collected in memory.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration for the simulation, see main.
+    seasonality: string
+        Path to the seasonality file.
+    seed: numpy.random.SeedSequence
+        Seed of this replication.
+
+    Returns
+    -------
+    dict
+    """
+    # we need a new environment without any loggers
+    environment = Environment()
+    statistics = Statistics()
+
+    # every replication has its own streams, which are the same for every
+    # configuration, so configurations are compared under common random numbers
+    build(environment, config, seasonality, statistics=statistics, streams=Streams(seed))
+
+    environment.run(until=int(config['runtime']))
+
+    return statistics.summary(int(config['runtime']))
+
+
+def replicate(args, n, config, seasonality, log_dir):
+    """
+    Function to run replications of a simulation until the confidence intervals
+    of the summary metrics are narrow enough, and write the merged result.
+
+    Parameters
+    ----------
+    args: Namespace
+        Parsed commandline arguments.
+    n: int
+        The Nth simulation.
+    config: dict
+        Configuration for the simulation, see main.
+    seasonality: string
+        Path to the seasonality file.
+    log_dir: string
+        Path pointing to where the result should be written.
+
+    Returns
+    -------
+    string
+    """
+    replications = Replications(partial(simulate, config, seasonality),
+                                workers=args.workers, seed=args.seed, confidence=args.confidence)
+
+    result = replications.run(minimum=args.min_replications, maximum=args.replications,
+                              precision=args.precision)
+
+    # show the merged metrics
+    for metric, i in sorted(result['metrics'].items()):
+        print(f"{metric:<40} {i['mean']:12.6g} +/- {i['halfwidth']:.3g}")
+    print(f"{result['replications']} replications (seed {result['seed']}), "
+          f"converged: {result['converged']}")
+
+    # write the merged result next to the logs
+    name = "replications_{0:04d}_{1}_{2}.json".format(n, datetime.now().strftime("%Y-%m-%d_%H-%M"),
+                                                      config['description'].replace(" ", "-"))
+    with open(os.path.join(log_dir, name), 'w') as f:
+        json.dump(result, f, indent=4)
+
     return name
 
 
@@ -160,9 +439,20 @@ if __name__ == "__main__":
     # get simulation count by counting number of simulation files in folder
     n = len(glob.glob(os.path.join(log_dir, log_prefix+'*'))) + 1
 
-    # run main
-    location_file = main(n=n, config=config, seasonality=seasonality,
-                         log_dir=log_dir, log_prefix=log_prefix,
-                         description=config['description'])
+    if args.replications:
+        # run replications without any logging
+        location_file = replicate(args, n=n, config=config, seasonality=seasonality, log_dir=log_dir)
+
+    elif args.stats_only:
+        # run a single simulation without any logging
+        location_file = summarize(n=n, config=config, seasonality=seasonality, log_dir=log_dir,
+                                  log_prefix=log_prefix, description=config['description'], seed=args.seed)
+
+    else:
+        # run main
+        location_file = main(n=n, config=config, seasonality=seasonality,
+                             log_dir=log_dir, log_prefix=log_prefix,
+                             description=config['description'], trace_rate=args.trace_rate, seed=args.seed,
+                             sampling=args.log_sampling)
     print(f"Simulation is done and can be found at {os.path.join(log_dir,location_file)}.")
     print(f"Total time {datetime.now() - starttime}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Script to convert logfiles to the columnar store from the command line. All
+logfiles in the given directories are converted in parallel and registered in
+the catalog, logfiles that did not change since their conversion are skipped.
+
+@file   convert_logs.py
+"""
+
+# dependencies
+from lib.Catalog import Catalog, CATALOG_PATH
+from lib.LogStore import convert, STORE_PATH
+
+# 3rd party dependencies
+import os
+import glob
+from datetime import datetime
+from multiprocessing import Pool
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+# Find directory of this file
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Directories with logfiles of both simulations
+LOG_DIRS = [os.path.join(FILE_DIR, 'logs'), os.path.normpath(os.path.join(FILE_DIR, '..', 'app2', 'logs'))]
+
+
+def parse_args():
+    "Parses inputs from commandline and returns them as a Namespace object."
+
+    parser = ArgumentParser(prog='convert_logs.py',
+                            formatter_class=RawTextHelpFormatter,
+                            description=' Converts logfiles to the columnar store from command line.')
+    parser.add_argument('paths', nargs='*', default=LOG_DIRS,
+                        help='logfiles or directories with logfiles (default: logs of app and app2)')
+    parser.add_argument('-o', '--output', default=STORE_PATH,
+                        help='directory to write the stores to (default: logs/columnar)')
+    parser.add_argument('--catalog', default=CATALOG_PATH,
+                        help='path to the catalog of converted logfiles (default: logs/catalog.sqlite)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of parallel worker processes (default: number of cpus)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='also convert logfiles that were converted before')
+
+    return parser.parse_args()
+
+
+def logfiles(paths):
+    """
+    Function to find the logfiles of the simulations.
+
+    Parameters
+    ----------
+    paths: list
+        Logfiles or directories with logfiles.
+
+    Returns
+    -------
+    list
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, 'log_*.csv')) +
+                                glob.glob(os.path.join(path, 'error-log_*.csv'))))
+        else:
+            found.append(path)
+
+    return found
+
+
+def convert_task(task):
+    """
+    Function to convert a single logfile. This runs in a worker process.
+
+    Parameters
+    ----------
+    task: tuple
+        Path to the logfile and the directory to write the store to.
+
+    Returns
+    -------
+    dict
+    """
+    return convert(*task)
+
+
+# run this as main
+if __name__ == "__main__":
+    # For timing get current time
+    starttime = datetime.now()
+
+    args = parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.catalog)), exist_ok=True)
+    catalog = Catalog(args.catalog)
+
+    # only convert what changed since it was converted
+    found = logfiles(args.paths)
+    sources = [source for source in found if args.force or catalog.lookup(source) is None]
+    tasks = [(source, args.output) for source in sources]
+
+    if len(tasks) > 1 and args.workers > 1:
+        with Pool(min(args.workers, len(tasks))) as pool:
+            results = pool.map(convert_task, tasks)
+    else:
+        results = [convert_task(task) for task in tasks]
+
+    # the catalog is written by this process only
+    for result in results:
+        catalog.register(**result)
+        print(f"{result['kind']:<9} {result['rows']:>10} rows  {result['source']} -> {result['store']}")
+
+    print(f"converted {len(results)} logfiles, {len(found) - len(sources)} others up to date "
+          f"(in {datetime.now() - starttime})")
@@ -0,0 +1,201 @@
+"""
+Class for scaling a pool of servers at runtime. The autoscaler periodically
+samples the cpu usage and queue length of the servers in a pool, and adds or
+drains servers when the average over a window of samples crosses a threshold.
+New servers only become available after a provisioning delay, and no decision
+is made during a cooldown after the previous one.
+
+@file   lib/AutoScaler.py
+@scope  public
+"""
+
+# dependencies
+from collections import deque
+
+
+class AutoScaler(object):
+
+    def __init__(self, envoirment, pool, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        pool: Servers
+            The pool of servers to scale.
+
+        Keyworded parameters
+        --------------------
+        min: integer
+            Minimum number of servers.
+            Default: 1.
+        max: integer
+            Maximum number of servers.
+            Default: 10 times the initial size of the pool.
+        interval: float
+            Time between two samples of the pool.
+            Default: 1.
+        window: integer
+            Number of samples to average over.
+            Default: 10.
+        up: float
+            Average cpu usage above which a server is added.
+            Default: 0.7.
+        down: float
+            Average cpu usage below which a server is drained.
+            Default: 0.3.
+        queue: float
+            Average queue length per server above which a server is added,
+            regardless of the cpu usage.
+            Default: 1.
+        delay: float
+            Provisioning delay of a new server.
+            Default: 30.
+        cooldown: float
+            Time after a scaling decision in which no new decision is made.
+            Default: 60.
+        statistics: Statistics
+            Collector of summary statistics, to report the scaling to.
+            [optional]
+        """
+        self._env = envoirment
+        self._pool = pool
+
+        self._min = kwargs['min'] if 'min' in kwargs else 1
+        self._max = kwargs['max'] if 'max' in kwargs else 10 * len(pool.servers())
+        self._interval = kwargs['interval'] if 'interval' in kwargs else 1
+        self._up = kwargs['up'] if 'up' in kwargs else 0.7
+        self._down = kwargs['down'] if 'down' in kwargs else 0.3
+        self._queue = kwargs['queue'] if 'queue' in kwargs else 1
+        self._delay = kwargs['delay'] if 'delay' in kwargs else 30
+        self._cooldown = kwargs['cooldown'] if 'cooldown' in kwargs else 60
+
+        # recent samples of the average cpu usage and queue length
+        self._samples = deque(maxlen=kwargs['window'] if 'window' in kwargs else 10)
+
+        # number of servers that are being provisioned
+        self._provisioning = 0
+
+        # time until which no scaling decision is made
+        self._frozen = 0
+
+        # time integral of the number of servers, and its extremes
+        self._server_seconds = 0
+        self._lowest = self._highest = len(pool.servers())
+
+        if 'statistics' in kwargs and kwargs['statistics']:
+            kwargs['statistics'].scaler(self)
+
+        # Initialize autoscaler
+        self.process = envoirment.process(self.run())
+
+    def kind(self):
+        """
+        Getter to expose the kind of the scaled pool.
+
+        Returns
+        -------
+        string
+        """
+        return self._pool.kind()
+
+    def size(self):
+        """
+        Method to expose the number of servers that consume resources, which
+        includes servers that are being provisioned or drained.
+
+        Returns
+        -------
+        int
+        """
+        return len(self._pool.servers()) + len(self._pool.draining()) + self._provisioning
+
+    def run(self):
+        """
+        Generator method that samples the pool and scales it.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+
+            # account for the servers that were running during the interval
+            size = self.size()
+            yield self._env.timeout(self._interval)
+            self._server_seconds += size * self._interval
+
+            # forget about drained servers that are done
+            self._pool.retire()
+
+            # sample the load of the servers that receive messages
+            servers = self._pool.servers()
+            cpu = sum(server.cpu() for server in servers) / len(servers)
+            queue = sum(len(server.queue) for server in servers) / len(servers)
+            self._samples.append((cpu, queue))
+
+            self._env.log((self._env.now, self.kind(), len(servers), self._provisioning,
+                           len(self._pool.draining()), cpu, queue, self._server_seconds),
+                          type="scaling")
+
+            # wait for a full window, and for the cooldown to pass
+            if len(self._samples) < self._samples.maxlen or self._env.now < self._frozen:
+                continue
+
+            cpu = sum(sample[0] for sample in self._samples) / len(self._samples)
+            queue = sum(sample[1] for sample in self._samples) / len(self._samples)
+            running = len(servers) + self._provisioning
+
+            # scale up when the servers are too busy
+            if (cpu > self._up or queue > self._queue) and running < self._max:
+                self._env.process(self.provision())
+
+            # scale down when the servers are idle
+            elif cpu < self._down and queue == 0 and len(servers) > self._min:
+                self._pool.drain()
+                self._lowest = min(self._lowest, len(servers))
+
+            else:
+                continue
+
+            self._frozen = self._env.now + self._cooldown
+            self._samples.clear()
+
+    def provision(self):
+        """
+        Generator method that adds a server to the pool after the
+        provisioning delay.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        self._provisioning += 1
+        self._highest = max(self._highest, len(self._pool.servers()) + self._provisioning)
+
+        yield self._env.timeout(self._delay)
+
+        self._provisioning -= 1
+        self._pool.add()
+
+    def summary(self, runtime):
+        """
+        Method to summarise the scaling of the pool.
+
+        Parameters
+        ----------
+        runtime: float
+            Simulated time of the run.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "servers": len(self._pool.servers()),
+            "min_servers": self._lowest,
+            "max_servers": self._highest,
+            "server_seconds": self._server_seconds,
+            "mean_servers": self._server_seconds / runtime,
+        }
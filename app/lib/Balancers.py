@@ -0,0 +1,300 @@
+"""
+Collection of load balancing strategies, which decide what server of a pool
+receives the next message. Every pool of servers uses one strategy, which can
+be selected by name from the configuration of a simulation.
+
+@file   lib/Balancers.py
+@scope  private
+"""
+
+# dependencies
+from abc import ABCMeta, abstractmethod
+from bisect import bisect
+from zlib import crc32
+from lib.Streams import generator
+
+
+class Balancer(metaclass=ABCMeta):
+
+    def __init__(self, random=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        random: numpy.random.Generator
+            Generator of the random choices of this strategy.
+            Default: a generator with fresh entropy.
+        """
+        self._random = generator(random)
+
+    @abstractmethod
+    def select(self, pool, exclude, key=None):
+        """
+        Abstract method to select a server from a pool.
+
+        Parameters
+        ----------
+        pool: list
+            Servers to select from.
+        exclude: set
+            Servers that should not be selected.
+        key: mixed
+            Key of the transaction the message belongs to (e.g. its uuid).
+
+        Returns
+        -------
+        Server|None
+        """
+        pass
+
+    def update(self, pool):
+        """
+        Method that is called when servers are added to or removed from the
+        pool, for strategies that keep state about the servers.
+
+        Parameters
+        ----------
+        pool: list
+            Servers of the pool.
+        """
+        pass
+
+
+class LeastQueue(Balancer):
+    """
+    Select the server with the lowest number of messages in its queue. The
+    pool is shuffled first, so ties are spread in a low volume system.
+    """
+
+    def select(self, pool, exclude, key=None):
+        self._random.shuffle(pool)
+
+        lowest = None
+        lowest_queue = None
+
+        for server in pool:
+
+            # pass servers that we need to exclude
+            if server in exclude:
+                continue
+
+            queue = len(server.queue)
+            if lowest is None or queue < lowest_queue:
+                lowest, lowest_queue = server, queue
+
+        return lowest
+
+
+class Random(Balancer):
+    """
+    Select a random server.
+    """
+
+    def select(self, pool, exclude, key=None):
+        candidates = [server for server in pool if server not in exclude] if exclude else pool
+        return candidates[self._random.integers(len(candidates))] if candidates else None
+
+
+class Stuck(Balancer):
+    """
+    Select the same server for every message, picked at random when
+    constructed. Exclusions are ignored.
+    """
+
+    def __init__(self, pool, random=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        pool: list
+            Servers to pick the server from.
+        random: numpy.random.Generator
+            Generator to pick the server with.
+        """
+        super().__init__(random)
+        self.server = pool[self._random.integers(len(pool))]
+
+    def select(self, pool, exclude, key=None):
+        return self.server
+
+
+class PowerOfTwo(Balancer):
+    """
+    Select two random servers and take the one with the fewest messages,
+    queued and in service. This costs two lookups regardless of pool size.
+    """
+
+    def select(self, pool, exclude, key=None):
+        size = len(pool)
+
+        # small pools are compared entirely
+        if size <= 2:
+            candidates = [server for server in pool if server not in exclude]
+
+        else:
+            # draw two different servers
+            first = self._random.integers(size)
+            second = self._random.integers(size - 1)
+            if second >= first:
+                second += 1
+
+            candidates = [server for server in (pool[first], pool[second]) if server not in exclude]
+
+            # fall back on a random server when both are excluded
+            if not candidates:
+                return Random(self._random).select(pool, exclude)
+
+        if not candidates:
+            return None
+
+        return min(candidates, key=lambda server: server.count + len(server.queue))
+
+
+class RoundRobin(Balancer):
+    """
+    Select servers in turn.
+    """
+
+    def __init__(self, random=None):
+        """
+        Constructor.
+        """
+        super().__init__(random)
+        self._next = 0
+
+    def select(self, pool, exclude, key=None):
+        size = len(pool)
+
+        for _ in range(size):
+            server = pool[self._next % size]
+            self._next = (self._next + 1) % size
+
+            if server not in exclude:
+                return server
+
+        return None
+
+
+class WeightedLeastConnections(Balancer):
+    """
+    Select the server with the fewest messages, queued and in service,
+    relative to its capacity.
+    """
+
+    def select(self, pool, exclude, key=None):
+        lowest = None
+        lowest_load = None
+
+        for server in pool:
+
+            # pass servers that we need to exclude
+            if server in exclude:
+                continue
+
+            load = (server.count + len(server.queue)) / server.capacity
+            if lowest is None or load < lowest_load:
+                lowest, lowest_load = server, load
+
+        return lowest
+
+
+class ConsistentHash(Balancer):
+    """
+    Select a server by hashing the key of the transaction onto a ring of
+    servers, so all messages of a transaction go to the same server. An
+    excluded server passes its messages on to the next server on the ring.
+    """
+
+    def __init__(self, random=None, replicas=64):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        random: numpy.random.Generator
+            Generator for messages without a key.
+        replicas: integer
+            Number of points per server on the ring, which evens out the
+            distribution of keys over the servers.
+        """
+        super().__init__(random)
+        self._replicas = replicas
+
+        # sorted points on the ring, and the server of every point
+        self._points = []
+        self._servers = []
+
+    def update(self, pool):
+        """
+        Method to (re)build the ring for a pool of servers.
+
+        Parameters
+        ----------
+        pool: list
+            Servers to place on the ring.
+        """
+        ring = sorted((crc32(f"{server.name()}-{i}".encode()), server)
+                      for server in pool for i in range(self._replicas))
+
+        self._points = [point for (point, _) in ring]
+        self._servers = [server for (_, server) in ring]
+
+    def select(self, pool, exclude, key=None):
+
+        # the ring is built on first use
+        if not self._servers:
+            self.update(pool)
+
+        # messages without a key are spread at random
+        if key is None:
+            return Random(self._random).select(pool, exclude)
+
+        point = (key.int if hasattr(key, 'int') else crc32(str(key).encode())) & 0xffffffff
+        start = bisect(self._points, point)
+
+        # walk the ring until a server that is not excluded
+        for i in range(len(self._servers)):
+            server = self._servers[(start + i) % len(self._servers)]
+            if server not in exclude:
+                return server
+
+        return None
+
+
+# strategies by their name in the configuration
+BALANCERS = {
+    'least-queue': LeastQueue,
+    'random': Random,
+    'power-of-two': PowerOfTwo,
+    'round-robin': RoundRobin,
+    'weighted-least-connections': WeightedLeastConnections,
+    'consistent-hash': ConsistentHash,
+}
+
+
+def balancer(name, random=None):
+    """
+    Function to construct a load balancing strategy by its name.
+
+    Parameters
+    ----------
+    name: string
+        Name of the strategy, one of the keys of BALANCERS.
+    random: numpy.random.Generator
+        Generator of the random choices of the strategy.
+
+    Returns
+    -------
+    Balancer
+
+    Throws
+    ------
+    ValueError
+        Is raised when the strategy does not exist.
+    """
+    if name not in BALANCERS:
+        raise ValueError(f"unknown balancer {name}, choose from {', '.join(BALANCERS)}")
+
+    return BALANCERS[name](random)
@@ -0,0 +1,139 @@
+"""
+Class for keeping track of simulation runs in an sqlite catalog. Every logfile
+that is converted to the columnar store is registered here, together with the
+version of the logfile it was converted from, so readers know whether they can
+use the store or should fall back on the logfile itself.
+
+@file   lib/Catalog.py
+@scope  public
+"""
+
+# dependencies
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+# get location of the catalog relative to this file
+CATALOG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../logs/catalog.sqlite'))
+
+
+class Catalog(object):
+
+    def __init__(self, path=CATALOG_PATH):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        path: string
+            Path to the sqlite database, which is created when it does
+            not exist yet.
+        """
+        self._path = path
+
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    source      TEXT PRIMARY KEY,
+                    store       TEXT NOT NULL,
+                    kind        TEXT NOT NULL,
+                    rows        INTEGER NOT NULL,
+                    start       REAL,
+                    end         REAL,
+                    mtime       INTEGER NOT NULL,
+                    size        INTEGER NOT NULL,
+                    converted   TEXT NOT NULL
+                )""")
+
+    @contextmanager
+    def _connect(self):
+        """
+        Method to open a connection to the catalog, which commits when the
+        block succeeds and is closed when the block is left.
+
+        Returns
+        -------
+        sqlite3.Connection
+        """
+        connection = sqlite3.connect(self._path)
+
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def register(self, source, store, kind, rows, start, end):
+        """
+        Method to register (or replace) the columnar store of a logfile.
+
+        Parameters
+        ----------
+        source: string
+            Path to the logfile.
+        store: string
+            Path to the columnar store of the logfile.
+        kind: string
+            Kind of log, 'messages' or 'errors'.
+        rows: integer
+            Number of rows in the store.
+        start: float
+            First time in the log.
+        end: float
+            Last time in the log.
+
+        Returns
+        -------
+        self
+        """
+        stat = os.stat(source)
+
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (os.path.realpath(source), os.path.realpath(store), kind, rows, start, end,
+                                stat.st_mtime_ns, stat.st_size, datetime.now().isoformat()))
+
+        # allow chaining
+        return self
+
+    def lookup(self, source):
+        """
+        Method to find the columnar store of a logfile, as long as the logfile
+        did not change since it was converted.
+
+        Parameters
+        ----------
+        source: string
+            Path to the logfile.
+
+        Returns
+        -------
+        string|None
+            Path to the store.
+        """
+        if not os.path.exists(source):
+            return None
+
+        with self._connect() as connection:
+            row = connection.execute("SELECT store, mtime, size FROM runs WHERE source = ?",
+                                     (os.path.realpath(source),)).fetchone()
+
+        if row is None or not os.path.exists(row[0]):
+            return None
+
+        stat = os.stat(source)
+        return row[0] if (row[1], row[2]) == (stat.st_mtime_ns, stat.st_size) else None
+
+    def runs(self):
+        """
+        Method to list all registered runs.
+
+        Returns
+        -------
+        list
+            Dictionaries describing the runs.
+        """
+        with self._connect() as connection:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute("SELECT * FROM runs ORDER BY source")]
@@ -36,8 +36,12 @@ class Environment(simpy.Environment):
             Type of log message. Supported types are:
             - info:     Regular info messages.
             - error:    Error messages.
-        message: string
-            Message to log.
+            - scaling:  Size of the server pools over time.
+        message: string|tuple
+            Message to log, or the fields of a structured message, which
+            are only formatted by the loggers that write it.
+        level: integer
+            Level of logging (default: 20).
 
         Returns
         -------
@@ -45,11 +49,29 @@ class Environment(simpy.Environment):
         """
 
         # log the message on all loggers of the given type
-        [Logger.log(message, level) for Logger in self._loggers[type]]
+        [Logger.log(message, level) for Logger in self._loggers.get(type, [])]
 
         # allow chaining
         return self
 
+    def enabled(self, level=20, type="info"):
+        """
+        Method to check whether any logger of a type writes messages of a
+        level, so a message does not have to be constructed when none does.
+
+        Parameters
+        ----------
+        level: integer
+            Level of logging (default: 20).
+        type: string
+            Type of log message.
+
+        Returns
+        -------
+        bool
+        """
+        return any(Logger.enabled(level) for Logger in self._loggers.get(type, ()))
+
     def logger(self, Logger, type="info"):
         """
         Method to install a logger for a specific type of log on this environment.
@@ -60,6 +82,7 @@ class Environment(simpy.Environment):
             Type of logger. Supported types are:
             - info:     Regular info logger.
             - error:    Error logger.
+            - scaling:  Logger of the size of the server pools.
         Logger: Logger
             Logger instance that will log those messages.
 
@@ -69,7 +92,7 @@ class Environment(simpy.Environment):
         """
 
         # install the logger
-        self._loggers[type].append(Logger)
+        self._loggers.setdefault(type, []).append(Logger)
 
         # allow chaining
         return self
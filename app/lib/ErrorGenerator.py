@@ -1,4 +1,4 @@
-from numpy.random import uniform
+from lib.Streams import generator
 
 
 class ErrorGenerator(object):
@@ -10,6 +10,12 @@ class ErrorGenerator(object):
         ----------
         envoirment: instance of Envoirment class
         servers: instance of MultiServers pool
+
+        Keyworded parameters
+        --------------------
+        random: numpy.random.Generator
+            Generator of the errors.
+            Default: a generator with fresh entropy.
         """
 
         # Set serverpools
@@ -21,29 +27,28 @@ class ErrorGenerator(object):
         self.errorwait = errorwait
         self.error_duration = error_duration
 
+        # generator of the errors
+        self._random = generator(kwargs['random'] if 'random' in kwargs else None)
+
         # Initialize error generator
         self.error_generator = envoirment.process(self.error_generator())
 
     def error_generator(self):
         while True:
             # Wait a random amount of time to introduce the error
-            yield self._env.timeout(uniform(*self.errorwait))
+            yield self._env.timeout(self._random.uniform(*self.errorwait))
 
             # Get random server
-            server = self._pools.random_pool().get_random()
+            server = self._pools.random_pool(self._random).get_random(random=self._random)
             # Write to error log
             self._env.log(
-                message=f'{self._env.now};{server.state()["name"]};Block;Start', type="error")
-            # Make an equal amount of requests to the capacity of the server
-            # Make a list of requests
-            request_list = [server.request(priority=0) for i in range(server.capacity)]
-            for request in request_list:
-                yield request  # Send priority request to PreemptiveResource
+                message=(self._env.now, server.state()["name"], 'Block', 'Start'), type="error")
+            # Block the entire capacity of the server at once
+            server.block()
             # Wait for the error to be resolved
-            yield self._env.timeout(uniform(*self.error_duration))
-            # Release spots in server when the error is resolved
-            for request in request_list:
-                yield server.release(request)
+            yield self._env.timeout(self._random.uniform(*self.error_duration))
+            # Unblock the server when the error is resolved
+            server.unblock()
             # Write to error log
             self._env.log(
-                message=f'{self._env.now};{server.state()["name"]};Block;Stop', type="error")
+                message=(self._env.now, server.state()["name"], 'Block', 'Stop'), type="error")
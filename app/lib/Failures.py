@@ -0,0 +1,211 @@
+"""
+Class for failing the servers of a pool at random. Every failure blocks the
+entire capacity of a server until it is repaired, with times to failure and
+times to repair drawn from configurable distributions (MTTF and MTTR). Failures
+are either a renewal process per server, where a server runs until it fails and
+is repaired before its next time to failure starts, or a single process per
+pool, where failures hit a random server and may overlap, also on the same
+server.
+
+@file   lib/Failures.py
+@scope  public
+"""
+
+# dependencies
+from lib.Streams import generator
+
+
+class Failures(object):
+
+    def __init__(self, envoirment, pool, mttf, mttr, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        pool: Servers
+            The pool of servers to fail.
+        mttf: float|dict
+            Distribution of the times to failure, see distribution.
+        mttr: float|dict
+            Distribution of the times to repair, see distribution.
+
+        Keyworded parameters
+        --------------------
+        scope: string
+            'server' for a failure process per server of the pool at the
+            start, or 'pool' for a single failure process for the pool.
+            Default: 'server'.
+        statistics: Statistics
+            Collector of summary statistics, to report the availability to.
+            [optional]
+        random: numpy.random.Generator
+            Generator of the failures.
+            Default: a generator with fresh entropy.
+        """
+        self._env = envoirment
+        self._pool = pool
+        self._scope = kwargs['scope'] if 'scope' in kwargs else 'server'
+
+        self._random = generator(kwargs['random'] if 'random' in kwargs else None)
+        self._ttf = distribution(mttf, self._random)
+        self._ttr = distribution(mttr, self._random)
+
+        # number of failures, and the time servers were blocked by them
+        self._failures = 0
+        self._downtime = 0
+
+        # failures that are not repaired yet, and when they started
+        self._open = {}
+
+        # number of servers during the run, to compute the availability
+        self._servers = len(pool.servers())
+
+        if 'statistics' in kwargs and kwargs['statistics']:
+            kwargs['statistics'].failures(self)
+
+        # Initialize the failure processes
+        if self._scope == 'pool':
+            self.processes = [envoirment.process(self.pool_failures())]
+        elif self._scope == 'server':
+            self.processes = [envoirment.process(self.server_failures(server)) for server in pool.servers()]
+        else:
+            raise ValueError(f"Unknown scope of failures: {self._scope}")
+
+    def kind(self):
+        """
+        Getter to expose the kind of the failing pool.
+
+        Returns
+        -------
+        string
+        """
+        return self._pool.kind()
+
+    def server_failures(self, server):
+        """
+        Generator method that fails a single server over and over again.
+
+        Parameters
+        ----------
+        server: Server
+            The server to fail.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+            yield self._env.timeout(self._ttf())
+            yield from self.failure(server)
+
+    def pool_failures(self):
+        """
+        Generator method that fails random servers of the pool, without waiting
+        for the repair of the previous failure.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+            yield self._env.timeout(self._ttf())
+
+            # the server is chosen among the servers at the time of failure
+            servers = self._pool.servers()
+            self._env.process(self.failure(servers[self._random.integers(len(servers))]))
+
+    def failure(self, server):
+        """
+        Generator method of a single failure, which blocks a server until it
+        is repaired.
+
+        Parameters
+        ----------
+        server: Server
+            The server that fails.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        start = self._env.now
+        self._failures += 1
+        failure = self._failures
+        self._open[failure] = start
+
+        self._env.log((self._env.now, server.name(), 'Block', 'Start'), type="error")
+        server.block()
+
+        yield self._env.timeout(self._ttr())
+
+        server.unblock()
+        self._env.log((self._env.now, server.name(), 'Block', 'Stop'), type="error")
+
+        del self._open[failure]
+        self._downtime += self._env.now - start
+
+    def summary(self, runtime):
+        """
+        Method to summarise the failures of the pool.
+
+        Parameters
+        ----------
+        runtime: float
+            Simulated time of the run.
+
+        Returns
+        -------
+        dict
+        """
+        # failures that are not repaired yet count until the end of the run
+        downtime = self._downtime + sum(runtime - start for start in self._open.values())
+
+        return {
+            "failures": self._failures,
+            "downtime": downtime,
+            "availability": 1 - downtime / (self._servers * runtime) if runtime else 1.0,
+        }
+
+
+def distribution(spec, random):
+    """
+    Function to create a sampler of durations. A number is the mean of an
+    exponential distribution, a dictionary names a "distribution" with its
+    parameters:
+    - exponential:  mean
+    - weibull:      shape, scale
+    - lognormal:    mean, sigma (of the underlying normal distribution)
+    - uniform:      low, high
+    - constant:     value
+
+    Parameters
+    ----------
+    spec: float|dict
+        Specification of the distribution.
+    random: numpy.random.Generator
+        Generator to sample from.
+
+    Returns
+    -------
+    callable
+        Function without parameters that samples a duration.
+    """
+    if not isinstance(spec, dict):
+        spec = {"distribution": "exponential", "mean": spec}
+
+    name = spec.get('distribution', 'exponential')
+
+    if name == 'exponential':
+        return lambda: random.exponential(spec['mean'])
+    if name == 'weibull':
+        return lambda: spec['scale'] * random.weibull(spec['shape'])
+    if name == 'lognormal':
+        return lambda: random.lognormal(spec['mean'], spec['sigma'])
+    if name == 'uniform':
+        return lambda: random.uniform(spec['low'], spec['high'])
+    if name == 'constant':
+        return lambda: spec['value']
+
+    raise ValueError(f"Unknown distribution: {name}")
@@ -0,0 +1,258 @@
+"""
+Class for recording durations in a log-linear histogram, in the style of an
+HDR histogram. Every power of two between the lowest and the highest trackable
+value is divided into a fixed number of linear buckets, so every recorded value
+is kept with the same relative precision in constant memory. Recording is O(1),
+and histograms with the same layout can be merged by adding their counts.
+
+@file   lib/Histogram.py
+@scope  public
+"""
+
+# dependencies
+from math import frexp
+import numpy as np
+
+
+class Histogram(object):
+
+    def __init__(self, **kwargs):
+        """
+        Constructor.
+
+        Keyworded parameters
+        --------------------
+        lowest: float
+            Lowest value that is told apart from zero. Lower values are
+            counted in the first bucket.
+            Default: 1e-6.
+        highest: float
+            Highest trackable value. Higher values are counted in the last
+            bucket, but still count towards the mean and maximum.
+            Default: 1e5.
+        precision: integer
+            Number of linear buckets per power of two. The relative error of
+            a percentile is at most half a bucket, i.e. 1 / (2 * precision).
+            Default: 128.
+        """
+        self._lowest = kwargs['lowest'] if 'lowest' in kwargs else 1e-6
+        self._highest = kwargs['highest'] if 'highest' in kwargs else 1e5
+        self._precision = kwargs['precision'] if 'precision' in kwargs else 128
+
+        # number of powers of two between the lowest and the highest value
+        self._powers = int(np.ceil(np.log2(self._highest / self._lowest))) + 1
+
+        # counts of all buckets
+        self.counts = np.zeros(self._powers * self._precision, dtype=np.int64)
+
+        # exact aggregates of all recorded values
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def layout(self):
+        """
+        Getter to expose the layout of the buckets, which should be the same
+        for histograms that are merged.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self._lowest, self._highest, self._precision)
+
+    def index(self, value):
+        """
+        Method to compute the bucket of a value.
+
+        Parameters
+        ----------
+        value: float
+            Value to find the bucket of.
+
+        Returns
+        -------
+        int
+        """
+        # values below the lowest end up in the first bucket
+        if value < self._lowest:
+            return 0
+
+        # the mantissa is in [0.5, 1) and divides the power into linear buckets
+        mantissa, exponent = frexp(value / self._lowest)
+        index = (exponent - 1) * self._precision + int((2 * mantissa - 1) * self._precision)
+
+        return min(index, self.counts.size - 1)
+
+    def value(self, index):
+        """
+        Method to compute the representative value of a bucket, halfway
+        between its bounds.
+
+        Parameters
+        ----------
+        index: int|numpy.ndarray
+            Index of the bucket.
+
+        Returns
+        -------
+        float|numpy.ndarray
+        """
+        power, bucket = np.divmod(index, self._precision)
+        return self._lowest * np.exp2(power) * (1 + (bucket + 0.5) / self._precision)
+
+    def record(self, value):
+        """
+        Method to record a value.
+
+        Parameters
+        ----------
+        value: float
+            Value to record.
+
+        Returns
+        -------
+        self
+        """
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.sum += value
+
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        # allow chaining
+        return self
+
+    def merge(self, other):
+        """
+        Method to add the values of another histogram to this one.
+
+        Parameters
+        ----------
+        other: Histogram
+            Histogram with the same layout.
+
+        Returns
+        -------
+        self
+
+        Throws
+        ------
+        ValueError
+            Is raised when the layouts of the histograms differ.
+        """
+        if other.layout() != self.layout():
+            raise ValueError(f"cannot merge histogram with layout {other.layout()} into {self.layout()}")
+
+        self.counts += other.counts
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        # allow chaining
+        return self
+
+    def mean(self):
+        """
+        Getter to expose the exact mean of the recorded values.
+
+        Returns
+        -------
+        float
+        """
+        return float(self.sum / self.count) if self.count else 0.0
+
+    def percentile(self, q):
+        """
+        Method to estimate a percentile of the recorded values.
+
+        Parameters
+        ----------
+        q: float
+            Percentile between 0 and 100.
+
+        Returns
+        -------
+        float
+        """
+        if not self.count:
+            return 0.0
+
+        # the bucket in which the rank of the percentile falls
+        rank = max(1, int(np.ceil(q / 100 * self.count)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side='left'))
+
+        # the exact extremes are known, and bound every estimate
+        return float(min(max(self.value(index), self.min), self.max))
+
+    def describe(self):
+        """
+        Method to describe the recorded values by their count, mean and
+        tail percentiles.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+        }
+
+    def to_dict(self):
+        """
+        Method to export the histogram as a json serializable dictionary,
+        with only the buckets that have a count.
+
+        Returns
+        -------
+        dict
+        """
+        nonzero = np.flatnonzero(self.counts)
+
+        return {
+            "lowest": self._lowest,
+            "highest": self._highest,
+            "precision": self._precision,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "index": nonzero.tolist(),
+            "counts": self.counts[nonzero].tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Method to construct a histogram from an exported dictionary.
+
+        Parameters
+        ----------
+        data: dict
+            Dictionary as produced by to_dict.
+
+        Returns
+        -------
+        Histogram
+        """
+        histogram = cls(lowest=data['lowest'], highest=data['highest'], precision=data['precision'])
+
+        histogram.counts[data['index']] = data['counts']
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+
+        if data['count']:
+            histogram.min = data['min']
+            histogram.max = data['max']
+
+        return histogram
@@ -0,0 +1,178 @@
+"""
+This file contains a class to analyse the impact of incidents on a simulation.
+An incident is a server that was blocked, from a "Block;Start" until the next
+"Block;Stop" of that server in the error log. The incidents are kept as an
+interval index: their servers and starts sorted together, so every message can
+be placed in the incident of its server with a single binary search, and the
+message log is traversed only once for all incidents.
+
+@file   Incidents.py
+@scope  public
+"""
+
+# third party dependencies
+import numpy as np
+import pandas as pd
+
+
+class Incidents(object):
+
+    def __init__(self, errors, grace=1.0):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+            errors: DataFrame of an error log, with the Time, Server, Error type
+                    and Start-Stop columns.
+            grace: Seconds after the stop of an incident that messages are still
+                   attributed to it, as messages that were queued during the
+                   incident time out or complete after it. Default: 1, the
+                   default timeout of a message.
+        """
+        errors = errors[errors["Error type"] == "Block"].astype({"Server": object})
+        errors = errors.assign(Time=pd.to_numeric(errors["Time"], errors="coerce")).dropna(subset=["Time"])
+        errors = errors.sort_values("Time", kind="mergesort")
+
+        # the n-th start of a server is stopped by the n-th stop of that server
+        starts = errors[errors["Start-Stop"] == "Start"]
+        stops = errors[errors["Start-Stop"] == "Stop"]
+        starts = starts.assign(n=starts.groupby("Server").cumcount())
+        stops = stops.assign(n=stops.groupby("Server").cumcount())
+
+        incidents = starts.merge(stops, on=["Server", "n"], how="left", suffixes=("_start", "_stop"))
+
+        # incidents that were not stopped last until the end of the simulation
+        self._incidents = pd.DataFrame({
+            "server": incidents["Server"].to_numpy(dtype=object),
+            "start": incidents["Time_start"].to_numpy(dtype=float),
+            "stop": incidents["Time_stop"].fillna(np.inf).to_numpy(dtype=float),
+        })
+
+        # the interval index, ordered by server and then by start
+        self._servers = pd.Index(pd.unique(self._incidents["server"]))
+        codes = self._servers.get_indexer(self._incidents["server"])
+        self._order = np.lexsort((self._incidents["start"].to_numpy(), codes))
+        self._codes = codes[self._order]
+        self._starts = self._incidents["start"].to_numpy()[self._order]
+        self._ends = self._incidents["stop"].to_numpy()[self._order] + grace
+        self._keys = self._codes + 1j * self._starts
+
+    def incidents(self):
+        """
+        Getter to expose the incidents.
+
+        Returns
+        -------
+            DataFrame with the server, start and stop of every incident
+        """
+        return self._incidents.copy()
+
+    def attribute(self, servers, times):
+        """
+        Function to find the incident of the server of every message. A message
+        belongs to the most recently started incident of its server, if it was
+        sent before the end of that incident (including the grace period).
+
+        Parameters
+        ----------
+            servers: 1-dimensional array of the servers of the messages.
+            times: 1-dimensional array of the times of the messages.
+
+        Returns
+        -------
+            array with the number of the incident of every message, or -1
+        """
+        codes = self._servers.get_indexer(np.asarray(servers, dtype=object))
+        times = np.asarray(times, dtype=float)
+
+        # complex numbers are ordered by their real and then their imaginary
+        # part, so a single search finds the last incident of the same server
+        # that started at or before every message
+        positions = np.searchsorted(self._keys, codes + 1j * times, side="right") - 1
+
+        # messages of servers without incidents, before the first incident of
+        # their server, or after the end of its most recent incident
+        found = (codes >= 0) & ~np.isnan(times) & (positions >= 0)
+        found[found] = self._codes[positions[found]] == codes[found]
+        found[found] = times[found] < self._ends[positions[found]]
+
+        incidents = np.full(codes.size, -1, dtype=np.int64)
+        incidents[found] = self._order[positions[found]]
+
+        return incidents
+
+    def impact(self, messages, slow=2.0, sampling=1):
+        """
+        Function to compute the impact of every incident on the messages of a
+        message log. A message is affected by an incident when it timed out or
+        errored (ERROR), or was slow (INFO with a latency of more than a factor
+        of the median latency of its server outside of incidents).
+
+        Parameters
+        ----------
+            messages: DataFrame of a message log, with the Time, Server,
+                      Message_type, Latency and Transaction_ID columns.
+            slow: Factor of the median latency above which a message is slow.
+                  Default: 2.
+            sampling: N, when the INFO messages of only 1 in every N
+                      transactions were logged. Slow messages, and the
+                      transactions that were only slowed, are scaled by N.
+                      Default: 1.
+
+        Returns
+        -------
+            DataFrame with per incident the server, start, stop, duration,
+            number of affected messages and transactions, timeouts, errors,
+            slow messages and the extra latency of the slow messages
+        """
+        messages = messages.dropna(subset=["Server"])
+        servers = messages["Server"].to_numpy(dtype=object)
+        times = pd.to_numeric(messages["Time"], errors="coerce").to_numpy(dtype=float)
+        latency = pd.to_numeric(messages["Latency"], errors="coerce").to_numpy(dtype=float)
+        error = (messages["Message_type"] == "ERROR").to_numpy()
+        timeout = error & messages["Message"].astype(object).str.contains("TIMEOUT", na=False).to_numpy()
+
+        incident = self.attribute(servers, times)
+
+        # the baseline of a server is its median latency outside of incidents
+        normal = (incident < 0) & ~error
+        baseline = pd.Series(latency[normal]).groupby(servers[normal]).median()
+        expected = baseline.reindex(servers).to_numpy()
+
+        slowed = ~error & (latency > slow * expected)
+        affected = (incident >= 0) & (error | slowed)
+
+        # every logged slow message stands for N messages, all errors are logged
+        weight = np.where(slowed, sampling, 1)[affected]
+
+        df = pd.DataFrame({
+            "incident": incident[affected],
+            "transaction": messages["Transaction_ID"].to_numpy(dtype=object)[affected],
+            "messages": weight,
+            "timeout": timeout[affected],
+            "error": error[affected] & ~timeout[affected],
+            "slow": weight * slowed[affected],
+            "extra_latency": weight * np.where(slowed, latency - expected, 0.0)[affected],
+        })
+
+        grouped = df.groupby("incident").agg(
+            messages=("messages", "sum"),
+            timeouts=("timeout", "sum"),
+            errors=("error", "sum"),
+            slow=("slow", "sum"),
+            extra_latency=("extra_latency", "sum"),
+        )
+
+        # transactions with an error are all logged, those that were only
+        # slowed stand for N transactions
+        failed = (df["timeout"] | df["error"]).groupby([df["incident"], df["transaction"]]).any()
+        transactions = pd.Series(np.where(failed, 1, sampling), index=failed.index).groupby(level=0).sum()
+        grouped.insert(1, "transactions", transactions.reindex(grouped.index, fill_value=0))
+
+        # incidents without affected messages are part of the table as well
+        impact = self._incidents.join(grouped.reindex(range(len(self._incidents)), fill_value=0))
+        impact.insert(3, "duration", impact["stop"] - impact["start"])
+
+        return impact.astype({"messages": int, "transactions": int, "timeouts": int,
+                              "errors": int, "slow": int, "extra_latency": float})
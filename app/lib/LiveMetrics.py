@@ -0,0 +1,198 @@
+"""
+Class for publishing live metrics of a running simulation. At a fixed interval
+of simulated time, a snapshot of every pool of servers is taken and appended to
+a bounded ring buffer, which other threads can follow while the simulation runs
+(e.g. to stream the snapshots to a webclient). A running simulation can also be
+aborted from another thread.
+
+@file   lib/LiveMetrics.py
+@scope  public
+"""
+
+# dependencies
+from collections import deque
+from threading import Condition, Event
+
+
+class LiveMetrics(object):
+
+    def __init__(self, envoirment, servers, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        servers: MultiServers
+            The pools of servers to take snapshots of.
+
+        Keyworded parameters
+        --------------------
+        interval: float
+            Simulated time between two snapshots.
+            Default: 1.
+        size: integer
+            Maximum number of snapshots in the ring buffer, older snapshots
+            are dropped.
+            Default: 3600.
+        """
+        self._env = envoirment
+        self._servers = servers
+        self._interval = kwargs['interval'] if 'interval' in kwargs else 1
+
+        # ring buffer of snapshots, as tuples of a sequence number and a snapshot
+        self._snapshots = deque(maxlen=kwargs['size'] if 'size' in kwargs else 3600)
+        self._sequence = 0
+
+        # followers wait on this condition for new snapshots
+        self._condition = Condition()
+
+        # whether the simulation finished
+        self._finished = False
+
+        # request to abort the simulation, and the event that stops it
+        self._abort = Event()
+        self.aborted = envoirment.event()
+
+        # counts of the pools at the previous snapshot
+        self._previous = {}
+
+        # Initialize the snapshot process
+        self.process = envoirment.process(self.run())
+
+    def run(self):
+        """
+        Generator method that takes a snapshot every interval, until the
+        simulation is aborted.
+
+        Yields
+        ------
+        simpy.Event
+        """
+        while True:
+            yield self._env.timeout(self._interval)
+
+            self.publish(self.snapshot())
+
+            # stop the simulation when an abort was requested
+            if self._abort.is_set():
+                self.aborted.succeed()
+                return
+
+    def snapshot(self):
+        """
+        Method to take a snapshot of the throughput, timeouts, cpu usage and
+        queue length of every pool since the previous snapshot.
+
+        Returns
+        -------
+        dict
+        """
+        kinds = {}
+
+        for pool in self._servers.pools():
+            servers = pool.servers()
+            processed, failed = self._previous.get(pool, (0, 0))
+
+            kinds[pool.kind()] = {
+                "throughput": (pool.processed - processed) / self._interval,
+                "timeouts": pool.failed - failed,
+                "cpu": sum(server.cpu() for server in servers) / len(servers) if servers else 0.0,
+                "queue": sum(len(server.queue) for server in servers),
+                "servers": len(servers),
+            }
+
+            self._previous[pool] = (pool.processed, pool.failed)
+
+        return {"time": self._env.now, "kinds": kinds}
+
+    def publish(self, snapshot):
+        """
+        Method to append a snapshot to the ring buffer and wake up all followers.
+
+        Parameters
+        ----------
+        snapshot: dict
+            Snapshot to publish.
+
+        Returns
+        -------
+        self
+        """
+        with self._condition:
+            self._sequence += 1
+            self._snapshots.append((self._sequence, snapshot))
+            self._condition.notify_all()
+
+        # allow chaining
+        return self
+
+    def finish(self):
+        """
+        Method to tell the followers that the simulation finished, so they
+        stop waiting for new snapshots.
+
+        Returns
+        -------
+        self
+        """
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+        # allow chaining
+        return self
+
+    def abort(self):
+        """
+        Method to request the simulation to stop at the next snapshot. This
+        can safely be called from another thread.
+
+        Returns
+        -------
+        self
+        """
+        self._abort.set()
+
+        # allow chaining
+        return self
+
+    def follow(self, sequence=0, timeout=15):
+        """
+        Generator method that yields all snapshots after a sequence number,
+        followed by every new snapshot, until the simulation finished. Snapshots
+        that were dropped from the ring buffer are skipped. None is yielded when
+        no snapshot arrived within the timeout, so a follower can keep its
+        connection alive.
+
+        Parameters
+        ----------
+        sequence: integer
+            Sequence number of the last snapshot the follower has seen.
+        timeout: float
+            Number of seconds to wait for a new snapshot.
+
+        Yields
+        ------
+        tuple|None
+            The sequence number and the snapshot.
+        """
+        while True:
+            with self._condition:
+
+                # wait for snapshots the follower has not seen yet
+                if not self._finished and (not self._snapshots or self._snapshots[-1][0] <= sequence):
+                    self._condition.wait(timeout)
+
+                pending = [item for item in self._snapshots if item[0] > sequence]
+                finished = self._finished
+
+            if not pending and not finished:
+                yield None
+
+            for item in pending:
+                sequence = item[0]
+                yield item
+
+            if finished:
+                return
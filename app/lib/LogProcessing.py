@@ -12,8 +12,13 @@ import math
 import os
 import csv
 import json
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
+from flask import request, Response
 from flask.json import jsonify, load
 import dash
 import dash_table
@@ -23,112 +28,291 @@ import dash_html_components as html
 
 # local dependencies
 from lib.OutlierDetection import moving_average, detect_outliers
+from lib.Rollups import Rollup
+from lib.LogReader import LogReader
+from lib.LogStore import read_log, converted
+from lib.Incidents import Incidents
 
 # Global vars
 # Set location of log folder relative to this script
 LOG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../logs'))
 
+# Maximum number of points per series in a graph, about its width in pixels
+GRAPH_POINTS = 1500
+
+# Networks of the most recently requested logfiles, by logfile name
+NETWORK_CACHE = OrderedDict()
+NETWORK_CACHE_SIZE = 16
+NETWORK_CACHE_LOCK = threading.Lock()
+
+
+def log_sampling(f):
+    """
+    Function to get the sampling of the transactions of a given logfile, of
+    which only 1 in every N may have been logged, from the metadata that was
+    written next to it.
+
+    Parameters
+    ----------
+        f: logfile
+
+    Returns
+    -------
+        N, which is 1 when every transaction was logged
+    """
+    path = os.path.join(LOG_PATH, "meta-" + os.path.splitext(os.path.basename(f))[0] + ".json")
+
+    # logfiles without metadata logged every transaction
+    if not os.path.isfile(path):
+        return 1
+
+    with open(path) as meta:
+        return int(json.load(meta).get("sampling", 1))
+
+
+def accepts_encoding(header, encoding):
+    """
+    Function to check whether an Accept-Encoding header accepts an encoding.
+    An encoding that is listed explicitly takes precedence over the wildcard,
+    and a quality of 0 refuses it.
+
+    Parameters
+    ----------
+        header: value of the Accept-Encoding header
+        encoding: name of the content encoding, e.g. gzip
+
+    Returns
+    -------
+        bool
+    """
+    qualities = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    return qualities.get(encoding, qualities.get('*', 0.0)) > 0
+
 
 def get_endpoint_json(f):
-    # Read in the log data
-    log_df = pd.read_csv(os.path.join(LOG_PATH, f), sep=';')
+    """
+    Function to respond with the network of servers and the number of messages
+    between them of a given logfile. The network is computed once per version of
+    the logfile and served compressed with an ETag, so a client that already has
+    the current network is answered with 304 Not Modified.
 
-    # # Use only timestamps where metrics are given
-    # log_df.dropna(subset=["CPU Usage", "Memory Usage", "Latency"], how='any')
-    # Use only INFO statements for graph
-    log_df = log_df[log_df["Message_type"] == "INFO"]
+    Parameters
+    ----------
+        f: logfile
 
-    # Create 'final_matrix' (initially a zeros matrix)
-    rows = log_df['Server'].dropna().unique()
-    cols = log_df['From_Server'].dropna().unique()
-    final_matrix = pd.DataFrame(0, index=cols, columns=rows)
+    Returns
+    -------
+        Flask Response
+    """
+    entry = endpoint_network(f)
+
+    # only send the compressed body to clients that accept it, which
+    # is a different representation with an ETag of its own
+    compressed = accepts_encoding(request.headers.get('Accept-Encoding', ''), 'gzip')
+    etag = entry["etag"] + "-gzip" if compressed else entry["etag"]
+
+    # the client already has this version of the network
+    if etag in request.if_none_match:
+        response = Response(status=304)
+
+    elif compressed:
+        response = Response(entry["gzip"], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+
+    else:
+        response = Response(entry["body"], mimetype='application/json')
+
+    # every request should be validated, which costs next to nothing
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+
+    return response
 
-    # Filter by Server and From_Server
-    filtered_log_df = log_df[['Server', 'From_Server']]
 
-    # Group by unique combinations and count occurrences
-    endpoint_df = filtered_log_df.groupby(
-        ['Server', 'From_Server']).size().reset_index().rename(columns={0: 'count'})
+def endpoint_network(f):
+    """
+    Function to compute the network of servers of a logfile as JSON, or get it
+    from the cache when the logfile did not change since it was computed.
+
+    Parameters
+    ----------
+        f: logfile
 
-    x = list(rows)
-    y = list(cols)
-    groups = []
+    Returns
+    -------
+        dict with the JSON body, its compressed form and its ETag
+    """
+    path = os.path.join(LOG_PATH, f)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    # requests are served by multiple threads, which share the cache
+    with NETWORK_CACHE_LOCK:
+        if f in NETWORK_CACHE and NETWORK_CACHE[f]["version"] == version:
+            NETWORK_CACHE.move_to_end(f)
+            return NETWORK_CACHE[f]
+
+    # Read in the log data, only INFO statements are used for the graph
+    log_df = read_log(path, columns=['Server', 'Message_type', 'From_Server'])
+    log_df = log_df[log_df["Message_type"] == "INFO"]
 
-    for element in x:
-        node_type = element.split('#')[0]
-        if node_type not in groups:
-            groups.append(node_type)
+    # Group by unique combinations and count occurrences, the columns of a
+    # converted logfile are categoricals which are ordered by their name here
+    endpoint_df = log_df.groupby(['Server', 'From_Server'], observed=True).size().reset_index(name='count')
+    endpoint_df = endpoint_df.astype({'Server': object, 'From_Server': object}).sort_values(['Server', 'From_Server'])
 
-    for element in y:
-        node_type = element.split('#')[0]
-        if node_type not in groups:
-            groups.append(node_type)
+    # only 1 in every N transactions may have been logged
+    endpoint_df['count'] *= log_sampling(f)
 
-    group_dict = dict(zip(groups, list(range(1, len(groups) + 1))))
+    # Servers first, followed by servers that only sent messages, grouped by their kind
+    nodes = pd.unique(pd.concat([log_df['Server'].astype(object),
+                                 log_df['From_Server'].astype(object)]).dropna().to_numpy())
+    groups, _ = pd.factorize(pd.Series(nodes, dtype=object).str.split('#').str[0])
 
     endpoint_json = {
-        "nodes": [],
-        "links": []
+        "nodes": [{"id": node, "group": group}
+                  for node, group in zip(nodes.tolist(), (groups + 1).tolist())],
+        "links": [{"source": source, "target": target, "value": value}
+                  for target, source, value in zip(endpoint_df['Server'].tolist(),
+                                                   endpoint_df['From_Server'].tolist(),
+                                                   endpoint_df['count'].tolist())]
     }
 
-    for element in x:
-        node_type = element.split('#')[0]
-        endpoint_json["nodes"].append({
-            "id": element,
-            "group": group_dict[node_type]
-        })
-
-    for element in y:
-        if element not in x:
-            node_type = element.split('#')[0]
-            endpoint_json["nodes"].append({
-                "id": element,
-                "group": group_dict[node_type]
-            })
-
-    '''
-    for idx, g in enumerate(groups):
-        endpoint_json["nodes"].append({
-            "id": g,
-            "group": idx + 1
-        })
-    '''
-
-    for idx, r in endpoint_df.iterrows():
-        endpoint_json["links"].append({
-            "source": r['From_Server'],
-            "target": r['Server'],
-            "value": r['count']
-        })
-
-    return jsonify(endpoint_json)
-
-
-def get_endpoint_matrix(f):
-    # Read in the log data
-    log_df = pd.read_csv(os.path.join(LOG_PATH, f), sep=';')
+    body = json.dumps(endpoint_json).encode()
+    entry = {
+        "version": version,
+        "body": body,
+        "gzip": gzip.compress(body),
+        "etag": hashlib.sha1(body).hexdigest(),
+    }
+
+    with NETWORK_CACHE_LOCK:
+        NETWORK_CACHE[f] = entry
+
+        # forget the least recently used logfiles
+        while len(NETWORK_CACHE) > NETWORK_CACHE_SIZE:
+            NETWORK_CACHE.popitem(last=False)
+
+    return entry
+
+
+def get_endpoint_matrix(f, level='kind'):
+    """
+    Function to compute the number of messages between servers of a given
+    logfile as a matrix, e.g. for a chord diagram. By default the servers are
+    aggregated per kind, which keeps the matrix small for large topologies.
+    The matrix between individual servers is sparse, so it is only exposed
+    as (row, column, value) triplets, on demand.
+
+    Parameters
+    ----------
+        f: logfile
+        level: 'kind' for a dense matrix between kinds of servers, or
+               'server' for a sparse matrix between servers. Default: 'kind'
 
-    # Create 'final_matrix' (initially a zeros matrix)
-    rows = log_df['From_Server'].dropna().unique()
-    cols = log_df['Server'].dropna().unique()
-    final_matrix = pd.DataFrame(0, index=cols, columns=rows)
+    Returns
+    -------
+        JSON
+    """
+    names, rows, cols, values = endpoint_triplets(f)
 
-    # Filter by Server and From_Server
-    filtered_log_df = log_df[['From_Server', 'Server']]
+    if level == 'server':
+        json_convert = {"data":
+                        {"names": names.tolist(),
+                         "shape": [len(names), len(names)],
+                         "sparse": {"row": rows.tolist(),
+                                    "col": cols.tolist(),
+                                    "value": values.tolist()}},
+                        "message": "Success"}
 
-    # Group by unique combinations and count occurrences
-    endpoint_df = filtered_log_df.groupby(
-        ['From_Server', 'Server']).size().reset_index().rename(columns={0: 'count'})
+        return jsonify(json_convert)
 
-    # Iterate over combinations in grouped_by df and fill in occurrences in final_matrix df
-    for index, row in endpoint_df.iterrows():
-        final_matrix.loc[row['From_Server']][row['Server']] = row['count']
+    # aggregate the servers per kind
+    kind_codes, kinds = pd.factorize(pd.Series(names, dtype=object).str.split('#').str[0])
+    matrix = np.zeros((len(kinds), len(kinds)), dtype=np.int64)
+    np.add.at(matrix, (kind_codes[rows], kind_codes[cols]), values)
 
-    # Convert 'final_matrix' df to array and prepare data for jsonify
-    final_matrix_arr = final_matrix.values.tolist()
     json_convert = {"data":
-                    {"matrix": final_matrix_arr,
-                        "names": rows.tolist()},
+                    {"matrix": matrix.tolist(),
+                        "names": kinds.tolist()},
+                    "message": "Success"}
+
+    return jsonify(json_convert)
+
+
+def endpoint_triplets(f):
+    """
+    Function to count the messages between every pair of servers of a given
+    logfile, as a sparse matrix in coordinate (COO) format.
+
+    Parameters
+    ----------
+        f: logfile
+
+    Returns
+    -------
+        tuple of the names of the servers, and the row (From_Server) and
+        column (Server) codes and number of messages of every pair
+    """
+    # Read in the log data
+    log_df = read_log(os.path.join(LOG_PATH, f), columns=['Server', 'Message_type', 'From_Server'])
+    log_df = log_df.dropna().astype(object)
+
+    # every logged INFO message stands for N messages when only 1 in every N
+    # transactions was logged, ERROR messages are all logged
+    weights = np.where(log_df['Message_type'].to_numpy() == "INFO", log_sampling(f), 1)
+
+    # one code per server, whether it sent or received messages
+    codes, names = pd.factorize(pd.concat([log_df['From_Server'], log_df['Server']], ignore_index=True))
+    sources, targets = codes[:len(log_df)], codes[len(log_df):]
+
+    # count the occurrences of every pair, without a dense matrix
+    pairs, inverse = np.unique(sources.astype(np.int64) * len(names) + targets, return_inverse=True)
+    values = np.bincount(inverse.ravel(), weights=weights, minlength=len(pairs)).astype(np.int64)
+    rows, cols = np.divmod(pairs, len(names))
+
+    return np.asarray(names, dtype=object), rows, cols, values
+
+
+def get_incident_impact(f, slow=2.0):
+    """
+    Function to compute the impact of every incident (blocked server) in the
+    error log of a given logfile on its messages.
+
+    Parameters
+    ----------
+        f: logfile
+        slow: Factor of the median latency of a server above which a message
+              is slow. Default: 2
+
+    Returns
+    -------
+        JSON
+    """
+    messages = read_log(os.path.join(LOG_PATH, f), columns=['Time', 'Server', 'Message_type', 'Latency',
+                                                            'Transaction_ID', 'Message'])
+    errors = read_log(os.path.join(LOG_PATH, 'error-' + f))
+
+    impact = Incidents(errors).impact(messages, slow=slow, sampling=log_sampling(f))
+
+    # incidents that were not stopped have no stop
+    impact = impact.astype({"stop": object, "duration": object})
+    impact.loc[np.isinf(impact["stop"].astype(float)), ["stop", "duration"]] = None
+
+    json_convert = {"data": impact.to_dict(orient="records"),
                     "message": "Success"}
 
     return jsonify(json_convert)
@@ -147,22 +331,31 @@ def get_log_filtered(f):
         filtered_logfile_name: string
     """
 
-    df = pd.read_csv(os.path.join(LOG_PATH, f), sep=";", error_bad_lines=False)
-
-    # Split dataframe into three dataframes based on Server
-    df = df.drop(['Transaction_ID', 'From_Server', 'Message'], axis=1)
+    path = os.path.join(LOG_PATH, f)
+    keys, metrics = ['Server', 'Time_floor', 'Message_type'], ["CPU Usage", "Memory Usage", "Latency"]
+
+    # Mean of every metric per server, second and message type, and the
+    # number of messages, from the store of a converted logfile, or computed
+    # in parallel over ranges of the logfile itself
+    if converted(path):
+        df = read_log(path, columns=['Time', 'Server', 'Message_type'] + metrics)
+        df["Time_floor"] = np.floor(df["Time"]).astype("int")
+        grouped = df.groupby(keys, observed=True)
+        df = grouped[metrics].mean().join(grouped.size().rename("Messages")).reset_index()
+        df = df.astype({"Server": object, "Message_type": object})
+    else:
+        df = LogReader(path).aggregate(keys, metrics, size="Messages")
 
-    df = df.reset_index()
-    df = df.drop(['index'], axis=1)
-    # df["Time"] = df["Time"].div(60)
-    df["Time_floor"] = np.floor(df["Time"]).astype("int")
-    df = df.groupby(['Server', 'Time_floor', 'Message_type'], as_index=False).mean()
-    df = df.drop(['Time'], axis=1)
+    # the means of the sampled transactions are unbiased, but every logged
+    # INFO message stands for N messages when only 1 in every N transactions
+    # was logged
+    df.loc[df["Message_type"] == "INFO", "Messages"] *= log_sampling(f)
 
     # Rename variables to include unit in name
     replace_columns = dict({"CPU Usage": "CPU Usage (%)",
                             "Memory Usage": "Memory Usage (%)",
-                            "Latency": "Latency (s)"})
+                            "Latency": "Latency (s)",
+                            "Messages": "Messages (#/s)"})
 
     df.rename(columns=replace_columns, inplace=True)
 
@@ -279,63 +472,121 @@ def show_dash_graphs(dashapp, f, eventId):
         def set_metrics_value(available_options):
             return available_options[0]['value']
 
+        # rollups, moving averages and outliers of every series are computed
+        # once, when the series is first shown
+        cache = {}
+
+        def series(server, metric, std):
+            """
+            Function to get the rollups of a series of a server and metric,
+            together with its moving average and outliers.
+            """
+            key = (server, metric, std)
+            if key not in cache:
+                dff = df[(df["Server"] == server) & (df["variable"] == metric)]
+                times = dff["Time_floor"].values
+                values = dff["Value"].values
+
+                # Outliers
+                n = max(math.floor(len(values) * 0.1), 1)    # 10% of series length by default
+
+                outliers = detect_outliers(
+                    list(values),
+                    n=n,
+                    s=std,
+                    filename='outliers_' + metric + '_' + f_filtered
+                ) or {}
+
+                # Moving average
+                mv_avg = moving_average(values, n) if len(values) >= n else np.array([])
+
+                cache[key] = {
+                    "rollup": Rollup(times, values),
+                    "outliers": (times[list(outliers.keys())], np.array(list(outliers.values()))),
+                    "mv_avg": Rollup(times[n - 1:], mv_avg),
+                }
+
+            return cache[key]
+
         @dashapp.callback(
             Output('indicator-graphic-{}'.format(eventId), 'figure'),
             [Input('servers-radio-{}'.format(eventId), 'value'),
              Input('metrics-radio-{}'.format(eventId), 'value'),
              Input('std-radio-{}'.format(eventId), 'value'),
-             Input('show-mv-avg-{}'.format(eventId), 'value')])
-        def update_graph(servers, metrics, std, show_mv_avg):
+             Input('show-mv-avg-{}'.format(eventId), 'value'),
+             Input('indicator-graphic-{}'.format(eventId), 'relayoutData')])
+        def update_graph(servers, metrics, std, show_mv_avg, relayout):
 
-            dff = df[(df["Server"] == servers) & (df["variable"] == metrics)]
+            cached = series(servers, metrics, std)
 
-            # Metrics
-            X = list(range(0, dff["Time_floor"].size))
-            Y = dff["Value"]
+            # the visible time range, which is the entire series until zoomed in
+            start, end = visible_range(relayout)
 
-            # Outliers
-            n = math.floor(len(Y) * 0.1)    # 10% of series length by default
-
-            outliers = detect_outliers(
-                list(dff["Value"]),
-                n=n,
-                s=std,
-                filename='outliers_' + metrics + '_' + f_filtered
-            )
-
-            outliers_X = list(outliers.keys())
-            outliers_Y = list(outliers.values())
+            # Metrics, at the resolution of the visible range
+            window = cached["rollup"].window(start, end, points=GRAPH_POINTS)
 
             data = [
                 dict(
-                    x=X,
-                    y=Y,
+                    x=window["time"].tolist(),
+                    y=window["mean"].tolist(),
                     mode='line',
                     marker={
                         'size': 15,
                         'opacity': 0.5,
                         'line': {'width': 0.5, 'color': 'white'}
                     },
-                    name="Usage"
-                ),
+                    name="Usage" if window["resolution"] == 1 else f"Usage (mean per {window['resolution']}s)"
+                )
+            ]
+
+            # show the range of the values within every rolled up point
+            if window["resolution"] > 1:
+                data[:0] = [
+                    dict(
+                        x=window["time"].tolist(),
+                        y=window["max"].tolist(),
+                        mode='lines',
+                        line={'width': 0},
+                        showlegend=False,
+                        hoverinfo='skip'
+                    ),
+                    dict(
+                        x=window["time"].tolist(),
+                        y=window["min"].tolist(),
+                        mode='lines',
+                        line={'width': 0},
+                        fill='tonexty',
+                        fillcolor='rgba(31, 119, 180, 0.2)',
+                        name="Min - Max"
+                    )
+                ]
+
+            # Outliers within the visible range
+            outliers_X, outliers_Y = cached["outliers"]
+            visible = np.ones(outliers_X.size, dtype=bool)
+            if start is not None:
+                visible &= outliers_X >= start
+            if end is not None:
+                visible &= outliers_X <= end
+
+            data.append(
                 dict(
-                    x=outliers_X,
-                    y=outliers_Y,
+                    x=outliers_X[visible].tolist(),
+                    y=outliers_Y[visible].tolist(),
                     mode='markers',
                     marker={"color": 'red'},
                     name="Outliers"
                 )
-            ]
+            )
 
             # Moving average
             if show_mv_avg:
-                mv_avg_Y = moving_average(list(dff["Value"]), n)
-                mv_avg_X = list(range(0+n-1, len(list(dff["Value"]))))
+                mv_avg = cached["mv_avg"].window(start, end, points=GRAPH_POINTS)
 
                 data.append(
                     dict(
-                        x=mv_avg_X,
-                        y=mv_avg_Y,
+                        x=mv_avg["time"].tolist(),
+                        y=mv_avg["mean"].tolist(),
                         mode='line',
                         marker={
                             'size': 8,
@@ -351,7 +602,8 @@ def show_dash_graphs(dashapp, f, eventId):
                 'data': data,
                 'layout': dict(
                     xaxis={
-                        'title': "Time (s)"
+                        'title': "Time (s)",
+                        'range': [start, end] if start is not None else None
                     },
                     yaxis={
                         'title': metrics
@@ -362,9 +614,36 @@ def show_dash_graphs(dashapp, f, eventId):
                         'side': 'right'
                     },
                     margin={'l': 40, 'b': 40, 't': 10, 'r': 0},
-                    hovermode='closest'
+                    hovermode='closest',
+                    # keep the zoom when the figure is replaced
+                    uirevision=f"{servers}-{metrics}"
                 )
             }
 
     else:
         print("Filtered logfile could not be generated. Check get_log_filtered() for details.")
+
+
+def visible_range(relayout):
+    """
+    Function to get the visible time range of a graph from its relayout data.
+
+    Parameters
+    ----------
+        relayout: relayoutData of a Dash graph, or None
+
+    Returns
+    -------
+        tuple of the start and end of the range, both None when the entire
+        series is visible
+    """
+    if not relayout or relayout.get('xaxis.autorange'):
+        return None, None
+
+    if 'xaxis.range[0]' in relayout:
+        return float(relayout['xaxis.range[0]']), float(relayout['xaxis.range[1]'])
+
+    if 'xaxis.range' in relayout:
+        return float(relayout['xaxis.range'][0]), float(relayout['xaxis.range'][1])
+
+    return None, None
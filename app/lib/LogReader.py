@@ -0,0 +1,162 @@
+"""
+This file contains a class to read large semicolon separated logfiles in
+parallel. The file is split at line boundaries into byte ranges, every range is
+parsed and pre-aggregated in a worker process, and the partial aggregates are
+merged afterwards. Only a single range per worker is held in memory at once.
+
+@file   LogReader.py
+@scope  public
+"""
+
+# third party dependencies
+import io
+import os
+from multiprocessing import Pool
+import pandas as pd
+import numpy as np
+
+# Skip malformed lines, with the keyword of the installed pandas version
+if tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (1, 3):
+    BAD_LINES = {"on_bad_lines": "skip"}
+else:
+    BAD_LINES = {"error_bad_lines": False}
+
+
+class LogReader(object):
+
+    def __init__(self, path, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+            path: Path to the logfile.
+
+        Keyworded parameters
+        --------------------
+            workers: Number of parallel worker processes. Default: number of cpus.
+            chunksize: Approximate number of bytes per range. Default: 64 MiB.
+            sep: Separator of the columns. Default: ';'.
+        """
+        self._path = path
+        self._workers = kwargs['workers'] if 'workers' in kwargs else os.cpu_count()
+        self._chunksize = kwargs['chunksize'] if 'chunksize' in kwargs else 64 * 1024 * 1024
+        self._sep = kwargs['sep'] if 'sep' in kwargs else ';'
+
+        # the header is only on the first line
+        with open(path, 'rb') as f:
+            self._header = f.readline().decode().strip().split(self._sep)
+            self._start = f.tell()
+
+    def header(self):
+        """
+        Getter to expose the names of the columns.
+
+        Returns
+        -------
+            list of column names
+        """
+        return list(self._header)
+
+    def chunks(self):
+        """
+        Function to split the logfile into byte ranges that start and end
+        at line boundaries.
+
+        Returns
+        -------
+            list of (start, end) byte offsets
+        """
+        size = os.path.getsize(self._path)
+        boundaries = [self._start]
+
+        with open(self._path, 'rb') as f:
+            while boundaries[-1] < size:
+
+                # continue to the end of the line the next range would end in
+                f.seek(boundaries[-1] + self._chunksize)
+                f.readline()
+                boundaries.append(min(f.tell(), size))
+
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def aggregate(self, keys, columns, size=None):
+        """
+        Function to compute the mean of columns per group, where the time is
+        floored to seconds as "Time_floor". Every range is reduced to sums and
+        counts per group, which are merged into means.
+
+        Parameters
+        ----------
+            keys: Columns to group by, "Time_floor" may be one of them.
+            columns: Numerical columns to compute the means of.
+            size: Name of a column with the number of lines per group.
+                  Default: no such column.
+
+        Returns
+        -------
+            DataFrame with the keys and the mean of every column
+        """
+        tasks = [(self._path, start, end, self._header, self._sep, keys, columns)
+                 for start, end in self.chunks()]
+
+        # a pool is only worth starting for multiple ranges
+        if len(tasks) > 1 and self._workers > 1:
+            with Pool(min(self._workers, len(tasks))) as pool:
+                partials = pool.map(aggregate_chunk, tasks)
+        else:
+            partials = [aggregate_chunk(task) for task in tasks]
+
+        # a logfile without lines has no ranges to merge
+        if not partials:
+            return pd.DataFrame(columns=keys + columns + ([size] if size is not None else []))
+
+        # merge the sums and counts of all ranges
+        merged = pd.concat(partials).groupby(keys, as_index=False).sum()
+
+        for column in columns:
+            merged[column] = merged[column + "_sum"] / merged[column + "_count"]
+
+        if size is not None:
+            merged[size] = merged["_size"]
+
+        return merged[keys + columns + ([size] if size is not None else [])]
+
+
+def aggregate_chunk(task):
+    """
+    Function to parse a byte range of a logfile and reduce it to sums and
+    counts per group. This runs in a worker process.
+
+    Parameters
+    ----------
+        task: tuple of the path, start and end offsets, column names,
+              separator, keys and columns (see LogReader.aggregate).
+
+    Returns
+    -------
+        DataFrame with the keys, the sum and count of every column and the
+        number of lines per group
+    """
+    path, start, end, header, sep, keys, columns = task
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    df = pd.read_csv(io.BytesIO(data), sep=sep, names=header, header=None, **BAD_LINES)
+
+    # values of malformed lines are missing
+    df[columns] = df[columns].apply(pd.to_numeric, errors="coerce")
+
+    if "Time_floor" in keys:
+        df["Time"] = pd.to_numeric(df["Time"], errors="coerce")
+        df = df.dropna(subset=["Time"])
+        df["Time_floor"] = np.floor(df["Time"]).astype("int")
+
+    # sums and counts of the values that are not missing
+    grouped = df.groupby(keys)[columns]
+    partial = grouped.sum().add_suffix("_sum").join(grouped.count().add_suffix("_count"))
+    partial["_size"] = grouped.size()
+
+    return partial.reset_index()
@@ -0,0 +1,288 @@
+"""
+This file contains a class to read logfiles from a compact columnar store, and
+functions to convert semicolon separated logfiles to that store. A store holds
+the numerical columns as typed arrays and the textual columns (servers, message
+types, ...) dictionary encoded as integer codes with their distinct values. The
+rows are sorted by time, and an index of the first row per second allows
+reading a time range without touching the rest of the store.
+
+Logfiles of both simulations are normalized to the same schema: the messages
+of the second simulation name the receiving server in "To_Server" and the
+sending server in "Server", which become "Server" and "From_Server".
+
+@file   LogStore.py
+@scope  public
+"""
+
+# third party dependencies
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# dependencies
+from lib.Catalog import Catalog, CATALOG_PATH
+from lib.LogReader import BAD_LINES
+
+# Set location of the stores relative to this script
+STORE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../logs/columnar'))
+
+# Columns that hold numbers, all other columns are dictionary encoded
+NUMERICAL = ["Time", "CPU Usage", "Memory Usage", "Latency"]
+
+
+class LogStore(object):
+
+    def __init__(self, path):
+        """
+        Constructor. The columns are memory mapped, so only the pages of the
+        rows that are read are loaded.
+
+        Parameters
+        ----------
+            path: Path to the directory of the store.
+        """
+        self._path = path
+
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        self._columns = meta["columns"]
+        self._kind = meta["kind"]
+
+        # the time index holds the first row of every second since the origin
+        self._origin = meta["origin"]
+        self._index = self._load("index")
+
+    def _load(self, name):
+        """
+        Method to memory map an array of the store.
+
+        Parameters
+        ----------
+            name: Name of the array.
+
+        Returns
+        -------
+            numpy memmap
+        """
+        return np.load(os.path.join(self._path, name + ".npy"), mmap_mode="r")
+
+    def columns(self):
+        """
+        Getter to expose the names of the columns.
+
+        Returns
+        -------
+            list of column names
+        """
+        return list(self._columns)
+
+    def kind(self):
+        """
+        Getter to expose the kind of log, 'messages' or 'errors'.
+
+        Returns
+        -------
+            string
+        """
+        return self._kind
+
+    def row(self, time):
+        """
+        Function to find the first row at or after a time. The time index
+        narrows the search down to the rows of a single second.
+
+        Parameters
+        ----------
+            time: Time in seconds.
+
+        Returns
+        -------
+            integer
+        """
+        second = int(np.floor(time)) - self._origin
+
+        if second < 0:
+            return 0
+        if second >= self._index.size - 1:
+            return int(self._index[-1])
+
+        lower, upper = int(self._index[second]), int(self._index[second + 1])
+        return lower + int(np.searchsorted(self._load("Time")[lower:upper], time, side="left"))
+
+    def frame(self, columns=None, start=None, end=None):
+        """
+        Function to read columns of a time range as a DataFrame. Dictionary
+        encoded columns are returned as categoricals.
+
+        Parameters
+        ----------
+            columns: Names of the columns to read. Default: all columns.
+            start: Start of the time range in seconds. Default: start of the log.
+            end: End of the time range in seconds, exclusive. Default: end of the log.
+
+        Returns
+        -------
+            DataFrame
+        """
+        columns = self._columns if columns is None else columns
+        rows = slice(None if start is None else self.row(start), None if end is None else self.row(end))
+
+        data = {}
+        for column in columns:
+            if column in NUMERICAL:
+                data[column] = np.array(self._load(column)[rows])
+            else:
+                data[column] = pd.Categorical.from_codes(np.array(self._load(column + ".codes")[rows]),
+                                                         categories=np.array(self._load(column + ".values")))
+
+        return pd.DataFrame(data, columns=columns)
+
+
+def normalize(df):
+    """
+    Function to bring a logfile in the schema of the store. Lines without a
+    time, like timeout messages, can not be placed in time and are dropped,
+    the other lines are ordered by their time.
+
+    Parameters
+    ----------
+        df: DataFrame of a logfile.
+
+    Returns
+    -------
+        tuple of the kind of log and the normalized DataFrame
+    """
+    df = df.assign(Time=pd.to_numeric(df["Time"], errors="coerce"))
+    df = df.dropna(subset=["Time"]).sort_values("Time", kind="mergesort")
+
+    if "Error type" in df.columns:
+        return "errors", df
+
+    # the sender and receiver of a message are swapped in this variant
+    if "To_Server" in df.columns:
+        df = df.rename(columns={"Server": "From_Server", "To_Server": "Server"})
+        df = df[["Time", "Server", "Message_type", "CPU Usage", "Memory Usage", "Latency",
+                 "Transaction_ID", "From_Server", "Message"]]
+
+    return "messages", df
+
+
+def store_name(source):
+    """
+    Function to name the store of a logfile. Both simulations write logfiles
+    with the same names, so the name is prefixed with the simulation.
+
+    Parameters
+    ----------
+        source: Path to the logfile.
+
+    Returns
+    -------
+        string
+    """
+    source = os.path.realpath(source)
+    simulation = os.path.basename(os.path.dirname(os.path.dirname(source)))
+    return "{0}-{1}".format(simulation, os.path.splitext(os.path.basename(source))[0])
+
+
+def convert(source, directory=STORE_PATH):
+    """
+    Function to convert a logfile to a store.
+
+    Parameters
+    ----------
+        source: Path to the logfile.
+        directory: Directory to write the store to. Default: logs/columnar.
+
+    Returns
+    -------
+        dict with the source, store, kind, number of rows and first and last time
+    """
+    df = pd.read_csv(source, sep=';', dtype=str, keep_default_na=False, na_values=[''], **BAD_LINES)
+    kind, df = normalize(df)
+    time = df["Time"].to_numpy(dtype=np.float64)
+    arrays = {}
+
+    for column in df.columns:
+        if column in NUMERICAL:
+            arrays[column] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            codes, values = pd.factorize(df[column])
+
+            # the smallest integers that fit all codes, missing values are -1
+            arrays[column + ".codes"] = codes.astype(np.min_scalar_type(-max(len(values), 1)))
+            arrays[column + ".values"] = np.asarray(values, dtype=str)
+
+    # the first row of every second, followed by the number of rows
+    origin = int(np.floor(time[0])) if time.size else 0
+    seconds = np.arange(origin, int(np.floor(time[-1])) + 2 if time.size else origin + 1)
+    arrays["index"] = np.searchsorted(time, seconds, side="left").astype(np.int64)
+
+    store = os.path.join(directory, store_name(source))
+    os.makedirs(store, exist_ok=True)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(store, name + ".npy"), array)
+
+    with open(os.path.join(store, "meta.json"), 'w') as f:
+        json.dump({"columns": df.columns.tolist(), "kind": kind, "origin": origin}, f)
+
+    return {
+        "source": source,
+        "store": store,
+        "kind": kind,
+        "rows": int(time.size),
+        "start": float(time[0]) if time.size else None,
+        "end": float(time[-1]) if time.size else None,
+    }
+
+
+def converted(path, catalog=CATALOG_PATH):
+    """
+    Function to find the store of a logfile, if it was converted and did not
+    change since.
+
+    Parameters
+    ----------
+        path: Path to the logfile.
+        catalog: Path to the catalog of converted logfiles.
+
+    Returns
+    -------
+        path to the store, or None
+    """
+    # logfiles were never converted when there is no catalog yet
+    return Catalog(catalog).lookup(path) if os.path.exists(catalog) else None
+
+
+def read_log(path, columns=None, start=None, end=None, catalog=CATALOG_PATH):
+    """
+    Function to read a logfile, from its store when it was converted and did
+    not change since, or from the logfile itself otherwise.
+
+    Parameters
+    ----------
+        path: Path to the logfile.
+        columns: Names of the columns to read. Default: all columns.
+        start: Start of the time range in seconds. Default: start of the log.
+        end: End of the time range in seconds, exclusive. Default: end of the log.
+        catalog: Path to the catalog of converted logfiles.
+
+    Returns
+    -------
+        DataFrame
+    """
+    store = converted(path, catalog)
+
+    if store is not None:
+        return LogStore(store).frame(columns, start, end)
+
+    df = pd.read_csv(path, sep=';', **BAD_LINES)
+    df = normalize(df)[1]
+
+    if start is not None or end is not None:
+        df = df[(df["Time"] >= (-np.inf if start is None else start)) & (df["Time"] < (np.inf if end is None else end))]
+
+    return df if columns is None else df[columns]
@@ -14,6 +14,8 @@ import logging
 import os
 from logging.handlers import QueueHandler, QueueListener
 import queue
+import uuid
+from functools import lru_cache
 
 # get location log files relative to this file
 LOG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../logs'))
@@ -64,14 +66,31 @@ class Logger(object):
             # add the file handler to the logger so all logs will be outputted there
             self._logger.addHandler(filehandler)
 
+    def enabled(self, level=20):
+        """
+        Method to check whether messages of a level are written.
+
+        Parameters
+        ----------
+        level: integer
+            Level of logging (default: 20).
+
+        Returns
+        -------
+        bool
+        """
+        return self._logger.isEnabledFor(level)
+
     def log(self, message, level=20):
         """
         Method to log a message.
 
         Parameters
         ----------
-        message: string
-            Message to log.
+        message: string|tuple
+            Message to log, or the fields of a structured message. The fields
+            are separated by semicolons, but only formatted when the message
+            is actually written.
         level: integer
             Level of logging (default: 20).
 
@@ -80,8 +99,61 @@ class Logger(object):
         self
         """
 
-        # log the message using our logger
-        self._logger.log(level, message)
+        # skip messages that would be filtered out anyway
+        if not self._logger.isEnabledFor(level):
+            return self
+
+        # log the message using our logger, structured messages are formatted
+        # lazily by the handlers that write them
+        if isinstance(message, tuple):
+            self._logger.log(level, fields(len(message)), *message)
+        else:
+            self._logger.log(level, message)
 
         # allow chaining
         return self
+
+
+@lru_cache(maxsize=None)
+def fields(count):
+    """
+    Function to get the format of a structured message with a number of
+    fields, separated by semicolons.
+
+    Parameters
+    ----------
+    count: integer
+        Number of fields.
+
+    Returns
+    -------
+    string
+    """
+    return ";".join(["%s"] * count)
+
+
+def sampled(transaction, sampling=1):
+    """
+    Function to decide whether the INFO messages of a transaction are logged,
+    when only 1 in every N transactions is logged. The decision is made on the
+    uuid of the transaction, so it is the same when the log is read back, and
+    it does not consume any random numbers of the simulation.
+
+    Parameters
+    ----------
+    transaction: uuid.UUID|string
+        Id of the transaction.
+    sampling: integer
+        N, where 1 logs every transaction (default: 1).
+
+    Returns
+    -------
+    bool
+    """
+    if sampling <= 1:
+        return True
+
+    if not isinstance(transaction, uuid.UUID):
+        transaction = uuid.UUID(transaction)
+
+    return transaction.int % sampling == 0
@@ -8,11 +8,13 @@ Class for
 """
 
 # 3rd party dependencies
-from uuid import uuid4
 from simpy import Interrupt
 from simpy.resources.resource import Preempted
-import pandas as pd
-from numpy.random import randint
+
+# dependencies
+from lib.Timeouts import Timeouts
+from lib.Streams import generator, identifier
+from lib.Logger import sampled
 
 
 class MessageGenerator(object):
@@ -25,7 +27,7 @@ class MessageGenerator(object):
         ----------
         envoirment: instance of Envoirment class
         servers: instance of MultiServers pool
-        seasonality: Seasonality
+        seasonality: TransactionInterval|TraceArrivals
             Source of incoming messages.
             [required]
 
@@ -34,6 +36,22 @@ class MessageGenerator(object):
         kinds: list
             List of server kinds as sequence.
             [optional]
+        timeout: float
+            Time after which a message to a server times out.
+            [optional]
+        statistics: Statistics
+            Collector of summary statistics of the transactions.
+            [optional]
+        spans: Spans
+            Tracer of the hops of a sample of the transactions.
+            [optional]
+        random: numpy.random.Generator
+            Generator of the identifiers of the transactions.
+            [optional]
+        sampling: int
+            Only the INFO messages of 1 in every N transactions are logged,
+            all ERROR messages are. Default: 1, every transaction.
+            [optional]
         """
 
         # required seasonality
@@ -51,7 +69,20 @@ class MessageGenerator(object):
         # optional timeout duration
         self._timeout = kwargs['timeout'] if 'timeout' in kwargs else 1
 
-        self.excludeservers = []
+        # all messages share the same timeout, so one watcher can time them out
+        self._timeouts = Timeouts(envoirment, self._timeout)
+
+        # optional collector of summary statistics
+        self._statistics = kwargs['statistics'] if 'statistics' in kwargs else None
+
+        # optional tracer of the hops of sampled transactions
+        self._spans = kwargs['spans'] if 'spans' in kwargs else None
+
+        # generator of the identifiers of the transactions
+        self._random = generator(kwargs['random'] if 'random' in kwargs else None)
+
+        # optional sampling of the logged transactions
+        self._sampling = kwargs['sampling'] if 'sampling' in kwargs else 1
 
         # Initialize message generator
         self.messages_process = envoirment.process(self.generate())
@@ -64,17 +95,33 @@ class MessageGenerator(object):
         ------
         simpy.Process
         """
-        # run indefinitely
+        # the first batch of arrivals starts at the start of the source
+        timestamp = None
+
+        # run until the source runs out of arrivals
         while True:
 
-            # timeout before proceeding to the next transaction
-            yield self._env.timeout(self._seasonality.interval())
+            # draw a batch of arrivals at once, e.g. those of the current
+            # seasonality segment
+            arrivals = self._seasonality.arrivals(timestamp)
+
+            for arrival in arrivals:
 
-            # id of the current request
-            process_id = uuid4()
+                # timeout before proceeding to the next transaction
+                yield self._env.timeout(arrival - self._env.now)
 
-            # init a new request
-            clientrequest = self._env.process(self.client_request(process_id))
+                # id of the current request
+                process_id = identifier(self._random)
+
+                # init a new request
+                clientrequest = self._env.process(self.client_request(process_id))
+
+            # the source ran out of arrivals
+            if self._seasonality.exhausted():
+                return
+
+            # the next batch starts at the last arrival
+            timestamp = self._env.now
             # process = Subprocess(self.environment, self._servers, kinds=self._kinds).process
 
             # yield clientrequest
@@ -91,9 +138,19 @@ class MessageGenerator(object):
         # Set sequence of Servers
         kinds = self._kinds
 
-        # collection of servers processing a request
-        request_df = pd.DataFrame(
-            columns=["kind", "open_servers", "open_requests"])
+        # remember when the transaction arrived, and whether it timed out
+        arrived = self._env.now
+        timedout = False
+
+        if self._statistics:
+            self._statistics.arrival()
+
+        # sequence number of the transaction when its hops are traced
+        traced = self._spans.sample(process_id) if self._spans else None
+
+        # collection of open hops processing a request, by index in the route,
+        # as tuples of the kind, the server and the open request
+        hops = {}
 
         route = []
         # get the client who requested this process
@@ -102,38 +159,39 @@ class MessageGenerator(object):
         # we need to iterate over all kinds
         for (idx, kind) in enumerate(kinds):
 
-            current_message = []
-
             # Get server that requests the message
             requested_by = route[idx]
 
             # reference to a return loop
             return_loop = None
 
+            # whether the message probes the half-open circuit of the server
+            probe = False
+
             # Test if request is back at a previously accessed server
-            if kind in request_df["kind"].values:
+            for (hop, (hop_kind, hop_server, _)) in hops.items():
+                if hop_kind == kind:
 
-                # Remember first location of server
-                return_loop = request_df.index[request_df['kind'] == kind].tolist()
+                    # Remember first location of server
+                    return_loop = hop
 
-                # Get same server as before:
-                server = request_df.loc[return_loop[0], "open_servers"]
+                    # Get same server as before:
+                    server = hop_server
+                    break
 
             else:
                 # we need to get access to a server pool
                 pool = self._pools.get(kind)
-                server = pool.server(exclude=self.excludeservers)
-
-            # Set kind of server in DataFrame
-            current_message.append(kind)
-
-            # add the open request to the collection of open servers, so
-            # we can release it later on
-            current_message.append(server)
+                server = pool.server(key=process_id)
+                probe = server is not None and pool.probing(server)
 
             # attempt to parse a server request
             try:
 
+                # check if the link to the server is not cut
+                if not self._pools.connected(requested_by['kind'], kind):
+                    raise Exception("LINK UNAVAILABLE")
+
                 # check if there's a server available
                 if not server:
                     raise Exception("SERVER UNAVAILABLE")
@@ -144,88 +202,158 @@ class MessageGenerator(object):
                 # ask the server for a new request at
                 request = server.request()
 
-                # Add request to list of open open_requests
-                current_message.append(request)
+                if self._statistics:
+                    self._statistics.message(kind, server)
 
-                request_df.loc[idx] = current_message
+                # add the open request to the collection of open hops, so
+                # we can release it later on
+                hops[idx] = (kind, server, request)
 
                 # Define message to server
                 sent_message = self._env.process(self.server_message(
-                    process_id, requested_by, request, server))
+                    process_id, requested_by, request, server,
+                    span=(traced, idx) if traced is not None else None))
 
-                # send a message and wait for message or timeout to complete
-                yield sent_message | self._env.timeout(self._timeout)
+                # send a message and wait for it to complete or to be
+                # interrupted by a timeout
+                yield self._timeouts.watch(sent_message)
 
-                # If message not triggered then timeout is past
-                if (not sent_message.triggered):
-                    sent_message.interrupt("TIMEOUT")
+                # the message returns whether it was processed
+                if not sent_message.value:
+                    timedout = True
+
+                # let the pool keep track of the health of the server
+                self._pools.get(kind).outcome(server, not sent_message.value)
+                probe = False
 
                 # When request is processed and return loop index exists
                 # Release in between servers
-                if return_loop:
+                if return_loop is not None:
 
                     # release all server requests between occurances of the same kind
-                    for row in request_df.loc[return_loop[0]:idx].itertuples(index=False):
-
-                        # Get server and corresponding request
-                        server = getattr(row, "open_servers")
-                        request = getattr(row, "open_requests")
-
-                        # release the server request
-                        if server and request:
-                            # Only release if request is still linked to server
-                            if request in server.users:
-                                server.release(request=request)
+                    release([hops[hop] for hop in range(return_loop, idx + 1) if hop in hops])
 
-                    # remove closed request from DataFrame
-                    request_df = request_df.drop(range(return_loop[0], idx), axis=0)
+                    # remove closed requests from the open hops
+                    for hop in range(return_loop, idx):
+                        hops.pop(hop, None)
 
             # handle exceptions
             except Exception as e:
-                print(e)
+                timedout = True
+
+                # a blocked server preempts the transactions it processes
+                blocked = e.cause.resource if isinstance(e, Interrupt) and isinstance(e.cause, Preempted) else None
+
+                # log at the error level, unless no logger writes it
+                if self._env.enabled(40):
+                    self._env.log((self._env.now, blocked.name() if blocked is not None else "", "ERROR", "", "", "",
+                                   process_id, requested_by['name'], f"Error due to {e}"), level=40)
+
+                # which counts towards the health of that server
+                if blocked is not None:
+                    self._pools.get(blocked.kind()).outcome(blocked, True)
+                    probe = probe and blocked is not server
+
+                    if self._statistics:
+                        self._statistics.interruption(blocked.kind(), True)
+
                 break
-                # log to the error log
-                self._env.log(
-                    f"{self._env.now};;ERROR;;;;{process_id};{requested_by['name']};Error due to {e}", level=40)
+
+            finally:
+                # a probe that was abandoned does not decide the circuit of the
+                # server, but lets the next probe through
+                if probe:
+                    self._pools.get(kind).abandon(server)
 
         # release all server requests when entire loop is done
-        for row in request_df.itertuples(index=False):
+        release(hops.values())
 
-            # Get server and corresponding request
-            server = getattr(row, "open_servers")
-            request = getattr(row, "open_requests")
+        if self._statistics:
+            self._statistics.completion(self._env.now - arrived, timedout)
 
-            # release the server request
-            if server and request:
-                server.release(request=request)
+    def server_message(self, process_id, requested_by, request, server, span=None):
+        """
+        Message to a single server, which waits for the request to be granted
+        and is processed with the latency of the server.
 
-    def server_message(self, process_id, requested_by, request, server):
+        Parameters
+        ----------
+        span: tuple
+            Sequence number of the traced transaction and index of the hop,
+            when the hop should be traced.
+
+        Returns
+        -------
+        bool
+            Whether the message was processed without interruption.
+        """
         start = self._env.now
+        granted = float('nan')
         try:
             # yield the request and timeout
             yield request
+            granted = self._env.now
             # Get server state with current load
             server_state = server.state()
             yield self._env.timeout(server_state['latency'])
 
-            # we need to construct a logmessage
-            # and push onto the environment
-            message = f"Requesting {server_state['name']} by {requested_by['name']}"
-            self._env.log(
-                f"{self._env.now};{server_state['name']};INFO;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};{message}")
+            if self._statistics:
+                self._statistics.hop(server_state['kind'], self._env.now - start)
+
+            if span:
+                self._spans.record(span[0], process_id, span[1], server_state['kind'],
+                                   start, granted, self._env.now, True)
+
+            # we need to construct a logmessage and push onto the environment,
+            # unless no logger writes it or the transaction is not sampled
+            if self._env.enabled() and sampled(process_id, self._sampling):
+                self._env.log((self._env.now, server_state['name'], "INFO", server_state['cpu'],
+                               server_state['memory'], server_state['latency'], process_id, requested_by['name'],
+                               f"Requesting {server_state['name']} by {requested_by['name']}"))
+
+            return True
 
         # handle interruptions
         except Interrupt as interrupt:
             server_state = server.state()
 
+            if self._statistics:
+                self._statistics.interruption(server_state['kind'], isinstance(interrupt.cause, Preempted))
+
             # Check if error is due to interuption using error_generator
             if isinstance(interrupt.cause, Preempted):
 
                 # Manually print timeout message
-                self._env.log(
-                    f"{self._env.now};{server_state['name']};ERROR;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};Error due to TIMEOUT at time {start + self._timeout}", level=40)
+                self._env.log((self._env.now, server_state['name'], "ERROR", server_state['cpu'],
+                               server_state['memory'], server_state['latency'], process_id, requested_by['name'],
+                               f"Error due to TIMEOUT at time {start + self._timeout}"), level=40)
             else:
 
                 # Use interrupt clause to write error message
-                self._env.log(
-                    f"{self._env.now};{server_state['name']};ERROR;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};Error due to {interrupt.cause}", level=40)
+                self._env.log((self._env.now, server_state['name'], "ERROR", server_state['cpu'],
+                               server_state['memory'], server_state['latency'], process_id, requested_by['name'],
+                               f"Error due to {interrupt.cause}"), level=40)
+
+            if span:
+                self._spans.record(span[0], process_id, span[1], server_state['kind'],
+                                   start, granted, self._env.now, False)
+
+            return False
+
+
+def release(hops):
+    """
+    Function to release the requests of a range of hops, grouped by the
+    server they were made to.
+
+    Parameters
+    ----------
+    hops: iterable
+        Hops as tuples of the kind, the server and the open request.
+    """
+    requests = {}
+    for (_, server, request) in hops:
+        requests.setdefault(server, []).append(request)
+
+    for (server, open_requests) in requests.items():
+        server.release_all(open_requests)
@@ -10,6 +10,7 @@ should process different actions (conceptually).
 """
 
 from random import choice
+from collections import Counter
 
 
 class MultiServers(object):
@@ -21,6 +22,10 @@ class MultiServers(object):
         # we need an empty collection to hold all pools
         self._pools = {}
 
+        # links between kinds of servers that are cut, with the number of
+        # times they are cut
+        self._cut = Counter()
+
     def append(self, pool):
         """
         Method to append a new pool to the pools.
@@ -59,12 +64,78 @@ class MultiServers(object):
             print(f"Kind: {kind} not found in pools {self._pools}")
         return self._pools[kind] if kind in self._pools else None
 
-    def random_pool(self):
+    def pools(self):
+        """
+        Method to get all server pools.
+
+        Returns
+        -------
+        list
+        """
+        return list(self._pools.values())
+
+    def random_pool(self, random=None):
         """
         Method to get random server pool to break a server.
 
+        Parameters
+        ----------
+        random: numpy.random.Generator
+            Generator to pick the pool with.
+            Default: the random module.
+
         Returns
         -------
         Server pool
         """
-        return choice(list(self._pools.values()))
+        pools = list(self._pools.values())
+        return pools[random.integers(len(pools))] if random is not None else choice(pools)
+
+    def cut(self, a, b, state):
+        """
+        Method to cut the link between two kinds of servers, in both
+        directions, so messages between them fail. Cuts may overlap, the link
+        is restored when all of them are restored.
+
+        Parameters
+        ----------
+        a: string
+            Kind of servers on one side of the link (or 'client').
+        b: string
+            Kind of servers on the other side of the link.
+        state: bool
+            Cut or restored.
+
+        Returns
+        -------
+        self
+        """
+        link = frozenset((a, b))
+
+        if state:
+            self._cut[link] += 1
+        elif self._cut[link] > 1:
+            self._cut[link] -= 1
+        else:
+            self._cut.pop(link, None)
+
+        # allow chaining
+        return self
+
+    def connected(self, a, b):
+        """
+        Method to check whether messages can be sent between two kinds of
+        servers.
+
+        Parameters
+        ----------
+        a: string
+            Kind of the sending server (or 'client').
+        b: string
+            Kind of the receiving server.
+
+        Returns
+        -------
+        bool
+        """
+        return not self._cut or frozenset((a, b)) not in self._cut
@@ -0,0 +1,328 @@
+"""
+Class for planning the capacity of a simulation. Given a service level objective
+(SLO), it searches for the smallest size or capacity of every server pool that
+still meets it. Every kind of server is bisected on its own, with all other
+pools kept at a feasible upper bound, after which the combination is repaired
+step by step until it meets the SLO as a whole.
+
+All candidate configurations are evaluated on the same seeds (common random
+numbers), so differences between candidates are caused by the configuration
+instead of by chance, and a candidate is only feasible when the upper bound of
+the confidence interval of every SLO metric is within its limit.
+
+@file   lib/Planner.py
+@scope  public
+"""
+
+# dependencies
+from lib.Replications import interval
+from multiprocessing import Pool
+from copy import deepcopy
+import os
+import numpy as np
+
+
+class Planner(object):
+
+    def __init__(self, run, config, slo, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        run: callable
+            Picklable function that runs a single replication. It is called
+            with a configuration and a numpy SeedSequence and should return a
+            summary as produced by Statistics.summary.
+        config: dict
+            Configuration of the simulation, of which the pools are planned.
+            The configured values are the starting point of the search.
+        slo: dict
+            Upper limit per metric, where a metric is a dotted path into the
+            summary (e.g. {"timeout_fraction": 0.001, "transaction.p99": 2}).
+
+        Keyworded parameters
+        --------------------
+        dimension: string
+            Property of the pools to plan, either 'size' or 'capacity'.
+            Default: 'size'.
+        replications: integer
+            Number of replications per candidate configuration.
+            Default: 10.
+        workers: integer
+            Number of parallel worker processes.
+            Default: number of cpus.
+        seed: integer
+            Entropy of the root seed of the common random numbers.
+            Default: None (fresh entropy).
+        confidence: float
+            Confidence level of the intervals.
+            Default: 0.95.
+        doublings: integer
+            Number of times the configured values may be doubled, when the
+            configuration itself does not meet the SLO.
+            Default: 4.
+        """
+        self._run = run
+        self._config = config
+        self._slo = slo
+        self._dimension = kwargs['dimension'] if 'dimension' in kwargs else 'size'
+        self._workers = kwargs['workers'] if 'workers' in kwargs else os.cpu_count()
+        self._confidence = kwargs['confidence'] if 'confidence' in kwargs else 0.95
+        self._doublings = kwargs['doublings'] if 'doublings' in kwargs else 4
+
+        if self._dimension not in ('size', 'capacity'):
+            raise ValueError(f"unknown dimension {self._dimension}, choose from size, capacity")
+
+        # every candidate is evaluated on the same seeds
+        root = np.random.SeedSequence(kwargs['seed'] if 'seed' in kwargs else None)
+        self._entropy = root.entropy
+        self._seeds = root.spawn(kwargs['replications'] if 'replications' in kwargs else 10)
+
+        # configured value of the planned dimension per kind of server
+        self._baseline = {server['kind']: server[self._dimension] for server in config['servers']}
+
+        # confidence intervals of all candidates that were evaluated so far
+        self._cache = {}
+
+    def candidate(self, values):
+        """
+        Method to construct the configuration of a candidate.
+
+        Parameters
+        ----------
+        values: dict
+            Value of the planned dimension per kind of server.
+
+        Returns
+        -------
+        dict
+        """
+        config = deepcopy(self._config)
+
+        for server in config['servers']:
+            server[self._dimension] = values[server['kind']]
+
+        return config
+
+    def cost(self, values):
+        """
+        Method to compute the cost of a candidate, as the total capacity
+        of all of its servers.
+
+        Parameters
+        ----------
+        values: dict
+            Value of the planned dimension per kind of server.
+
+        Returns
+        -------
+        int
+        """
+        return sum(server['size'] * server['capacity'] for server in self.candidate(values)['servers'])
+
+    def evaluate(self, pool, candidates):
+        """
+        Method to evaluate candidates on the common seeds. All replications
+        of all candidates that were not evaluated before run in parallel.
+
+        Parameters
+        ----------
+        pool: multiprocessing.Pool
+            Pool of worker processes.
+        candidates: list
+            Candidates as dictionaries of the value per kind of server.
+
+        Returns
+        -------
+        list
+            Confidence intervals per SLO metric, for every candidate.
+        """
+        # candidates that we did not see before, without duplicates
+        new = list({key(values): values for values in candidates if key(values) not in self._cache}.values())
+
+        tasks = [(self.candidate(values), seed) for values in new for seed in self._seeds]
+        summaries = pool.starmap(self._run, tasks)
+
+        # every candidate owns a consecutive block of summaries
+        n = len(self._seeds)
+        for i, values in enumerate(new):
+            self._cache[key(values)] = self.merge(summaries[i * n:(i + 1) * n])
+
+        return [self._cache[key(values)] for values in candidates]
+
+    def merge(self, summaries):
+        """
+        Method to merge the summaries of a candidate into confidence
+        intervals of the SLO metrics.
+
+        Parameters
+        ----------
+        summaries: list
+            Summaries of all replications of the candidate.
+
+        Returns
+        -------
+        dict
+        """
+        return {metric: interval([lookup(summary, metric) for summary in summaries], self._confidence)
+                for metric in self._slo}
+
+    def feasible(self, intervals):
+        """
+        Method to check whether a candidate meets the SLO with confidence.
+
+        Parameters
+        ----------
+        intervals: dict
+            Confidence intervals per SLO metric.
+
+        Returns
+        -------
+        bool
+        """
+        return all(intervals[metric]['upper'] <= limit for metric, limit in self._slo.items())
+
+    def violation(self, intervals):
+        """
+        Method to express how far a candidate is from meeting the SLO, as
+        the largest ratio between the upper bound of a metric and its limit.
+
+        Parameters
+        ----------
+        intervals: dict
+            Confidence intervals per SLO metric.
+
+        Returns
+        -------
+        float
+        """
+        return max(intervals[metric]['upper'] / limit if limit > 0 else float('inf')
+                   for metric, limit in self._slo.items())
+
+    def plan(self):
+        """
+        Method to search for the cheapest configuration that meets the SLO.
+
+        Returns
+        -------
+        dict
+        """
+        with Pool(self._workers) as pool:
+
+            # we need an upper bound that meets the slo, so try the
+            # configuration itself and double it if necessary
+            ceiling = dict(self._baseline)
+            for _ in range(self._doublings):
+                if self.feasible(self.evaluate(pool, [ceiling])[0]):
+                    break
+                ceiling = {kind: 2 * value for kind, value in ceiling.items()}
+
+            # even the largest configuration does not meet the slo
+            if not self.feasible(self.evaluate(pool, [ceiling])[0]):
+                return self.result(pool, ceiling)
+
+            # bisect every kind at once, between the largest value that is
+            # known to fail and the smallest value that is known to meet the slo
+            lower = {kind: 0 for kind in ceiling}
+            upper = dict(ceiling)
+
+            while True:
+                active = [kind for kind in upper if upper[kind] - lower[kind] > 1]
+                if not active:
+                    break
+
+                # all other kinds stay at the ceiling, so the candidates are independent
+                middle = {kind: (lower[kind] + upper[kind]) // 2 for kind in active}
+                candidates = [dict(ceiling, **{kind: middle[kind]}) for kind in active]
+
+                for kind, intervals in zip(active, self.evaluate(pool, candidates)):
+                    if self.feasible(intervals):
+                        upper[kind] = middle[kind]
+                    else:
+                        lower[kind] = middle[kind]
+
+            # the minimum of every kind on its own may fail together, so add
+            # capacity to one kind at a time until the combination meets the slo
+            values = upper
+            while not self.feasible(self.evaluate(pool, [values])[0]):
+
+                # grow every kind by a quarter, but not beyond the ceiling
+                candidates = [dict(values, **{kind: min(ceiling[kind], value + max(1, value // 4))})
+                              for kind, value in values.items() if value < ceiling[kind]]
+
+                # take the cheapest feasible candidate, or the one closest to feasible
+                values = min(zip(candidates, self.evaluate(pool, candidates)),
+                             key=lambda c: (not self.feasible(c[1]), self.violation(c[1]), self.cost(c[0])))[0]
+
+            return self.result(pool, values)
+
+    def result(self, pool, values):
+        """
+        Method to expose the result of the search.
+
+        Parameters
+        ----------
+        pool: multiprocessing.Pool
+            Pool of worker processes.
+        values: dict
+            Value of the planned dimension per kind of server.
+
+        Returns
+        -------
+        dict
+        """
+        intervals = self.evaluate(pool, [values])[0]
+
+        return {
+            "dimension": self._dimension,
+            "slo": self._slo,
+            "feasible": self.feasible(intervals),
+            "values": values,
+            "cost": self.cost(values),
+            "baseline": self._baseline,
+            "baseline_cost": self.cost(self._baseline),
+            "metrics": intervals,
+            "evaluations": len(self._cache),
+            "replications": len(self._seeds),
+            "seed": self._entropy,
+            "confidence": self._confidence,
+            "config": self.candidate(values),
+        }
+
+
+def key(values):
+    """
+    Function to turn the values of a candidate into a hashable key.
+
+    Parameters
+    ----------
+    values: dict
+        Value of the planned dimension per kind of server.
+
+    Returns
+    -------
+    tuple
+    """
+    return tuple(sorted(values.items()))
+
+
+def lookup(summary, metric):
+    """
+    Function to look up a metric in a summary by its dotted path.
+
+    Parameters
+    ----------
+    summary: dict
+        Summary as produced by Statistics.summary.
+    metric: string
+        Dotted path of the metric (e.g. "kinds.payment.p99").
+
+    Returns
+    -------
+    float
+    """
+    for part in metric.split('.'):
+        summary = summary[part]
+
+    return summary
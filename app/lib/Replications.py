@@ -0,0 +1,324 @@
+"""
+Class for running independent replications of the same simulation in parallel
+worker processes. Replications are launched in batches until the confidence
+intervals of all summary metrics are narrow enough, or until a maximum number
+of replications is reached.
+
+@file   lib/Replications.py
+@scope  public
+"""
+
+# dependencies
+from lib.Histogram import Histogram
+from multiprocessing import Pool
+from statistics import NormalDist
+import math
+import os
+import numpy as np
+
+
+class Replications(object):
+
+    def __init__(self, run, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        run: callable
+            Picklable function that runs a single replication. It is called
+            with a numpy SeedSequence and should return a summary as produced
+            by Statistics.summary.
+
+        Keyworded parameters
+        --------------------
+        workers: integer
+            Number of parallel worker processes.
+            Default: number of cpus.
+        seed: integer
+            Entropy of the root seed, from which the seed of every
+            replication is spawned.
+            Default: None (fresh entropy).
+        confidence: float
+            Confidence level of the intervals.
+            Default: 0.95.
+        """
+        self._run = run
+        self._workers = kwargs['workers'] if 'workers' in kwargs else os.cpu_count()
+        self._confidence = kwargs['confidence'] if 'confidence' in kwargs else 0.95
+
+        # root of all seed streams, every replication gets its own child
+        self._seeds = np.random.SeedSequence(kwargs['seed'] if 'seed' in kwargs else None)
+
+        # summaries of all replications that have run so far
+        self.summaries = []
+
+    def seed(self):
+        """
+        Getter to expose the entropy of the root seed, so a set of
+        replications can be reproduced.
+
+        Returns
+        -------
+        int
+        """
+        return self._seeds.entropy
+
+    def run(self, minimum=5, maximum=50, precision=0.05):
+        """
+        Method to run replications until the half-width of the confidence
+        interval of every metric is at most `precision` times its mean.
+
+        Parameters
+        ----------
+        minimum: integer
+            Minimum number of replications.
+        maximum: integer
+            Maximum number of replications.
+        precision: float
+            Target relative half-width of the confidence intervals.
+
+        Returns
+        -------
+        dict
+        """
+        with Pool(self._workers) as pool:
+
+            # the first batch should at least reach the minimum
+            batch = min(max(minimum, self._workers), maximum)
+
+            while batch > 0:
+
+                # every replication gets an independent child seed
+                self.summaries.extend(pool.map(self._run, self._seeds.spawn(batch)))
+
+                # stop as soon as the intervals are narrow enough
+                if converged(self.merge(), precision):
+                    break
+
+                batch = min(self._workers, maximum - len(self.summaries))
+
+        return self.result(precision)
+
+    def merge(self):
+        """
+        Method to merge the summaries of all replications into means with
+        confidence intervals.
+
+        Returns
+        -------
+        dict
+        """
+        # collect the values of every metric over the replications
+        values = {}
+        for summary in self.summaries:
+            for name, value in metrics(summary).items():
+                values.setdefault(name, []).append(value)
+
+        return {name: interval(v, self._confidence) for name, v in values.items()}
+
+    def result(self, precision):
+        """
+        Method to expose the merged result of the replications.
+
+        Parameters
+        ----------
+        precision: float
+            Target relative half-width of the confidence intervals.
+
+        Returns
+        -------
+        dict
+        """
+        merged = self.merge()
+
+        return {
+            "replications": len(self.summaries),
+            "seed": self.seed(),
+            "confidence": self._confidence,
+            "precision": precision,
+            "converged": converged(merged, precision),
+            "metrics": merged,
+            "histograms": histograms(self.summaries),
+        }
+
+
+def converged(intervals, precision):
+    """
+    Function to check whether all confidence intervals are narrow enough.
+
+    Parameters
+    ----------
+    intervals: dict
+        Confidence intervals per metric, as produced by Replications.merge.
+    precision: float
+        Target relative half-width of the confidence intervals.
+
+    Returns
+    -------
+    bool
+    """
+    return all(i['halfwidth'] <= precision * abs(i['mean']) for i in intervals.values())
+
+
+def histograms(summaries):
+    """
+    Function to merge the histograms of the summaries of all replications,
+    and describe the merged histograms.
+
+    Parameters
+    ----------
+    summaries: list
+        Summaries as produced by Statistics.summary.
+
+    Returns
+    -------
+    dict
+    """
+    transaction = Histogram()
+    kinds = {}
+
+    for summary in summaries:
+        transaction.merge(Histogram.from_dict(summary['histograms']['transaction']))
+        for kind, data in summary['histograms']['kinds'].items():
+            histogram = Histogram.from_dict(data)
+            kinds[kind] = kinds[kind].merge(histogram) if kind in kinds else histogram
+
+    return {
+        "transaction": dict(transaction.describe(), histogram=transaction.to_dict()),
+        "kinds": {kind: dict(h.describe(), histogram=h.to_dict()) for kind, h in kinds.items()},
+    }
+
+
+def metrics(summary):
+    """
+    Function to flatten a summary into scalar metrics.
+
+    Parameters
+    ----------
+    summary: dict
+        Summary as produced by Statistics.summary.
+
+    Returns
+    -------
+    dict
+    """
+    flat = {
+        "throughput": summary['throughput'],
+        "timeout_fraction": summary['timeout_fraction'],
+        "transaction.mean": summary['transaction']['mean'],
+        "transaction.p95": summary['transaction']['p95'],
+    }
+
+    for kind, latency in summary['kinds'].items():
+        flat[f"latency.{kind}.mean"] = latency['mean']
+        flat[f"latency.{kind}.p95"] = latency['p95']
+
+    for kind, failures in summary.get('failures', {}).items():
+        flat[f"availability.{kind}"] = failures['availability']
+
+    return flat
+
+
+def interval(values, confidence=0.95):
+    """
+    Function to compute the mean of a sample together with the half-width
+    of its confidence interval, based on the Student t distribution.
+
+    Parameters
+    ----------
+    values: list
+        Sample of a metric, one value per replication.
+    confidence: float
+        Confidence level of the interval.
+
+    Returns
+    -------
+    dict
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.size
+    mean = float(values.mean())
+
+    # a single replication says nothing about the spread
+    if n < 2:
+        return {"mean": mean, "halfwidth": float('inf'), "lower": float('-inf'), "upper": float('inf'), "n": n}
+
+    halfwidth = t_quantile(confidence, n - 1) * float(values.std(ddof=1)) / np.sqrt(n)
+
+    return {"mean": mean, "halfwidth": halfwidth, "lower": mean - halfwidth, "upper": mean + halfwidth, "n": n}
+
+
+def t_quantile(confidence, df):
+    """
+    Function to compute the two-sided quantile of the Student t distribution.
+    The Cornish-Fisher expansion around the normal quantile, which is only
+    accurate from 3 degrees of freedom on, is refined with Newton steps on
+    the exact distribution function, so few replications give exact
+    intervals as well.
+
+    Parameters
+    ----------
+    confidence: float
+        Confidence level (e.g. 0.95).
+    df: integer
+        Degrees of freedom.
+
+    Returns
+    -------
+    float
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    t = (z
+         + (z**3 + z) / (4 * df)
+         + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+         + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3))
+
+    # the probability of |T| < t is concave in t, so the steps approach the
+    # quantile from below without overshooting it
+    scale = math.exp(math.lgamma((df + 1) / 2) - math.lgamma(df / 2)) / math.sqrt(df * math.pi)
+    for _ in range(100):
+        step = (confidence - t_probability(t, df)) / (2 * scale * (1 + t * t / df) ** (-(df + 1) / 2))
+        t += step
+        if abs(step) < 1e-12 * t:
+            break
+
+    return t
+
+
+def t_probability(t, df):
+    """
+    Function to compute the probability that a Student t distributed value
+    lies between -t and t, exactly for integer degrees of freedom
+    (Abramowitz and Stegun 26.7.3 and 26.7.4).
+
+    Parameters
+    ----------
+    t: float
+        Positive quantile.
+    df: integer
+        Degrees of freedom.
+
+    Returns
+    -------
+    float
+    """
+    theta = math.atan(t / math.sqrt(df))
+    sin, cos = math.sin(theta), math.cos(theta)
+
+    # the finite series in even powers of the cosine, up to cos^(df - 2)
+    term, total = 1.0, 1.0
+
+    if df % 2 == 0:
+        for k in range(2, df - 1, 2):
+            term *= cos * cos * (k - 1) / k
+            total += term
+
+        return sin * total
+
+    for k in range(2, df - 2, 2):
+        term *= cos * cos * k / (k + 1)
+        total += term
+
+    return 2 / math.pi * (theta + (sin * cos * total if df > 1 else 0.0))
@@ -0,0 +1,168 @@
+"""
+This file contains a class to build a pyramid of rollups of a time series, and
+a function to downsample a series to a number of points. Together they keep the
+number of points that is sent to a graph small at any zoom level: the rollup
+level is picked by the visible time range, and downsampled to the width of the
+graph with the largest triangle three buckets (LTTB) algorithm.
+
+@file   Rollups.py
+@scope  public
+"""
+
+# third party dependencies
+import numpy as np
+
+# Resolutions of the rollups in seconds
+LEVELS = [1, 10, 60, 600, 3600]
+
+
+class Rollup(object):
+
+    def __init__(self, times, values, levels=LEVELS):
+        """
+        Constructor. Builds every level of the pyramid from the level below,
+        so the series itself is only traversed once.
+
+        Parameters
+        ----------
+            times: 1-dimensional array of timestamps in seconds, sorted.
+            values: 1-dimensional array of values at the timestamps.
+            levels: Resolutions of the rollups in seconds, ascending.
+        """
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+
+        # seconds without a value are left out
+        times, values = times[~np.isnan(values)], values[~np.isnan(values)]
+
+        # a level is stored as its bucket times and per bucket the min, max,
+        # sum and count of the values, so levels can be rolled up further
+        level = {"time": times, "min": values, "max": values, "sum": values,
+                 "count": np.ones(values.size, dtype=np.int64)}
+
+        self._levels = {}
+        for resolution in levels:
+            level = rollup(level, resolution)
+            self._levels[resolution] = level
+
+    def levels(self):
+        """
+        Getter to expose the resolutions of the pyramid.
+
+        Returns
+        -------
+            list of resolutions in seconds
+        """
+        return list(self._levels)
+
+    def window(self, start=None, end=None, points=2000):
+        """
+        Function to get a time range of the series, at the finest resolution that
+        has at most a few times the requested number of points, downsampled to
+        that number of points.
+
+        Parameters
+        ----------
+            start: Start of the time range in seconds. Default: start of the series.
+            end: End of the time range in seconds. Default: end of the series.
+            points: Maximum number of points to return. Default: 2000.
+
+        Returns
+        -------
+            dict with the resolution and the time, mean, min and max arrays
+        """
+        for resolution, level in self._levels.items():
+            lower = 0 if start is None else np.searchsorted(level["time"], start, side="left")
+            upper = level["time"].size if end is None else np.searchsorted(level["time"], end, side="right")
+
+            # LTTB preserves the shape of a few times more points well
+            if upper - lower <= 4 * points:
+                break
+
+        time = level["time"][lower:upper]
+        mean = level["sum"][lower:upper] / level["count"][lower:upper]
+        selected = lttb(time, mean, points)
+
+        return {
+            "resolution": resolution,
+            "time": time[selected],
+            "mean": mean[selected],
+            "min": level["min"][lower:upper][selected],
+            "max": level["max"][lower:upper][selected],
+        }
+
+
+def rollup(level, resolution):
+    """
+    Function to roll a level of a pyramid up to a coarser resolution.
+
+    Parameters
+    ----------
+        level: dict with the time, min, max, sum and count arrays of a level.
+        resolution: Resolution of the new level in seconds.
+
+    Returns
+    -------
+        dict with the time, min, max, sum and count arrays of the new level
+    """
+    buckets = np.floor(level["time"] / resolution) * resolution
+
+    if buckets.size == 0:
+        return level
+
+    # the series is sorted, so every bucket is a consecutive range
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+    return {
+        "time": buckets[starts],
+        "min": np.minimum.reduceat(level["min"], starts),
+        "max": np.maximum.reduceat(level["max"], starts),
+        "sum": np.add.reduceat(level["sum"], starts),
+        "count": np.add.reduceat(level["count"], starts),
+    }
+
+
+def lttb(x, y, threshold):
+    """
+    Function to downsample a series with the largest triangle three buckets
+    algorithm. Every bucket keeps the point that forms the largest triangle with
+    the point kept in the previous bucket and the average of the next bucket,
+    which preserves peaks and the visual shape of the series.
+
+    Parameters
+    ----------
+        x: 1-dimensional array of sorted x values.
+        y: 1-dimensional array of y values.
+        threshold: Number of points to keep.
+
+    Returns
+    -------
+        Indices of the points to keep
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # the first and last point are always kept, the others are divided
+    # into equally sized buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # average of the next bucket, or the last point
+        following = slice(end, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        average_x = x[following].mean()
+        average_y = y[following].mean()
+
+        # (double) areas of the triangles with all points of this bucket
+        area = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (average_y - y[previous]))
+
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return selected
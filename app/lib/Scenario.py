@@ -0,0 +1,211 @@
+"""
+Class for injecting a scripted scenario of faults into a simulation. A scenario
+is a list of faults, each applied at a fixed time and optionally reverted after
+a duration. All faults are applied and reverted in time order by a single
+process, so a scenario can be reproduced exactly. Every change is written to
+the error log, with the type of fault and its target.
+
+Supported faults, besides "at" and an optional "duration":
+- block:    blocks a "server" (index in the pool, default: 0) of a "kind".
+- degrade:  multiplies the latency of the servers of a "kind" by a "factor"
+            (default: 10).
+- cut:      cuts the link between the kinds "from" and "to" (or 'client').
+- capacity: limits the capacity of the servers of a "kind" to a "fraction"
+            (default: 0.5) of their capacity.
+
+@file   lib/Scenario.py
+@scope  public
+"""
+
+# dependencies
+import math
+
+
+class Scenario(object):
+
+    def __init__(self, envoirment, servers, faults, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        servers: MultiServers
+            The pools of servers to inject the faults into.
+        faults: list
+            Dictionaries describing the faults.
+
+        Keyworded parameters
+        --------------------
+        name: string
+            Name of the scenario.
+            Default: 'scenario'.
+        """
+        self._env = envoirment
+        self._servers = servers
+        self._name = kwargs['name'] if 'name' in kwargs else 'scenario'
+
+        # every fault is a change at its start, and a revert at its end, in
+        # time order. faults at the same time keep the order of the scenario
+        self._changes = []
+        for index, fault in enumerate(faults):
+            if fault['type'] not in FAULTS:
+                raise ValueError(f"Unknown type of fault: {fault['type']}")
+
+            self._changes.append((float(fault['at']), index, True, fault))
+            if fault.get('duration') is not None:
+                self._changes.append((float(fault['at']) + float(fault['duration']), index, False, fault))
+
+        self._changes.sort(key=lambda change: change[:3])
+
+        # faults that are in effect and the servers they were applied to,
+        # by index, so a fault is reverted on the same servers
+        self._active = {}
+
+        # Initialize the scheduler
+        self.process = envoirment.process(self.run())
+
+    def name(self):
+        """
+        Getter to expose the name of the scenario.
+
+        Returns
+        -------
+        string
+        """
+        return self._name
+
+    def active(self):
+        """
+        Getter to expose the faults that are in effect.
+
+        Returns
+        -------
+        list
+        """
+        return [fault for fault, _ in self._active.values()]
+
+    def run(self):
+        """
+        Generator method that applies and reverts the faults in time order.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        for time, index, state, fault in self._changes:
+
+            if time > self._env.now:
+                yield self._env.timeout(time - self._env.now)
+
+            if state:
+                targets = self.targets(fault)
+                self._active[index] = (fault, targets)
+            else:
+                _, targets = self._active.pop(index)
+
+            target = FAULTS[fault['type']](self._servers, fault, targets, state)
+
+            self._env.log((self._env.now, target, fault['type'].capitalize(), 'Start' if state else 'Stop'),
+                          type="error")
+
+    def targets(self, fault):
+        """
+        Method to find the servers a fault applies to, at the time it is
+        applied.
+
+        Parameters
+        ----------
+        fault: dict
+            Description of the fault.
+
+        Returns
+        -------
+        list
+        """
+        if 'kind' not in fault:
+            return []
+
+        servers = self._servers.get(fault['kind']).servers()
+
+        # a block targets a single server, the others the entire pool
+        return [servers[fault.get('server', 0)]] if fault['type'] == 'block' else list(servers)
+
+
+def block(servers, fault, targets, state):
+    """
+    Function to block or unblock a single server.
+
+    Returns
+    -------
+    string
+        Name of the server.
+    """
+    server = targets[0]
+
+    if state:
+        server.block()
+    else:
+        server.unblock()
+
+    return server.name()
+
+
+def degrade(servers, fault, targets, state):
+    """
+    Function to degrade or restore the latency of the servers of a pool.
+
+    Returns
+    -------
+    string
+        Kind of the servers.
+    """
+    factor = fault.get('factor', 10)
+
+    for server in targets:
+        server.latencyscaler = server.latencyscaler * factor if state else server.latencyscaler / factor
+
+    return fault['kind']
+
+
+def cut(servers, fault, targets, state):
+    """
+    Function to cut or restore the link between two kinds of servers.
+
+    Returns
+    -------
+    string
+        Kinds of the servers of the link.
+    """
+    servers.cut(fault['from'], fault['to'], state)
+
+    return f"{fault['from']}-{fault['to']}"
+
+
+def capacity(servers, fault, targets, state):
+    """
+    Function to limit the capacity of the servers of a pool, or to remove
+    that limit.
+
+    Returns
+    -------
+    string
+        Kind of the servers.
+    """
+    fraction = fault.get('fraction', 0.5)
+
+    for server in targets:
+
+        # the limit is relative to the configured capacity of the server
+        server.limit(math.ceil(server.get_capacity() * fraction), state)
+
+    return fault['kind']
+
+
+# Faults by their type
+FAULTS = {
+    "block": block,
+    "degrade": degrade,
+    "cut": cut,
+    "capacity": capacity,
+}
@@ -1,6 +1,7 @@
 # Import dependencies
 import numpy as np
 import pandas as pd
+from lib.Streams import generator
 
 
 class Seasonality(object):
@@ -14,10 +15,17 @@ class Seasonality(object):
 
         # Import seasonality .csv file
         self.seasonality_df = pd.read_csv(self.seasonality_file, sep=";")
+        self.seasonality_df = self.seasonality_df.sort_values("time").reset_index(drop=True)
 
         # Find highest time value in seasonality seasonality_dataframe
         self.max_time_seasonality = max(self.seasonality_df["time"].values)
 
+        # The closest time value changes halfway between two time values, so
+        # these bounds divide the seasonality into segments of a constant scaler
+        self._times = self.seasonality_df["time"].values
+        self._scalers = self.seasonality_df["scaler_value"].values
+        self._bounds = (self._times[:-1] + self._times[1:]) / 2
+
     def scale(self, timestamp=None):
         """ Return scalar to adjust amount of messages, use timestamp if given,
         otherwise call envoirment to determine current time
@@ -29,12 +37,24 @@ class Seasonality(object):
                 raise BaseException("No timestamp or envoirment specified")
             timestamp = self.env.now
 
+        return self.segment(timestamp)[0]
+
+    def segment(self, timestamp):
+        """ Return scalar for a timestamp, together with the time at which the
+        segment of this scalar ends
+        """
+
         # Loop if timestamp is larger than max seasonality time
-        timestamp = timestamp % self.max_time_seasonality
-        # Find time value closest to timestamp
-        closest_time = abs(self.seasonality_df["time"]-timestamp).values.argmin()
+        offset = timestamp % self.max_time_seasonality
+        # Find time value closest to timestamp, ties go to the earlier time value
+        closest_time = np.searchsorted(self._bounds, offset, side="left")
+        # Find where the next time value becomes the closest
+        if closest_time < len(self._bounds):
+            end = self._bounds[closest_time]
+        else:
+            end = self.max_time_seasonality
         # Return scaler value correspoding to closest_time
-        return self.seasonality_df["scaler_value"][closest_time]
+        return self._scalers[closest_time], timestamp - offset + end
 
 
 class TransactionInterval(Seasonality):
@@ -43,15 +63,45 @@ class TransactionInterval(Seasonality):
     interval between two transactions.
     """
 
-    def __init__(self, seasonality_file, enviroment=None, max_volume=None):
+    def __init__(self, seasonality_file, enviroment=None, max_volume=None, random=None):
         Seasonality.__init__(self, seasonality_file, enviroment)
         self.max_vol = max_volume
+        # Generator of the intervals, fresh entropy if none is given
+        self.random = generator(random)
 
     def interval(self, timestamp=None):
         if self.max_vol is None:
             raise BaseException("No Maximum volume given")
         # Generate a random expected volume given a seasonality and maximum volume
-        random_volume = np.random.gamma(self.scale(timestamp) * self.max_vol, 1)
+        random_volume = self.random.gamma(self.scale(timestamp) * self.max_vol, 1)
         # Create a time interval by dividing a time unit (second) by the volume
         time_interval = 1/random_volume
         return time_interval
+
+    def arrivals(self, timestamp=None, limit=10000):
+        """ Generate the arrival times of all transactions in the seasonality
+        segment of the timestamp at once. Every interval is drawn with the scaler
+        at the time of the previous arrival, exactly like interval() does, so the
+        last arrival may fall in the next segment. The next batch should start
+        at the last arrival.
+        """
+        if self.max_vol is None:
+            raise BaseException("No Maximum volume given")
+        if timestamp is None:
+            timestamp = self.env.now
+
+        scaler, end = self.segment(timestamp)
+        shape = scaler * self.max_vol
+
+        # Draw enough intervals to likely cover the rest of the segment
+        size = int(min(max(np.ceil((end - timestamp) * shape * 1.1), 1), limit))
+        arrivals = timestamp + np.cumsum(1 / self.random.gamma(shape, 1, size=size))
+
+        # Only keep arrivals until the first one that leaves the segment
+        leaving = np.searchsorted(arrivals, end, side="left")
+        return arrivals[:leaving + 1]
+
+    def exhausted(self):
+        """ A seasonality repeats, so it never runs out of arrivals.
+        """
+        return False
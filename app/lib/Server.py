@@ -8,7 +8,8 @@ more than a resource with some additional patches.
 
 # dependencies
 from simpy import PreemptiveResource
-from numpy.random import exponential, uniform
+from simpy.resources.resource import Preempted
+from lib.Streams import generator
 
 
 class Server(PreemptiveResource):
@@ -32,6 +33,9 @@ class Server(PreemptiveResource):
         memmax: integer:
             Set scalar how many times the max capacity fits in memory
             Default = 10
+        random: numpy.random.Generator
+            Generator of the service times of this server.
+            Default = a generator with fresh entropy
         """
         # call the parent constructor
         super().__init__(*args)
@@ -53,6 +57,26 @@ class Server(PreemptiveResource):
             # Default is 1 times the capacity
             self.latencyscaler = 1
 
+        # generator of the service times
+        self._random = generator(kwargs['random'] if 'random' in kwargs else None)
+
+        # requests that are queued or granted, and not released yet. this is
+        # a set, so finding an open request does not depend on the capacity
+        self._open = set()
+
+        # number of failures that block this server, it is blocked as long
+        # as one of them is not resolved
+        self._blocks = 0
+
+        # limits on the capacity, the lowest of which is in effect
+        self._limits = []
+        self._effective = self._capacity
+
+        # time-weighted areas of the cpu usage, the number of users and the
+        # length of the queue, accounted whenever one of them changes
+        self._accounted = self._env.now
+        self._areas = {'cpu_time': 0.0, 'users': 0.0, 'queue': 0.0}
+
         # setup the initial state of this server
         self._state = {
             'name':  "%s#%s" % (kwargs['kind'], kwargs['uuid']),
@@ -74,15 +98,36 @@ class Server(PreemptiveResource):
         """
         return self._env
 
+    def name(self):
+        """
+        Getter to expose the name of the server.
+
+        Returns
+        -------
+        string
+        """
+        return self._state['name']
+
+    def kind(self):
+        """
+        Getter to expose the kind of the server.
+
+        Returns
+        -------
+        string
+        """
+        return self._state['kind']
+
     def get_capacity(self):
         """
-        Getter to expose the server capacity.
+        Getter to expose the server capacity, as configured, regardless of
+        any limits on it.
 
         Returns
         -------
         int
         """
-        return self.capacity
+        return self._capacity
 
     def request(self, *args, **kwargs):
         """
@@ -98,8 +143,271 @@ class Server(PreemptiveResource):
         # parse parameters for the super class method
         priority = kwargs['priority'] if 'priority' in kwargs else 1
 
+        # the request joins the queue right away
+        self._account()
+
+        # call the parent class for the original method
+        request = super().request(priority=priority)
+
+        # keep track of the open request
+        self._open.add(request)
+
+        return request
+
+    def release(self, request):
+        """
+        Method override to release a request.
+        @see https://simpy.readthedocs.io/en/latest/api_reference/simpy.resources.html#simpy.resources.resource.Release
+
+        Parameters
+        ----------
+        request: simpy.resources.resource.Request
+            The request to release.
+        """
+        self._open.discard(request)
+        self._account()
+
+        # call the parent class for the original method
+        return super().release(request)
+
+    def holds(self, request):
+        """
+        Method to check whether a request is still open on this server.
+
+        Parameters
+        ----------
+        request: simpy.resources.resource.Request
+            The request to check.
+
+        Returns
+        -------
+        bool
+        """
+        return request in self._open
+
+    def release_all(self, requests):
+        """
+        Method to release a collection of requests at once. Requests that were
+        already released are skipped, and requests that are still waiting in
+        the queue are cancelled, so they cannot be granted afterwards.
+
+        Parameters
+        ----------
+        requests: iterable
+            The requests to release.
+
+        Returns
+        -------
+        self
+        """
+        self._account()
+
+        for request in requests:
+
+            # skip requests that are not open anymore
+            if not self.holds(request):
+                continue
+
+            self._open.discard(request)
+
+            # granted requests are released, queued requests are cancelled
+            if request.triggered:
+                super().release(request)
+            else:
+                request.cancel()
+
+        # allow chaining
+        return self
+
+    @property
+    def capacity(self):
+        """
+        Property override of the capacity, which may be limited.
+
+        Returns
+        -------
+        int
+        """
+        return self._effective
+
+    def limit(self, capacity, state=True):
+        """
+        Method to limit the capacity of this server. Requests that are being
+        processed keep running, but no request is granted above the limit.
+        Limits may overlap, the lowest limit is in effect.
+
+        Parameters
+        ----------
+        capacity: int
+            The limited capacity.
+        state: bool
+            Whether to add or to remove the limit.
+
+        Returns
+        -------
+        self
+        """
+        self._account()
+
+        if state:
+            self._limits.append(max(int(capacity), 1))
+        elif max(int(capacity), 1) in self._limits:
+            self._limits.remove(max(int(capacity), 1))
+
+        self._effective = min([self._capacity] + self._limits)
+
+        # a raised limit frees capacity for queued requests
+        return self._grant()
+
+    @property
+    def count(self):
+        """
+        Property override of the number of users. A blocked server has no
+        users, but is fully occupied.
+
+        Returns
+        -------
+        int
+        """
+        return self.capacity if self._blocks else len(self.users)
+
+    def blocked(self):
+        """
+        Method to check whether this server is blocked.
+
+        Returns
+        -------
+        bool
+        """
+        return self._blocks > 0
+
+    def block(self):
+        """
+        Method to block the entire capacity of this server. The requests that
+        are being processed are preempted, and no request is granted until the
+        server is unblocked. Blocks may overlap, the server stays blocked until
+        all of them are unblocked.
+
+        Returns
+        -------
+        self
+        """
+        self._account()
+        self._blocks += 1
+
+        # the server was already blocked
+        if self._blocks > 1:
+            return self
+
+        # preempt all users, like requests with a higher priority would
+        for user in list(self.users):
+            self.users.remove(user)
+            if user.proc is not None and user.proc.is_alive:
+                user.proc.interrupt(Preempted(by=None, usage_since=user.usage_since, resource=self))
+
+        # allow chaining
+        return self
+
+    def unblock(self):
+        """
+        Method to resolve a block of this server. When no blocks are left, the
+        queued requests are granted up to the capacity of the server.
+
+        Returns
+        -------
+        self
+        """
+        self._blocks = max(self._blocks - 1, 0)
+
+        if self._blocks:
+            return self
+
+        # allow chaining
+        return self._grant()
+
+    def _grant(self):
+        """
+        Method to grant queued requests up to the capacity of this server.
+
+        Returns
+        -------
+        self
+        """
+        # every trigger grants at most a single queued request
+        while not self._blocks and self.put_queue and len(self.users) < self.capacity:
+            queued = len(self.put_queue)
+            self._trigger_put(None)
+            if len(self.put_queue) == queued:
+                break
+
+        # allow chaining
+        return self
+
+    def _trigger_put(self, get_event):
+        """
+        Method override to grant queued requests, which may change the number
+        of users and the length of the queue.
+        @see simpy.resources.base.BaseResource._trigger_put
+
+        Parameters
+        ----------
+        get_event: simpy.events.Event|None
+            The event that triggered the grant, if any.
+        """
+        self._account()
+
         # call the parent class for the original method
-        return super().request(priority=priority)
+        return super()._trigger_put(get_event)
+
+    def _account(self):
+        """
+        Method to add the time since the last change to the time-weighted
+        areas, with the state of this server during that time.
+        """
+        elapsed = self._env.now - self._accounted
+
+        if elapsed > 0:
+            users = len(self.users)
+            self._areas['cpu_time'] += elapsed * users / self._effective
+            self._areas['users'] += elapsed * users
+            self._areas['queue'] += elapsed * len(self.put_queue)
+            self._accounted = self._env.now
+
+    def usage(self):
+        """
+        Method to expose the time-weighted areas of this server up to now:
+        the cpu time (the integral of the cpu usage), and the integrals of the
+        number of users and of the length of the queue. A blocked server does
+        not use any cpu time.
+
+        Returns
+        -------
+        dict
+        """
+        self._account()
+
+        return dict(self._areas)
+
+    def _do_put(self, event):
+        """
+        Method override to grant a request, which is postponed while the
+        server is blocked.
+        @see simpy.PreemptiveResource._do_put
+
+        Parameters
+        ----------
+        event: simpy.resources.resource.PriorityRequest
+            The request to grant.
+
+        Returns
+        -------
+        bool
+            Whether the next queued request should be considered.
+        """
+        if self._blocks:
+            return False
+
+        return super()._do_put(event)
 
     def state(self):
         """
@@ -136,7 +444,7 @@ class Server(PreemptiveResource):
         # with the cpu usage
         # return exponential(self.cpu())
 
-        latency = exponential(self.cpu()) * self.latencyscaler
+        latency = self._random.exponential(self.cpu()) * self.latencyscaler
 
         return latency
 
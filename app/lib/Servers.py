@@ -9,8 +9,9 @@ a given number of servers and get access to an available one.
 
 # dependencies
 from lib.Server import Server
-from uuid import uuid4
-from numpy.random import randint, shuffle
+from lib.Balancers import Balancer, Random, Stuck, balancer
+from lib.Streams import generator, identifier
+from collections import deque
 
 
 class Servers(object):
@@ -35,26 +36,84 @@ class Servers(object):
         kind: string
             Kind of servers in this pool.
             Default: 'regular'.
+        circuit: dict
+            Configuration of the circuit breaker, which stops routing messages
+            to servers that recently timed out or were preempted. Keys:
+            - window:       Number of recent outcomes per server to consider.
+                            Default: 10.
+            - minimum:      Minimum number of outcomes before a circuit can open.
+                            Default: 5.
+            - threshold:    Fraction of failed outcomes that opens the circuit.
+                            Default: 0.5.
+            - cooldown:     Time after which an open circuit lets a single probe
+                            message through (half-open). A processed probe closes
+                            the circuit again, a failed one reopens it.
+                            Default: 2.
+            Default: None (no circuit breaking).
+        balancer: string|Balancer
+            Load balancing strategy of this pool, or its name (see
+            lib/Balancers.py for all strategies).
+            Default: 'least-queue'.
+        random: numpy.random.Generator
+            Generator of the choices of the load balancing strategy, and of
+            the identifiers of the servers.
+            Default: a generator with fresh entropy.
+        service: numpy.random.Generator
+            Generator of the service times of the servers.
+            Default: a generator with fresh entropy.
         """
         # set the default arguments
         size = kwargs['size'] if 'size' in kwargs else 10
         capacity = kwargs['capacity'] if 'capacity' in kwargs else 10
         kind = kwargs['kind'] if 'kind' in kwargs else 'regular'
+        circuit = kwargs['circuit'] if 'circuit' in kwargs else None
+        strategy = kwargs['balancer'] if 'balancer' in kwargs else 'least-queue'
+
+        # every pool draws from its own streams
+        self._random = generator(kwargs['random'] if 'random' in kwargs else None)
+        self._service = generator(kwargs['service'] if 'service' in kwargs else None)
 
         # construct a new pool
-        self._pool = [Server(env, capacity, uuid=uuid4(), kind=kind) for _ in range(size)]
+        self._pool = [Server(env, capacity, uuid=identifier(self._random), kind=kind, random=self._service)
+                      for _ in range(size)]
 
         # assign some parameters as properties
         self._kind = kind
+        self._env = env
+        self._capacity = capacity
+
+        # servers that are removed from the pool, but still finish their
+        # open requests
+        self._draining = []
+
+        # circuit breaker configuration, if any
+        self._circuit = None
+        if circuit is not None:
+            self._circuit = dict({'window': 10, 'minimum': 5, 'threshold': 0.5, 'cooldown': 2}, **circuit)
+
+        # recent outcomes per server, as booleans of whether a message failed
+        self._outcomes = {}
+
+        # servers with an open circuit, and when they may be probed again
+        self._tripped = set()
+        self._retry = {}
+
+        # servers with a half-open circuit that are processing a probe
+        self._probing = set()
+
+        # number of times a circuit opened
+        self.trips = 0
+
+        # number of messages that were processed or failed in this pool
+        self.processed = 0
+        self.failed = 0
 
         # disabled state of this pool
         self._disabled = False
 
-        # random state of this pool
-        self._random = False
-
-        # stuck loadbalancing state of this pool
-        self._stuck = False
+        # load balancing strategy of this pool
+        self._default = strategy if isinstance(strategy, Balancer) else balancer(strategy, self._random)
+        self._balancer = self._default
         self.stuckserver = None
 
     def kind(self):
@@ -67,6 +126,91 @@ class Servers(object):
         """
         return self._kind
 
+    def servers(self):
+        """
+        Getter to expose the servers that can receive new messages.
+
+        Returns
+        -------
+        list
+        """
+        return self._pool
+
+    def draining(self):
+        """
+        Getter to expose the servers that are drained, but may still be
+        processing messages.
+
+        Returns
+        -------
+        list
+        """
+        return self._draining
+
+    def add(self):
+        """
+        Method to add a new server to the pool.
+
+        Returns
+        -------
+        Server
+        """
+        server = Server(self._env, self._capacity, uuid=identifier(self._random), kind=self._kind,
+                        random=self._service)
+        self._pool.append(server)
+
+        # let the load balancing strategy know about the new server
+        self._default.update(self._pool)
+        self._balancer.update(self._pool)
+
+        return server
+
+    def drain(self, server=None):
+        """
+        Method to drain a server from the pool. A drained server does not
+        receive new messages anymore, but finishes its open requests. The
+        last server of a pool cannot be drained.
+
+        Parameters
+        ----------
+        server: Server
+            The server to drain.
+            Default: the server with the fewest users.
+
+        Returns
+        -------
+        Server|None
+        """
+        if len(self._pool) <= 1:
+            return None
+
+        if server is None:
+            server = min(self._pool, key=lambda server: server.count + len(server.queue))
+
+        self._pool.remove(server)
+        self._draining.append(server)
+
+        # let the load balancing strategy know about the removed server
+        self._default.update(self._pool)
+        self._balancer.update(self._pool)
+
+        return server
+
+    def retire(self):
+        """
+        Method to forget about drained servers that finished all of their
+        open requests.
+
+        Returns
+        -------
+        list
+            The retired servers.
+        """
+        retired = [server for server in self._draining if server.count == 0 and not server.queue]
+        self._draining = [server for server in self._draining if server not in retired]
+
+        return retired
+
     def disabled(self, state):
         """
         Method to disable this pool of servers. This will make sure that no
@@ -104,7 +248,7 @@ class Servers(object):
         """
 
         # change the random state
-        self._random = bool(state)
+        self._balancer = Random(self._random) if state else self._default
 
         # allow chaining
         return self
@@ -124,11 +268,9 @@ class Servers(object):
         self
         """
 
-        # change the random state
-        self._stuck = bool(state)
-
         # If set to stuck, pick random server in pool to keep sending messages to
-        self.stuckserver = self._pool[randint(0, len(self._pool))]
+        self._balancer = Stuck(self._pool, self._random) if state else self._default
+        self.stuckserver = self._balancer.server if state else None
 
         # allow chaining
         return self
@@ -139,9 +281,12 @@ class Servers(object):
 
         Keyworded parameters
         --------------------
-        exclude: list
+        exclude: set
             Collection of servers to exclude from the pool when looking for
             a new server.
+        key: mixed
+            Key of the transaction the message belongs to, used by strategies
+            such as consistent hashing.
 
         Returns
         -------
@@ -154,57 +299,167 @@ class Servers(object):
         # we need a reference to the pool of servers
         pool = self._pool
 
-        # we need to check if we need to pick a server randomly, or by lowest
-        if self._random:
+        # we need to check if we have a list of servers that we need to exclude
+        # from the pool of servers
+        exclude = kwargs['exclude'] if 'exclude' in kwargs else set()
+
+        # servers with an open circuit are excluded as well, unless they can
+        # be probed again
+        if self._tripped:
+            exclude = set(exclude) | {server for server in self._tripped if not self._probeable(server)}
 
-            # pick a random server
-            return pool[randint(0, len(pool))]
+        # the circuit breaker should never leave a pool without servers
+        if exclude and all(server in exclude for server in pool):
+            exclude = kwargs['exclude'] if 'exclude' in kwargs else set()
 
-        # we need to check if the loadbalancing is stuck on one server
-        if self._stuck:
+        # let the load balancing strategy pick a server
+        return self._select(self._balancer.select(pool, exclude, kwargs['key'] if 'key' in kwargs else None))
 
-            # pick a random server
-            return self.stuckserver
+    def outcome(self, server, failed):
+        """
+        Method to report the outcome of a message to a server of this pool,
+        which is used to keep track of the health of that server.
 
-        # we need a reference to the server with the lowest number of
-        # processes in queue, which is the server that is going to
-        # be targeted
-        lowest = None
+        Parameters
+        ----------
+        server: Server
+            The server that received the message.
+        failed: bool
+            Whether the message timed out or was preempted.
 
-        # we need to check if we have a list of servers that we need to exclude
-        # from the pool of servers
-        exclude = kwargs['exclude'] if 'exclude' in kwargs else []
+        Returns
+        -------
+        self
+        """
+        if failed:
+            self.failed += 1
+        else:
+            self.processed += 1
+
+        # without a circuit breaker, there is nothing else to keep track of
+        if self._circuit is None:
+            return self
+
+        # the outcome of a probe decides the state of the circuit
+        if server in self._probing:
+            self._probing.discard(server)
+
+            if failed:
+                self._trip(server)
+            else:
+                self._tripped.discard(server)
+                self._outcomes[server].clear()
+
+            # allow chaining
+            return self
+
+        # remember the recent outcomes of the server
+        if server not in self._outcomes:
+            self._outcomes[server] = deque(maxlen=self._circuit['window'])
+        outcomes = self._outcomes[server]
+        outcomes.append(failed)
+
+        # open the circuit when too many recent messages failed
+        if (server not in self._tripped and len(outcomes) >= self._circuit['minimum']
+                and sum(outcomes) >= self._circuit['threshold'] * len(outcomes)):
+            self._trip(server)
 
-        # we need to iterate over the pool of servers, so we can check
-        # the state of each server and find the one with the least
-        # amount of traffic
-        # Shuffle to get spread in a low volume system
-        shuffle(pool)
-        for server in pool:
+        # allow chaining
+        return self
 
-            # state of the current server
-            current = server.state()
+    def probing(self, server):
+        """
+        Method to check whether a server receives the probe of its half-open
+        circuit.
 
-            # pass servers that we need to exclude
-            if server in exclude:
-                continue
+        Parameters
+        ----------
+        server: Server
+            The server to check.
 
-            # assign a new server as the lowest
-            if lowest is None:
-                lowest = server
+        Returns
+        -------
+        bool
+        """
+        return server in self._probing
+
+    def abandon(self, server):
+        """
+        Method to abandon the probe of a server, when the message of the
+        probe was not sent or its outcome was not reported. The circuit stays
+        open, but lets the next probe through.
+
+        Parameters
+        ----------
+        server: Server
+            The server that received the probe.
 
-            # assign a new server if has a lower number of processes
-            # in the queue
-            elif current['queue'] < lowest.state()['queue']:
-                lowest = server
+        Returns
+        -------
+        self
+        """
+        self._probing.discard(server)
 
-        # expose the server with the lowest number of processes in the queue
-        return lowest
+        # allow chaining
+        return self
+
+    def _trip(self, server):
+        """
+        Method to open the circuit of a server.
+
+        Parameters
+        ----------
+        server: Server
+            The server to stop routing messages to.
+        """
+        self._tripped.add(server)
+        self._retry[server] = self._env.now + self._circuit['cooldown']
+        self.trips += 1
+
+    def _probeable(self, server):
+        """
+        Method to check whether an open circuit may let a probe through.
+
+        Parameters
+        ----------
+        server: Server
+            Server with an open circuit.
+
+        Returns
+        -------
+        bool
+        """
+        return server not in self._probing and self._env.now >= self._retry[server]
+
+    def _select(self, server):
+        """
+        Method to register the selection of a server, so that a server with
+        a half-open circuit only receives a single probe.
+
+        Parameters
+        ----------
+        server: Server|None
+            The selected server.
+
+        Returns
+        -------
+        Server|None
+        """
+        if server in self._tripped:
+            self._probing.add(server)
+
+        return server
 
     def get_random(self, **kwargs):
         """
         Method to get access to an random server from the pool for use in error generation
 
+        Keyworded parameters
+        --------------------
+        random: numpy.random.Generator
+            Generator to pick the server with.
+            Default: the generator of this pool.
+
         Returns
         -------
         Server
@@ -213,4 +468,5 @@ class Servers(object):
         pool = self._pool
 
         # pick a random server
-        return pool[randint(0, len(pool))]
+        random = kwargs['random'] if 'random' in kwargs else self._random
+        return pool[random.integers(len(pool))]
@@ -0,0 +1,235 @@
+"""
+Class for tracing the hops of a sample of transactions. For every hop of a
+sampled transaction a span is recorded with the time the message was enqueued
+at the server, the time its request was granted and the time it finished. The
+spans are kept in a single structured numpy array, and can be broken down into
+the time spent queueing and the time spent in service per kind of server.
+
+@file   lib/Spans.py
+@scope  public
+"""
+
+# dependencies
+import numpy as np
+
+# layout of a single span
+SPAN = np.dtype([
+    ('transaction', np.int64),
+    ('uuid', 'S16'),
+    ('hop', np.int16),
+    ('kind', np.int16),
+    ('enqueue', np.float64),
+    ('start', np.float64),
+    ('end', np.float64),
+    ('processed', np.bool_),
+])
+
+
+class Spans(object):
+
+    def __init__(self, **kwargs):
+        """
+        Constructor.
+
+        Keyworded parameters
+        --------------------
+        rate: float
+            Fraction of the transactions that is traced.
+            Default: 0.01.
+        size: integer
+            Initial number of spans that fit in the array, which doubles
+            when it is full.
+            Default: 1024.
+        """
+        self._rate = kwargs['rate'] if 'rate' in kwargs else 0.01
+        self._spans = np.zeros(kwargs['size'] if 'size' in kwargs else 1024, dtype=SPAN)
+
+        # number of recorded spans
+        self._size = 0
+
+        # number of sampled transactions
+        self._transactions = 0
+
+        # kinds of server by their code in the spans
+        self._kinds = []
+        self._codes = {}
+
+    def sample(self, process_id):
+        """
+        Method to decide whether a transaction is traced. The decision is
+        made on the uuid of the transaction, so it does not consume any
+        random numbers of the simulation.
+
+        Parameters
+        ----------
+        process_id: uuid
+            Id of the transaction.
+
+        Returns
+        -------
+        int|None
+            Sequence number of the traced transaction, or None.
+        """
+        if (process_id.int & 0xffffffff) >= self._rate * 0x100000000:
+            return None
+
+        self._transactions += 1
+        return self._transactions - 1
+
+    def record(self, transaction, process_id, hop, kind, enqueue, start, end, processed):
+        """
+        Method to record the span of a hop.
+
+        Parameters
+        ----------
+        transaction: int
+            Sequence number of the traced transaction.
+        process_id: uuid
+            Id of the transaction.
+        hop: int
+            Index of the hop in the route.
+        kind: string
+            Kind of the server.
+        enqueue: float
+            Time the message was sent to the server.
+        start: float
+            Time the request was granted, nan when it never was.
+        end: float
+            Time the message finished or was interrupted.
+        processed: bool
+            Whether the message was processed without interruption.
+
+        Returns
+        -------
+        self
+        """
+        # double the array when it is full
+        if self._size == self._spans.size:
+            self._spans = np.concatenate((self._spans, np.zeros(self._spans.size, dtype=SPAN)))
+
+        if kind not in self._codes:
+            self._codes[kind] = len(self._kinds)
+            self._kinds.append(kind)
+
+        self._spans[self._size] = (transaction, process_id.bytes, hop, self._codes[kind],
+                                   enqueue, start, end, processed)
+        self._size += 1
+
+        # allow chaining
+        return self
+
+    def spans(self):
+        """
+        Getter to expose the recorded spans.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._spans[:self._size]
+
+    def kinds(self):
+        """
+        Getter to expose the kinds of server, by their code in the spans.
+
+        Returns
+        -------
+        list
+        """
+        return list(self._kinds)
+
+    def save(self, path):
+        """
+        Method to write the spans to a numpy .npz file.
+
+        Parameters
+        ----------
+        path: string
+            Path of the file.
+
+        Returns
+        -------
+        self
+        """
+        np.savez_compressed(path, spans=self.spans(), kinds=np.array(self._kinds), rate=self._rate)
+
+        # allow chaining
+        return self
+
+    def breakdown(self):
+        """
+        Method to break the recorded spans down per kind of server.
+
+        Returns
+        -------
+        dict
+        """
+        return breakdown(self.spans(), self._kinds)
+
+
+def load(path):
+    """
+    Function to load spans that were written with Spans.save.
+
+    Parameters
+    ----------
+    path: string
+        Path of the .npz file.
+
+    Returns
+    -------
+    tuple
+        The spans and the kinds of server by their code.
+    """
+    with np.load(path) as data:
+        return data['spans'], data['kinds'].tolist()
+
+
+def breakdown(spans, kinds):
+    """
+    Function to aggregate spans per kind of server into the time spent queueing
+    and the time spent in service, the number of timed out hops, and how often
+    a hop of the kind was the critical (slowest) hop of its transaction.
+
+    Parameters
+    ----------
+    spans: numpy.ndarray
+        Spans with the SPAN layout.
+    kinds: list
+        Kinds of server by their code in the spans.
+
+    Returns
+    -------
+    dict
+    """
+    # messages that were never granted queued until they were interrupted
+    granted = ~np.isnan(spans['start'])
+    queue = np.where(granted, spans['start'], spans['end']) - spans['enqueue']
+    service = np.where(granted, spans['end'] - spans['start'], 0.0)
+
+    # the slowest hop of every transaction is its critical hop
+    order = np.lexsort((queue + service, spans['transaction']))
+    last = np.ones(order.size, dtype=bool)
+    last[:-1] = spans['transaction'][order][1:] != spans['transaction'][order][:-1]
+    critical = np.bincount(spans['kind'][order][last], minlength=len(kinds))
+
+    result = {}
+    for code, kind in enumerate(kinds):
+        mask = spans['kind'] == code
+        if not mask.any():
+            continue
+
+        total = queue[mask].sum() + service[mask].sum()
+
+        result[kind] = {
+            "count": int(mask.sum()),
+            "timeouts": int((~spans['processed'][mask]).sum()),
+            "queue_mean": float(queue[mask].mean()),
+            "queue_p95": float(np.percentile(queue[mask], 95)),
+            "service_mean": float(service[mask].mean()),
+            "service_p95": float(np.percentile(service[mask], 95)),
+            "queue_share": float(queue[mask].sum() / total) if total > 0 else 0.0,
+            "critical": int(critical[code]),
+        }
+
+    return result
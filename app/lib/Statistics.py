@@ -0,0 +1,262 @@
+"""
+Class for collecting summary statistics of a simulation in memory. This can
+be attached to a MessageGenerator, so that a run can be summarised without
+writing or parsing any logfile afterwards.
+
+@file   lib/Statistics.py
+@scope  public
+"""
+
+# dependencies
+from lib.Histogram import Histogram
+
+
+class Statistics(object):
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # number of transactions that entered the system
+        self._arrivals = 0
+
+        # number of transactions that passed their entire route
+        self._completed = 0
+
+        # number of transactions that had at least one timed out message
+        self._timeouts = 0
+
+        # histogram of the end-to-end durations of all finished transactions
+        self._transactions = Histogram()
+
+        # histograms of the durations of all messages, per kind of server
+        self._latencies = {}
+
+        # number of messages, timeouts and preemptions per kind of server
+        self._messages = {}
+
+        # servers that received messages per kind, in order of appearance, of
+        # which the time-weighted usage is summarised
+        self._servers = {}
+
+        # autoscalers of the server pools
+        self._scalers = []
+
+        # failure processes of the server pools
+        self._failures = []
+
+    def arrival(self):
+        """
+        Method to register a new transaction entering the system.
+
+        Returns
+        -------
+        self
+        """
+        self._arrivals += 1
+
+        # allow chaining
+        return self
+
+    def hop(self, kind, duration):
+        """
+        Method to register a processed message on a server of a given kind.
+
+        Parameters
+        ----------
+        kind: string
+            Kind of the server that processed the message.
+        duration: float
+            Time between sending the message and receiving the response,
+            so including the time spent in the queue of the server.
+
+        Returns
+        -------
+        self
+        """
+        if kind not in self._latencies:
+            self._latencies[kind] = Histogram()
+
+        self._latencies[kind].record(duration)
+
+        # allow chaining
+        return self
+
+    def message(self, kind, server):
+        """
+        Method to register a message that was sent to a server of a given
+        kind.
+
+        Parameters
+        ----------
+        kind: string
+            Kind of the server that received the message.
+        server: Server
+            The server that received the message.
+
+        Returns
+        -------
+        self
+        """
+        if kind not in self._messages:
+            self._messages[kind] = {"arrivals": 0, "timeouts": 0, "preemptions": 0}
+            self._servers[kind] = {}
+
+        self._messages[kind]["arrivals"] += 1
+        self._servers[kind][server] = None
+
+        # allow chaining
+        return self
+
+    def interruption(self, kind, preempted=False):
+        """
+        Method to register a message that was interrupted before it was
+        processed by a server of a given kind.
+
+        Parameters
+        ----------
+        kind: string
+            Kind of the server that did not process the message.
+        preempted: bool
+            Whether the message was preempted because the server was blocked,
+            rather than timed out.
+
+        Returns
+        -------
+        self
+        """
+        if kind not in self._messages:
+            self._messages[kind] = {"arrivals": 0, "timeouts": 0, "preemptions": 0}
+            self._servers[kind] = {}
+
+        self._messages[kind]["preemptions" if preempted else "timeouts"] += 1
+
+        # allow chaining
+        return self
+
+    def completion(self, duration, timedout=False):
+        """
+        Method to register a transaction that finished its route.
+
+        Parameters
+        ----------
+        duration: float
+            Time between the arrival of the transaction and the end of
+            its route.
+        timedout: bool
+            Whether one of the messages of the transaction timed out.
+
+        Returns
+        -------
+        self
+        """
+        if timedout:
+            self._timeouts += 1
+        else:
+            self._completed += 1
+            self._transactions.record(duration)
+
+        # allow chaining
+        return self
+
+    def scaler(self, autoscaler):
+        """
+        Method to register an autoscaler, so its scaling is summarised
+        together with the transactions.
+
+        Parameters
+        ----------
+        autoscaler: AutoScaler
+            The autoscaler of a server pool.
+
+        Returns
+        -------
+        self
+        """
+        self._scalers.append(autoscaler)
+
+        # allow chaining
+        return self
+
+    def failures(self, failures):
+        """
+        Method to register the failure process of a server pool, so its
+        availability is summarised together with the transactions.
+
+        Parameters
+        ----------
+        failures: Failures
+            The failure process of a server pool.
+
+        Returns
+        -------
+        self
+        """
+        self._failures.append(failures)
+
+        # allow chaining
+        return self
+
+    def usage(self, kind, runtime):
+        """
+        Method to summarise the messages of a kind of server, together with
+        the time-weighted usage of its servers: the total cpu time, and the
+        time-averaged number of users and length of the queues.
+
+        Parameters
+        ----------
+        kind: string
+            Kind of the servers.
+        runtime: float
+            Simulated time the statistics were collected over.
+
+        Returns
+        -------
+        dict
+        """
+        areas = {'cpu_time': 0.0, 'users': 0.0, 'queue': 0.0}
+        for server in self._servers[kind]:
+            for area, value in server.usage().items():
+                areas[area] += value
+
+        return {
+            **self._messages[kind],
+            "completions": self._latencies[kind].count if kind in self._latencies else 0,
+            "cpu_time": float(areas['cpu_time']),
+            "users": float(areas['users'] / runtime),
+            "queue": float(areas['queue'] / runtime),
+        }
+
+    def summary(self, runtime):
+        """
+        Method to summarise the collected statistics.
+
+        Parameters
+        ----------
+        runtime: float
+            Simulated time the statistics were collected over.
+
+        Returns
+        -------
+        dict
+        """
+        finished = self._completed + self._timeouts
+
+        return {
+            "runtime": runtime,
+            "arrivals": self._arrivals,
+            "completed": self._completed,
+            "timeouts": self._timeouts,
+            "throughput": self._completed / runtime,
+            "timeout_fraction": self._timeouts / finished if finished else 0.0,
+            "transaction": self._transactions.describe(),
+            "kinds": {kind: histogram.describe() for kind, histogram in self._latencies.items()},
+            "scaling": {scaler.kind(): scaler.summary(runtime) for scaler in self._scalers},
+            "failures": {failures.kind(): failures.summary(runtime) for failures in self._failures},
+            "usage": {kind: self.usage(kind, runtime) for kind in self._messages},
+            "histograms": {
+                "transaction": self._transactions.to_dict(),
+                "kinds": {kind: histogram.to_dict() for kind, histogram in self._latencies.items()},
+            },
+        }
+
@@ -0,0 +1,110 @@
+"""
+Class for handing out independent random number streams to the components of a
+simulation. Every component (the arrivals, the service times and the balancing
+of every pool, the failures, ...) draws from its own generator, spawned from a
+single root seed by the name of the component. Two configurations with the same
+root seed therefore see the same arrivals and service times for the components
+they share, also when one of them has components the other one has not, which
+compares them under common random numbers.
+
+@file   lib/Streams.py
+@scope  public
+"""
+
+# dependencies
+import uuid
+from zlib import crc32
+import numpy as np
+
+
+class Streams(object):
+
+    def __init__(self, seed=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        seed: int|numpy.random.SeedSequence
+            Root seed of all streams.
+            Default: fresh entropy.
+        """
+        self._root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+        # generators that were handed out, by the name of their component
+        self._generators = {}
+        self._keys = {}
+
+    def generator(self, name):
+        """
+        Method to get the generator of a component. The same name always
+        gives the same generator.
+
+        Parameters
+        ----------
+        name: string
+            Name of the component, e.g. 'arrivals' or 'service.balance'.
+
+        Returns
+        -------
+        numpy.random.Generator
+        """
+        if name not in self._generators:
+
+            # the stream depends on the name only, not on the order in
+            # which the components ask for their streams
+            key = self._root.spawn_key + (crc32(name.encode()),)
+            seed = np.random.SeedSequence(self._root.entropy, spawn_key=key)
+
+            self._keys[name] = key
+            self._generators[name] = np.random.default_rng(seed)
+
+        return self._generators[name]
+
+    def metadata(self):
+        """
+        Method to describe the root seed and the streams that were handed
+        out, so a run can be reproduced.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "entropy": self._root.entropy,
+            "spawn_key": list(self._root.spawn_key),
+            "streams": {name: list(key) for name, key in sorted(self._keys.items())},
+        }
+
+
+def generator(random=None):
+    """
+    Function to get a generator for a component, which is the given one, or a
+    generator with fresh entropy when the component has no stream.
+
+    Parameters
+    ----------
+    random: numpy.random.Generator
+        Generator of the component, if any.
+
+    Returns
+    -------
+    numpy.random.Generator
+    """
+    return random if random is not None else np.random.default_rng()
+
+
+def identifier(random):
+    """
+    Function to draw a random (version 4) uuid from a generator.
+
+    Parameters
+    ----------
+    random: numpy.random.Generator
+        Generator to draw from.
+
+    Returns
+    -------
+    uuid.UUID
+    """
+    return uuid.UUID(bytes=random.bytes(16), version=4)
@@ -0,0 +1,105 @@
+"""
+Class for timing out messages within a simulation. All messages of a generator
+share the same timeout duration, so their deadlines are ordered by the time they
+were sent. This allows keeping them in a plain deque, watched over by a single
+process that only wakes up to interrupt messages that are still pending, instead
+of scheduling a separate timeout event for every message.
+
+@file   lib/Timeouts.py
+@scope  private
+"""
+
+# dependencies
+from collections import deque
+
+
+class Timeouts(object):
+
+    def __init__(self, envoirment, timeout):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        timeout: float
+            Time after which a watched process is interrupted.
+        """
+        self._env = envoirment
+        self._timeout = timeout
+
+        # watched processes, ordered by their deadline
+        self._pending = deque()
+
+        # event to wake up the watcher when it is idle
+        self._wakeup = None
+
+        # Initialize the watcher
+        self.process = envoirment.process(self.watcher())
+
+    def watch(self, process):
+        """
+        Method to watch a process, so that it will be interrupted with a
+        "TIMEOUT" cause when it did not finish within the timeout.
+
+        Parameters
+        ----------
+        process: simpy.Process
+            Process to watch.
+
+        Returns
+        -------
+        simpy.Process
+        """
+        self._pending.append((self._env.now + self._timeout, process))
+
+        # wake up the watcher when it has nothing to watch
+        if self._wakeup is not None:
+            wakeup, self._wakeup = self._wakeup, None
+            wakeup.succeed()
+
+        return process
+
+    def __len__(self):
+        """
+        Number of watched processes, including finished ones that have not
+        been cleaned up yet.
+
+        Returns
+        -------
+        int
+        """
+        return len(self._pending)
+
+    def watcher(self):
+        """
+        Generator method that interrupts all processes that passed their deadline.
+
+        Yields
+        ------
+        simpy.Event
+        """
+        pending = self._pending
+
+        while True:
+
+            # forget about processes that already finished
+            while pending and pending[0][1].triggered:
+                pending.popleft()
+
+            # wait until there is something to watch
+            if not pending:
+                self._wakeup = self._env.event()
+                yield self._wakeup
+                continue
+
+            deadline, process = pending[0]
+
+            # sleep until the first deadline of a running process
+            if deadline > self._env.now:
+                yield self._env.timeout(deadline - self._env.now)
+                continue
+
+            # the process is still running past its deadline
+            pending.popleft()
+            process.interrupt("TIMEOUT")
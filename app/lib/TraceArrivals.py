@@ -0,0 +1,368 @@
+"""
+Class for replaying recorded arrival timestamps as the source of incoming
+messages, instead of the synthetic arrivals of a seasonality. The trace is read
+through a memory map in batches, so memory use does not depend on the length of
+the trace. It can be used wherever a TransactionInterval is expected.
+
+A trace is a sorted sequence of timestamps in seconds, stored as:
+- .npy:     a one dimensional numpy array.
+- .csv/.txt: one timestamp per line, optionally in a column of a separated
+             file with a header.
+- other:    raw little-endian 64 bit floats.
+
+@file   lib/TraceArrivals.py
+@scope  public
+"""
+
+# dependencies
+from mmap import mmap, ACCESS_READ
+import os
+import tempfile
+import unittest
+import numpy as np
+from lib.Streams import generator
+
+
+class TraceArrivals(object):
+
+    def __init__(self, trace_file, enviroment=None, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        trace_file: string
+            Path to the trace.
+        enviroment: Environment
+            Environment of the simulation.
+
+        Keyworded parameters
+        --------------------
+        speed: float
+            Speed of the replay, a speed of 2 replays the trace twice as fast.
+            Default: 1.
+        amplify: float
+            Expected number of transactions per recorded arrival. Fractions
+            duplicate or drop arrivals at random.
+            Default: 1.
+        origin: float
+            Timestamp of the trace that maps to the start of the simulation.
+            Default: the first timestamp of the trace.
+        batch: integer
+            Maximum number of recorded arrivals per batch.
+            Default: 10000.
+        sep: string
+            Separator of the columns of a csv trace.
+            Default: ';'.
+        column: integer
+            Column of the timestamps in a csv trace.
+            Default: 0.
+        random: numpy.random.Generator
+            Generator to amplify the arrivals with.
+            Default: a generator with fresh entropy.
+        """
+        self.env = enviroment
+        self._speed = kwargs['speed'] if 'speed' in kwargs else 1
+        self._amplify = kwargs['amplify'] if 'amplify' in kwargs else 1
+        self._batch = kwargs['batch'] if 'batch' in kwargs else 10000
+        self._sep = (kwargs['sep'] if 'sep' in kwargs else ';').encode()
+        self._column = kwargs['column'] if 'column' in kwargs else 0
+        self._random = generator(kwargs['random'] if 'random' in kwargs else None)
+
+        # csv traces are searched and parsed from the mapped bytes, binary
+        # traces are mapped as an array directly
+        self._csv = trace_file.endswith(('.csv', '.txt'))
+
+        if self._csv:
+            with open(trace_file, 'rb') as f:
+                self._bytes = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+            # skip a header that is not a timestamp
+            self._start = 0
+            if self._value(0) is None:
+                self._start = self._bytes.find(b'\n') + 1
+
+        elif trace_file.endswith('.npy'):
+            self._data = np.load(trace_file, mmap_mode='r')
+
+        else:
+            self._data = np.memmap(trace_file, dtype='<f8', mode='r')
+
+        self._origin = kwargs['origin'] if 'origin' in kwargs else self.first()
+
+        # position in the trace after the last arrival of every batch by its
+        # simulation time, as converting the time back may not give the exact
+        # timestamp, and equal timestamps may be split over batches
+        self._ends = {}
+
+        # whether the entire trace has been read
+        self._exhausted = False
+
+    def first(self):
+        """
+        Getter to expose the first timestamp of the trace.
+
+        Returns
+        -------
+        float
+        """
+        if not self._csv:
+            return float(self._data[0])
+
+        return self._value(self._line(self._start)[0])
+
+    def exhausted(self):
+        """
+        Method to check whether all arrivals of the trace were handed out.
+
+        Returns
+        -------
+        bool
+        """
+        return self._exhausted
+
+    def arrivals(self, timestamp=None):
+        """
+        Method to get the next batch of arrival times, as simulation times.
+
+        Parameters
+        ----------
+        timestamp: float
+            Simulation time after which the arrivals should take place. The
+            next batch should start at the last arrival of this one.
+            Default: None (from the start of the trace).
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted arrival times. The batch is only empty when the trace is
+            exhausted, see exhausted().
+        """
+        # we need the position in the trace to continue from
+        if timestamp is None:
+            position = self._seek(self._origin, 'left')
+        elif timestamp in self._ends:
+            position = self._ends.pop(timestamp)
+        else:
+            position = self._seek(self._origin + timestamp * self._speed, 'right')
+
+        times = np.empty(0)
+
+        # all recorded arrivals of a batch may be dropped when amplifying, so
+        # read on until there are arrivals or the trace ends
+        while not times.size and not self._exhausted:
+            times, positions = self._read(position)
+            self._exhausted = positions[-1] >= self._size()
+
+            # keep all arrivals of the last time for the next batch, so they
+            # are amplified together, unless the batch consists of a single
+            # time, which continues right after this batch
+            cut = times.size
+            if not self._exhausted and times.size:
+                cut = np.searchsorted(times, times[-1], side='left') or times.size
+                times = times[:cut]
+
+            position = positions[cut]
+
+            # duplicate or drop arrivals to amplify the trace
+            if self._amplify != 1:
+                whole = int(self._amplify)
+                counts = whole + (self._random.random(times.size) < self._amplify - whole)
+                times = np.repeat(times, counts)
+
+        arrivals = (times - self._origin) / self._speed
+
+        if arrivals.size:
+            self._ends[arrivals[-1]] = position
+
+        return arrivals
+
+    def _size(self):
+        """
+        Method to get the end position of the trace.
+
+        Returns
+        -------
+        int
+            Number of timestamps of a binary trace, or the number of bytes of
+            a csv trace.
+        """
+        return self._data.size if not self._csv else len(self._bytes)
+
+    def _seek(self, value, side):
+        """
+        Method to find the position of the first timestamp after (or at) a
+        value.
+
+        Parameters
+        ----------
+        value: float
+            Timestamp in the trace.
+        side: string
+            'left' to include timestamps equal to the value, 'right' to
+            start after them.
+
+        Returns
+        -------
+        int
+            Index in a binary trace, or byte offset in a csv trace.
+        """
+        if not self._csv:
+            return int(np.searchsorted(self._data, value, side=side))
+
+        return self._search(value, side)
+
+    def _read(self, position):
+        """
+        Method to read a batch of trace timestamps from a position on.
+
+        Parameters
+        ----------
+        position: int
+            Index in a binary trace, or byte offset in a csv trace.
+
+        Returns
+        -------
+        tuple
+            The timestamps, and the position of every timestamp followed by
+            the position after the batch.
+        """
+        if not self._csv:
+            end = min(position + self._batch, self._data.size)
+            return np.asarray(self._data[position:end], dtype=float), np.arange(position, end + 1)
+
+        size = len(self._bytes)
+        times, positions = [], []
+
+        # parse lines until the batch is full or the trace ends
+        while position < size and len(times) < self._batch:
+            end = self._bytes.find(b'\n', position)
+            if end < 0:
+                end = size
+
+            line = self._bytes[position:end].strip()
+            if line:
+                times.append(float(line.split(self._sep)[self._column]))
+                positions.append(position)
+
+            position = end + 1
+
+        positions.append(min(position, size))
+
+        return np.asarray(times, dtype=float), positions
+
+    def _search(self, value, side):
+        """
+        Method to binary search the byte offsets of a csv trace, for the
+        first line with a timestamp after (or at) a value.
+
+        Parameters
+        ----------
+        value: float
+            Timestamp to search.
+        side: string
+            'left' or 'right', as for numpy.searchsorted.
+
+        Returns
+        -------
+        int
+            Offset of the start of the line.
+        """
+        lower, upper = self._start, len(self._bytes)
+
+        while lower < upper:
+            middle = (lower + upper) // 2
+            start, found = self._line(middle)
+
+            # all lines until this line are before the value
+            if found is not None and (found < value or (side == 'right' and found == value)):
+                lower = self._bytes.find(b'\n', start) + 1 or len(self._bytes)
+            else:
+                upper = middle
+
+        return self._line(lower)[0]
+
+    def _line(self, offset):
+        """
+        Method to find the first line of a csv trace that starts at or
+        after a byte offset.
+
+        Parameters
+        ----------
+        offset: int
+            Byte offset.
+
+        Returns
+        -------
+        tuple
+            The offset of the line, and its timestamp or None at the end.
+        """
+        size = len(self._bytes)
+
+        if offset > self._start:
+            newline = self._bytes.find(b'\n', offset - 1)
+            offset = newline + 1 if newline >= 0 else size
+
+        return offset, self._value(offset)
+
+    def _value(self, offset):
+        """
+        Method to parse the timestamp of the line at a byte offset.
+
+        Parameters
+        ----------
+        offset: int
+            Offset of the start of the line.
+
+        Returns
+        -------
+        float|None
+        """
+        end = self._bytes.find(b'\n', offset)
+        line = self._bytes[offset:end if end >= 0 else len(self._bytes)].strip()
+
+        try:
+            return float(line.split(self._sep)[self._column])
+        except (ValueError, IndexError):
+            return None
+
+
+class TraceArrivalsTestCase(unittest.TestCase):
+
+    def test_should_replay_trace_for_every_process(self):
+        """
+        Test to ensure that every process of a simulation replays every
+        arrival of a trace, also when batches split equal timestamps.
+        """
+        from lib.Environment import Environment
+        from lib.Statistics import Statistics
+        from lib.Streams import Streams
+        from command_line_simulation import build
+
+        times = np.sort(np.round(np.random.default_rng(0).uniform(0, 100, 3000), 1))
+        servers = [{"size": 1, "capacity": 1000, "kind": kind} for kind in ("balance", "payment")]
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("trace.npy", "trace.csv"):
+                path = os.path.join(directory, name)
+                if name.endswith(".npy"):
+                    np.save(path, times)
+                else:
+                    np.savetxt(path, times, header="time", comments="")
+
+                config = {"servers": servers, "process": [["balance"], ["payment"]], "timeout": 5,
+                          "runtime": 200, "trace": {"file": path, "batch": 7}}
+
+                environment = Environment()
+                statistics = Statistics()
+                build(environment, config, None, statistics=statistics, streams=Streams(1))
+                environment.run(until=config['runtime'])
+
+                usage = statistics.summary(config['runtime'])['usage']
+                self.assertEqual(usage['balance']['arrivals'], times.size)
+                self.assertEqual(usage['payment']['arrivals'], times.size)
+
+
+# run as main
+if __name__ == "__main__":
+    unittest.main()
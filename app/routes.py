@@ -10,7 +10,7 @@ part clean from these declarations.
 """
 
 # third party dependencies
-from lib.LogProcessing import get_endpoint_json, show_dash_graphs
+from lib.LogProcessing import get_endpoint_json, get_endpoint_matrix, get_incident_impact, show_dash_graphs
 from lib.Environment import Environment
 from lib.MultiServers import MultiServers
 from lib.Servers import Servers
@@ -18,12 +18,15 @@ from lib.Logger import Logger
 from lib.MessageGenerator import MessageGenerator
 from lib.ErrorGenerator import ErrorGenerator
 from lib.Seasonality import TransactionInterval as Seasonality
+from lib.LiveMetrics import LiveMetrics
 
 import os
 from os.path import isfile, join, normpath, dirname, basename, getctime, exists
-from flask import request, render_template, send_file
-from flask.json import jsonify, load
+from flask import request, render_template, send_file, Response, stream_with_context
+from flask.json import jsonify, load, dumps
 from datetime import datetime
+from threading import Thread
+from collections import OrderedDict
 import time
 import requests
 import zipfile
@@ -46,6 +49,9 @@ Seasonality_folder = normpath(join(dirname(__file__), 'seasonality'))
 Seasonality_file = 'week.csv'
 file_prefix = "log"
 
+# number of live simulations that are remembered
+LIVE_SIMULATIONS = 16
+
 
 def install(client, dashapp):
     """
@@ -60,6 +66,9 @@ def install(client, dashapp):
     # global simulation count
     simc = len(glob.glob(os.path.join(LOG_PATH, file_prefix+'*')))
 
+    # live metrics of simulations that run in the background, by their id
+    live_simulations = OrderedDict()
+
     # declare the index route
     @client.route('/')
     def index():
@@ -161,6 +170,10 @@ def install(client, dashapp):
             runtime: int
                 Runtime of the simulation (defined by simpy package).
 
+            live: bool
+                Run the simulation in the background, and publish live
+                metrics to /simulation/<id>/live. The id is returned directly.
+
         Returns
         -------
         GET: dict
@@ -219,6 +232,21 @@ def install(client, dashapp):
                                     request.form['process'].split(',')],
                              timeout=int(request.form['timeout']))
 
+            # run the simulation in the background, while its metrics are published
+            if request.form.get('live'):
+                live = LiveMetrics(environment, servers)
+                live_simulations[simc] = live
+
+                # forget the oldest simulations
+                while len(live_simulations) > LIVE_SIMULATIONS:
+                    live_simulations.popitem(last=False)
+
+                Thread(target=run_live, args=(environment, live, int(request.form['runtime'])),
+                       daemon=True).start()
+
+                # expose the id of the simulation, while it is running
+                return jsonify(simc)
+
             # run the simulation with a certain runtime (runtime). this runtime is not equivalent
             # to the current time (measurements). this should be the seasonality of the system.
             # for example, day or week.
@@ -254,6 +282,70 @@ def install(client, dashapp):
                 # No logfiles found (/logs is empty)
                 return jsonify({"message": "No logfiles were found in /logs."})
 
+    @client.route('/simulation/<int:simulation_id>/live')
+    def live_metrics(simulation_id):
+        """
+        Function to stream the live metrics of a simulation as server-sent
+        events. Every event is a snapshot of all kinds of servers, and the
+        stream ends with a "finished" event when the simulation is done.
+
+        Parameters
+        ----------
+        simulation_id: int
+            Id of the simulation.
+
+        Returns
+        -------
+        GET: text/event-stream
+        """
+        if simulation_id not in live_simulations:
+            return jsonify({"message": "No live simulation with given ID exists."}), 404
+
+        live = live_simulations[simulation_id]
+
+        # a reconnecting client continues after the last event it received,
+        # a malformed id starts from the beginning
+        try:
+            sequence = max(int(request.headers.get('Last-Event-ID', 0)), 0)
+        except ValueError:
+            sequence = 0
+
+        def stream():
+            for item in live.follow(sequence):
+
+                # comments keep the connection alive
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield f"id: {item[0]}\ndata: {dumps(item[1])}\n\n"
+
+            yield "event: finished\ndata: {}\n\n"
+
+        return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @client.route('/simulation/<int:simulation_id>/abort', methods=["POST"])
+    def abort_simulation(simulation_id):
+        """
+        Function to abort a live simulation.
+
+        Parameters
+        ----------
+        simulation_id: int
+            Id of the simulation.
+
+        Returns
+        -------
+        POST: JSON
+        """
+        if simulation_id not in live_simulations:
+            return jsonify({"message": "No live simulation with given ID exists."}), 404
+
+        live_simulations[simulation_id].abort()
+
+        return jsonify({"message": "Simulation is aborted."})
+
     @client.route('/get_endpoint_data')
     def get_endpoint_data():
         """
@@ -290,6 +382,81 @@ def install(client, dashapp):
             json_convert = {"data": 0, "message": "No logfile found."}
             return jsonify(json_convert)
 
+    @client.route('/get_endpoint_matrix')
+    def get_endpoint_matrix_data():
+        """
+        Function to process the .csv logfile and return the number of messages
+        between kinds of servers as a matrix, or between individual servers as
+        a sparse matrix when level=server is given.
+
+        Parameters
+        ----------
+        f: logfile name
+        level: 'kind' (default) or 'server'
+
+        Returns
+        -------
+        GET: JSON
+        """
+
+        # Scan the logfile directory
+        list_of_files = glob.glob(join(LOG_PATH, 'log_*.csv'))
+
+        # Only process/return endpoint_matrix if a logfile exists
+        if list_of_files:
+
+            last_created = basename(max(list_of_files,
+                                        key=getctime))
+
+            # Parse URL request file f using last_created default
+            f = request.args.get('f', default=last_created)
+
+            return get_endpoint_matrix(f, level=request.args.get('level', default='kind'))
+
+        else:
+            json_convert = {"data": 0, "message": "No logfile found."}
+            return jsonify(json_convert)
+
+    @client.route('/get_incident_impact')
+    def get_incident_impact_data():
+        """
+        Function to process the .csv logfile and its error log, and return per
+        incident the number of affected messages and transactions, timeouts
+        and the extra latency.
+
+        Parameters
+        ----------
+        f: logfile name
+        slow: factor of the median latency above which a message is slow (default: 2)
+
+        Returns
+        -------
+        GET: JSON
+        """
+
+        # Scan the logfile directory
+        list_of_files = glob.glob(join(LOG_PATH, 'log_*.csv'))
+
+        # Only process/return the impact if a logfile exists
+        if list_of_files:
+
+            last_created = basename(max(list_of_files,
+                                        key=getctime))
+
+            # Parse URL request file f using last_created default
+            f = request.args.get('f', default=last_created)
+
+            # incidents are only logged in the error log
+            if not exists(join(LOG_PATH, 'error-' + f)):
+                json_convert = {"data": 0, "message": "No error log found."}
+                return jsonify(json_convert)
+
+            return get_incident_impact(f, slow=request.args.get('slow', default=2.0, type=float))
+
+        else:
+            json_convert = {"data": 0, "message": "No logfile found."}
+            return jsonify(json_convert)
+
     @client.route('/download-logs')
     def download_logfile():
         """
@@ -336,3 +503,23 @@ def install(client, dashapp):
 
         else:
             return jsonify({"message": "No logfile parameter (f) was given in the request."})
+
+
+def run_live(environment, live, runtime):
+    """
+    Function to run a simulation until its runtime or until it is aborted,
+    and tell the followers of its live metrics when it is done.
+
+    Parameters
+    ----------
+    environment: Environment
+        The environment of the simulation.
+    live: LiveMetrics
+        Live metrics of the simulation.
+    runtime: int
+        Runtime of the simulation.
+    """
+    try:
+        environment.run(until=environment.any_of([environment.timeout(runtime), live.aborted]))
+    finally:
+        live.finish()
@@ -0,0 +1,210 @@
+/**
+ *  Class for following a running simulation. This opens an event stream to
+ *  the live endpoint of a simulation, and draws the snapshots it receives as
+ *  a line per kind of server, for a metric that can be selected. The
+ *  simulation can be aborted from the chart.
+ *
+ *  @example    ```
+ *              import { LiveChart } from './path/to/LiveChart.js';
+ *
+ *              // follow simulation 1
+ *              const chart = new LiveChart(container, 1);
+ *              ```
+ *
+ *  @file   web/static/js/LiveChart.js
+ *  @scope  public
+ */
+
+/**
+ *  Dependencies.
+ */
+import { api } from './Api.js';
+
+/**
+ *  Private property accessors.
+ *  @var    Symbol
+ */
+const container = Symbol('container');
+const source = Symbol('source');
+const series = Symbol('series');
+const metric = Symbol('metric');
+const svg = Symbol('svg');
+
+/**
+ *  Metrics of a snapshot that can be shown.
+ *  @var    Array
+ */
+const metrics = ['throughput', 'timeouts', 'cpu', 'queue', 'servers'];
+
+/**
+ *  Export class definition.
+ */
+export class LiveChart {
+
+    /**
+     *  Constructor.
+     *  @param  Element Parent element.
+     *  @param  Number  Id of the simulation to follow.
+     *  @param  Object  Configuration for the chart. Supported options are:
+     *
+     *                      "width"     Number  Width of the chart in pixels.
+     *                      "height"    Number  Height of the chart in pixels.
+     *                      "points"    Number  Number of snapshots to show.
+     */
+    constructor(parent, id, config = {}) {
+
+        /**
+         *  Default configuration.
+         *  @var    Object
+         */
+        this.config = Object.assign({
+            width:  800,
+            height: 300,
+            points: 600
+        }, config);
+
+        /**
+         *  Element for encapsulating the chart.
+         *  @var    Element
+         */
+        this[container] = parent.appendChild(document.createElement('div'));
+        this[container].classList.add('livechart');
+
+        /**
+         *  Received points per kind of server, as [time, snapshot] pairs.
+         *  @var    Object
+         */
+        this[series] = { };
+
+        /**
+         *  Currently shown metric.
+         *  @var    String
+         */
+        this[metric] = metrics[0];
+
+        // we need a selector for the metric
+        const select = this[container].appendChild(document.createElement('select'));
+        metrics.forEach((name) => select.add(new Option(name, name)));
+        select.addEventListener('change', () => { this[metric] = select.value; this.draw(); });
+
+        // we need a button to abort the simulation
+        const button = this[container].appendChild(document.createElement('button'));
+        button.textContent = 'Abort simulation';
+        button.addEventListener('click', () => api.post(`/simulation/${id}/abort`, new FormData()));
+
+        /**
+         *  Drawing area of the chart.
+         *  @var    Selection
+         */
+        this[svg] = d3.select(this[container]).append('svg')
+            .attr('width', this.config.width)
+            .attr('height', this.config.height);
+
+        /**
+         *  Event stream of the simulation, which resumes after the last
+         *  received snapshot when the connection is lost.
+         *  @var    EventSource
+         */
+        this[source] = new EventSource(`/simulation/${id}/live`);
+
+        // every message is a snapshot of all kinds of servers
+        this[source].onmessage = (e) => this.push(JSON.parse(e.data));
+
+        // the stream ends when the simulation is done
+        this[source].addEventListener('finished', () => {
+            this[source].close();
+            button.disabled = true;
+        });
+    }
+
+    /**
+     *  Method to add a snapshot to the chart.
+     *  @param  Object  Snapshot with a time and the metrics per kind.
+     *  @return this
+     */
+    push(snapshot) {
+
+        Object.entries(snapshot.kinds).forEach(([kind, values]) => {
+
+            // we need a series for every kind
+            const points = this[series][kind] || (this[series][kind] = []);
+            points.push([snapshot.time, values]);
+
+            // only keep the most recent points
+            if (points.length > this.config.points) points.shift();
+        });
+
+        // allow chaining
+        return this.draw();
+    }
+
+    /**
+     *  Method to (re)draw the chart.
+     *  @return this
+     */
+    draw() {
+
+        const { width, height } = this.config;
+        const margin = 40;
+        const color = d3.scaleOrdinal(d3.schemeCategory10);
+        const entries = Object.entries(this[series]);
+        const all = [].concat(...entries.map(([, points]) => points));
+
+        // scales over all points of all kinds
+        const x = d3.scaleLinear()
+            .domain(d3.extent(all, (d) => d[0]))
+            .range([margin, width - margin]);
+        const y = d3.scaleLinear()
+            .domain([0, d3.max(all, (d) => d[1][this[metric]]) || 1])
+            .range([height - margin, margin]);
+
+        const line = d3.line()
+            .x((d) => x(d[0]))
+            .y((d) => y(d[1][this[metric]]));
+
+        // replace the previous drawing
+        this[svg].selectAll('*').remove();
+
+        this[svg].append('g')
+            .attr('transform', `translate(0, ${height - margin})`)
+            .call(d3.axisBottom(x));
+        this[svg].append('g')
+            .attr('transform', `translate(${margin}, 0)`)
+            .call(d3.axisLeft(y));
+
+        entries.forEach(([kind, points], i) => {
+
+            this[svg].append('path')
+                .datum(points)
+                .attr('fill', 'none')
+                .attr('stroke', color(kind))
+                .attr('d', line);
+
+            this[svg].append('text')
+                .attr('x', width - margin)
+                .attr('y', margin + i * 15)
+                .attr('text-anchor', 'end')
+                .attr('fill', color(kind))
+                .text(kind);
+        });
+
+        // allow chaining
+        return this;
+    }
+
+    /**
+     *  Cleanup.
+     */
+    remove() {
+
+        // stop following the simulation
+        this[source].close();
+
+        // remove the chart
+        this[container].remove();
+
+        // drop the references
+        this[container] = null;
+        this[series] = null;
+    }
+};
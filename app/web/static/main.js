@@ -12,6 +12,7 @@
 // dependencies
 import { Forms } from './js/Forms.js';
 import { api } from './js/Api.js';
+import { LiveChart } from './js/LiveChart.js';
 
 /**
  *  Event handler that initialized when the document
@@ -52,6 +53,9 @@ onload = function() {
             // append all data entries to the formdata
             Object.entries(form.data()).forEach(([k, v]) => formdata.set(k, v));
 
+            // run the simulation in the background, so it can be followed live
+            formdata.set('live', 1);
+
             /**
              *  Post request to startup a new simulation based on the
              *  values of the form.
@@ -62,7 +66,9 @@ onload = function() {
 
                 // test output
                 console.log(res);
-                
+
+                // follow the metrics of the running simulation
+                new LiveChart(mainContainer, res);
 
             });
 
@@ -10,6 +10,7 @@ us to add some additional middleware functionality.
 
 # dependencies
 import simpy
+from lib.Middleware import Subscription
 
 
 class Environment(simpy.Environment):
@@ -28,6 +29,12 @@ class Environment(simpy.Environment):
         # collection of middlewares
         self._middleware = []
 
+        # dispatch of the steps, compiled when middleware is installed: the
+        # pipes of middleware that receives every step, and the subscriptions
+        # of middleware that only receives some
+        self._pipes = []
+        self._subscriptions = []
+
     def log(self, message, level=20, type="info"):
         """
         Method to log a message to the environment.
@@ -93,6 +100,13 @@ class Environment(simpy.Environment):
         # install the middleware
         self._middleware.append(middleware)
 
+        # only valid middleware is dispatched to
+        if middleware:
+            if middleware.subscribes():
+                self._subscriptions.append(Subscription(middleware))
+            else:
+                self._pipes.append(middleware.pipe)
+
         # allow chaining
         return self
 
@@ -127,16 +141,28 @@ class Environment(simpy.Environment):
         Method that wraps around simpy.Environment.step.
         """
         # we need the current process, which we can pipe
-        # to our middleware
-        current = self.active_process
-
-        # we need to iterate over the middleware, so we
-        # can pipe the active process to that
-        for m in self._middleware:
-
-            # only pipe valid message
-            if m:
-                m.pipe(current)
+        # to the middleware that receives every step
+        if self._pipes:
+            current = self.active_process
+            for pipe in self._pipes:
+                pipe(current)
+
+        # the subscriptions filter the event that is about to be processed
+        if self._subscriptions and self._queue:
+            time, _, _, event = self._queue[0]
+            for subscription in self._subscriptions:
+                subscription.offer(event, time)
 
         # call the original method
         return super().step()
+
+    def run(self, until=None):
+        """
+        Method that wraps around simpy.Environment.run, which delivers the
+        batches of the middleware that are not full when the run ends.
+        """
+        try:
+            return super().run(until)
+        finally:
+            for subscription in self._subscriptions:
+                subscription.flush()
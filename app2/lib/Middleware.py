@@ -3,6 +3,16 @@ Class for exposing the default interface of middleware. This class should never
 be instantiated. This class can be inherited if you want to create your
 own middleware, which can be used by a simulation.
 
+Middleware can subscribe to a part of the steps of a simulation, by overriding
+the following attributes:
+- events:   Types of the events to receive, e.g. (simpy.Timeout, simpy.Process).
+- interval: Simulated time between two messages, for periodic samples.
+- batch:    Number of messages that are collected and delivered at once,
+            through pipe_many.
+Middleware that subscribes receives the event that is about to be processed
+as message. Middleware that does not receives the active process on every
+step.
+
 @file   lib/Middleware.py
 @author Tycho Atsma <tycho.atsma@gmail.com>
 @scope  private
@@ -14,6 +24,15 @@ import unittest
 
 class Middleware(metaclass=ABCMeta):
 
+    # types of the events this middleware receives, None for all events
+    events = None
+
+    # simulated time between two messages, None for every step
+    interval = None
+
+    # number of messages that are delivered at once
+    batch = 1
+
     @abstractmethod
     def __init__(self):
         """
@@ -38,6 +57,112 @@ class Middleware(metaclass=ABCMeta):
         """
         pass
 
+    def pipe_many(self, messages):
+        """
+        Method to pipe a batch of messages through your custom middleware
+        handling. By default, every message is piped on its own.
+
+        Parameters
+        ----------
+        messages: list
+            Messages to pipe through this middleware, in order.
+
+        Returns
+        -------
+        self
+        """
+        for message in messages:
+            self.pipe(message)
+
+        # allow chaining
+        return self
+
+    def subscribes(self):
+        """
+        Method to check whether this middleware only subscribes to a part
+        of the steps of a simulation.
+
+        Returns
+        -------
+        bool
+        """
+        return self.events is not None or self.interval is not None or self.batch > 1
+
+class Subscription(object):
+
+    def __init__(self, middleware):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        middleware: Middleware
+            The middleware that subscribes.
+        """
+        self._middleware = middleware
+
+        # filters of the subscription, the cheapest first
+        self._events = tuple(middleware.events) if middleware.events is not None else None
+        self._interval = middleware.interval
+        self._next = float('-inf')
+
+        # messages that are waiting to be delivered as a batch
+        self._batch = max(int(middleware.batch), 1)
+        self._pending = []
+
+    def offer(self, event, time):
+        """
+        Method to offer the event that is about to be processed, which is
+        delivered when it passes the filters.
+
+        Parameters
+        ----------
+        event: simpy.events.Event
+            The event that is about to be processed.
+        time: float
+            Simulated time at which the event is processed.
+
+        Returns
+        -------
+        self
+        """
+        # the next sample is not due yet
+        if time < self._next:
+            return self
+
+        # the middleware is not interested in this type of event
+        if self._events is not None and not isinstance(event, self._events):
+            return self
+
+        if self._interval is not None:
+            self._next = time + self._interval
+
+        if self._batch == 1:
+            self._middleware.pipe(event)
+            return self
+
+        self._pending.append(event)
+        if len(self._pending) >= self._batch:
+            self.flush()
+
+        # allow chaining
+        return self
+
+    def flush(self):
+        """
+        Method to deliver the messages that are waiting for a batch to fill.
+
+        Returns
+        -------
+        self
+        """
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._middleware.pipe_many(pending)
+
+        # allow chaining
+        return self
+
 class MiddlewareTestCase(unittest.TestCase):
 
     def test_should_not_construct(self):
@@ -46,6 +171,57 @@ class MiddlewareTestCase(unittest.TestCase):
         """
         self.assertRaises(TypeError, Middleware)
 
+    def test_should_deliver_subscribed_events(self):
+        """
+        Test to ensure that subscribed middleware only receives the events
+        it subscribed to, sampled and in batches.
+        """
+        import simpy
+        from lib.Environment import Environment
+
+        class Recorder(Middleware):
+
+            def __init__(self, **kwargs):
+                self.__dict__.update(kwargs)
+                self.messages = []
+                self.batches = []
+
+            def pipe(self, message):
+                self.messages.append(message)
+                return self
+
+            def pipe_many(self, messages):
+                self.batches.append(len(messages))
+                return super().pipe_many(messages)
+
+        def process(env):
+            for _ in range(100):
+                yield env.timeout(1)
+
+        env = Environment()
+        everything = Recorder()
+        timeouts = Recorder(events=(simpy.Timeout,))
+        sampled = Recorder(events=(simpy.Timeout,), interval=10)
+        batched = Recorder(events=(simpy.Timeout,), batch=8)
+        env.use(everything).use(timeouts).use(sampled).use(batched)
+
+        env.process(process(env))
+        env.run()
+
+        # middleware without a subscription receives every step
+        self.assertGreater(len(everything.messages), 100)
+
+        # the timeouts at 1, 2, ..., 100
+        self.assertEqual(len(timeouts.messages), 100)
+        self.assertTrue(all(isinstance(message, simpy.Timeout) for message in timeouts.messages))
+
+        # a sample at 1, 11, ..., 91
+        self.assertEqual(len(sampled.messages), 10)
+
+        # full batches, and the rest when the run ends
+        self.assertEqual(batched.batches, [8] * 12 + [4])
+        self.assertEqual(batched.messages, timeouts.messages)
+
 # run as main
 if __name__ == "__main__":
     unittest.main()